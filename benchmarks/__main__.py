@@ -0,0 +1,90 @@
+import argparse
+import sys
+import tempfile
+from typing import List
+
+from .checks import checks, run_checks
+from .suite import (
+    Metrics,
+    baseline_file,
+    commands,
+    latency_baseline_file,
+    load_baseline,
+    regressions,
+    run,
+    save_baseline,
+    sizes,
+)
+
+
+def report(key: str, metrics: Metrics) -> None:
+    values = " ".join(f"{name}={value:g}" for name, value in metrics.items())
+    print(f"{key:<14} {values}", flush=True)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description=(
+            "Measures git zen commands on synthetic stacks, failing when a "
+            "metric regresses beyond the stored baseline."
+        ),
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(f"{size}" for size in sizes),
+        help="comma separated stack sizes",
+    )
+    parser.add_argument(
+        "--commands",
+        default=",".join(commands),
+        help="comma separated commands",
+    )
+    parser.add_argument(
+        "--latency",
+        action="store_true",
+        help=(
+            "charge calls to Github and the remote repo the time they would "
+            "take over a network, checked against their own baseline"
+        ),
+    )
+    parser.add_argument(
+        "--checks",
+        action="store_true",
+        help=(
+            "run the checks measured by the clock, e.g. that parsing scales "
+            "linearly, instead of the commands"
+        ),
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="store the results as the baseline instead of checking them",
+    )
+    args = parser.parse_args(argv)
+    if args.checks:
+        failed = False
+        for name, failure in run_checks(list(checks)).items():
+            print(f"{name:<20} {'ok' if failure is None else failure}")
+            failed = failed or failure is not None
+        return 1 if failed else 0
+    names = args.commands.split(",")
+    unknown = [name for name in names if name not in commands]
+    if unknown:
+        parser.error(f"unknown commands: {', '.join(unknown)}")
+    run_sizes = [int(size) for size in args.sizes.split(",")]
+    filename = latency_baseline_file if args.latency else baseline_file
+    baseline = load_baseline(filename)
+    with tempfile.TemporaryDirectory(prefix="gitzen-bench-") as dir:
+        results = run(dir, names, run_sizes, report, args.latency)
+    if args.update_baseline:
+        save_baseline(results, filename, baseline)
+        print("Baseline updated")
+        return 0
+    found = regressions(results, baseline)
+    for regression in found:
+        print(f"REGRESSION {regression}")
+    return 1 if found else 0
+
+
+sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,121 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from gitzen import console
+from gitzen.commands import registry
+from gitzen.repo_commit_stack import parse_log_records
+
+from . import stack
+
+# A check returns why it failed, or None when it passed
+Check = Callable[[], Optional[str]]
+
+hook_script = os.path.realpath(f"{os.path.dirname(__file__)}/../git-zen-hook")
+# The most the hook may add to the start up of a bare interpreter
+hook_startup_budget = 0.05
+# The most each command may take to import, with the cli, in seconds
+import_budgets: Dict[str, float] = {
+    "init": 0.1,
+    "hook": 0.1,
+    "status": 0.4,
+    "sync": 0.4,
+    "push": 0.4,
+    "merge": 0.4,
+    "daemon": 0.4,
+}
+
+
+def fastest(function: Callable[[], None], repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def parse_log_is_linear() -> Optional[str]:
+    console_env = console.Env()
+    small = stack.log_records(1_000)
+    large = stack.log_records(10_000)
+    small_time = fastest(lambda: parse_log_records(console_env, small))
+    large_time = fastest(lambda: parse_log_records(console_env, large))
+    ratio = large_time / small_time
+    # linear would be 10x, quadratic 100x
+    if ratio < 30:
+        return None
+    return f"parsing 10x the commits took {ratio:.1f}x as long"
+
+
+def hook_starts_within_budget() -> Optional[str]:
+    with tempfile.TemporaryDirectory(prefix="gitzen-check-") as dir:
+        filename = f"{dir}/COMMIT_EDITMSG"
+        with open(filename, "w") as f:
+            f.write("Initial commit\n")
+        bare = fastest(lambda: run([sys.executable, "-c", "pass"]), 5)
+        hook = fastest(lambda: run([sys.executable, hook_script, filename]), 5)
+    added = hook - bare
+    if added < hook_startup_budget:
+        return None
+    return (
+        f"the hook added {added * 1000:.0f}ms to start up, "
+        f"over {hook_startup_budget * 1000:.0f}ms"
+    )
+
+
+def imports(command: str) -> Tuple[List[str], float]:
+    """
+    Returns the modules imported to run the command, and the seconds
+    taken to import them. The module is imported by name, as -X importtime
+    doesn't report modules loaded by importlib.import_module.
+    """
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "from gitzen import cli\n"
+            f"import {registry.commands[command].module}",
+        ],
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    modules = []
+    total = 0
+    for line in result.stderr.decode().splitlines():
+        fields = line.replace("import time:", "").split("|")
+        if line.startswith("import time:") and fields[0].strip().isdigit():
+            modules.append(fields[2].strip())
+            total += int(fields[0])
+    return modules, total / 1_000_000
+
+
+def command_imports_within_budget() -> Optional[str]:
+    over = []
+    for command, budget in import_budgets.items():
+        seconds = min(imports(command)[1] for _ in range(3))
+        if seconds >= budget:
+            over.append(f"{command} took {seconds:.3f}s, over {budget}s")
+    return None if len(over) == 0 else "; ".join(over)
+
+
+def run(command: List[str]) -> None:
+    subprocess.run(command, check=True)
+
+
+# Checks measured by the clock, kept out of the unit tests as they depend
+# on the speed of the machine
+checks: Dict[str, Check] = {
+    "parse-log-linear": parse_log_is_linear,
+    "hook-startup": hook_starts_within_budget,
+    "command-imports": command_imports_within_budget,
+}
+
+
+def run_checks(names: List[str]) -> Dict[str, Optional[str]]:
+    return {name: checks[name]() for name in names}
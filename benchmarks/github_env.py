@@ -0,0 +1,288 @@
+import json
+import re
+import shlex
+import subprocess
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from gitzen import exit_code, github, trace
+from gitzen.models.gitzen_error import GitZenError
+
+from .latency import LatencyModel
+from .stack import SyntheticStack
+
+# When the pull requests of a synthetic stack were last updated, well
+# before any sync
+created_at = "2024-01-01T00:00:00Z"
+page_size = 100
+json_string = r'"(?:[^"\\]|\\.)*"'
+update_pattern = re.compile(
+    rf"(?P<alias>u\d+): updatePullRequest\(input: {{\s*"
+    rf"pullRequestId: (?P<id>{json_string})\s*"
+    rf"baseRefName: (?P<base>{json_string})\s*"
+    rf"title: (?P<title>{json_string})\s*"
+    rf"body: (?P<body>{json_string})\s*"
+)
+
+
+class SyntheticGithubEnv(github.Env):
+    """
+    Answers as Github would for the pull requests of a synthetic stack.
+    The searches are paged, and pull requests created, updated, closed and
+    merged change its state. The head of a pull request is read from the
+    origin repo, as Github would see it.
+
+    A squash merge is modelled by fast-forwarding the remote branch to the
+    local commit of the pull request, so the rebase that follows has no
+    work.
+
+    Given a latency, each request is charged it, outside the lock so
+    concurrent requests overlap.
+    """
+
+    stack: SyntheticStack
+    latency: Optional[LatencyModel]
+    pull_requests: Dict[int, Dict[str, Any]]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        stack: SyntheticStack,
+        latency: Optional[LatencyModel] = None,
+    ) -> None:
+        super().__init__()
+        self.stack = stack
+        self.latency = latency
+        self.pull_requests = {}
+        self._lock = threading.Lock()
+        for index, head in enumerate(stack.pr_heads):
+            base = "master" if index == 0 else stack.pr_branch(index - 1)
+            self.add(
+                stack.pr_branch(index),
+                base,
+                f"Change {index + 1}",
+                f"zen-token:{stack.tokens[index]}",
+                head,
+                created_at,
+            )
+
+    def __repr__(self) -> str:
+        return (
+            f"SyntheticGithubEnv(stack={self.stack}, "
+            f"pull_requests={len(self.pull_requests)})"
+        )
+
+    def add(
+        self,
+        head_ref: str,
+        base_ref: str,
+        title: str,
+        body: str,
+        head_hash: str,
+        updated_at: str,
+    ) -> int:
+        number = len(self.pull_requests) + 1
+        self.pull_requests[number] = {
+            "id": f"PR_{number}",
+            "number": number,
+            "state": "OPEN",
+            "updatedAt": updated_at,
+            "title": title,
+            "body": body,
+            "baseRefName": base_ref,
+            "headRefName": head_ref,
+            "headRefOid": head_hash,
+            "mergeable": "MERGEABLE",
+            "reviewDecision": None,
+        }
+        return number
+
+    def node(self, pr: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns the pull request as its PullRequestFields.
+        """
+        fields = {
+            name: value for name, value in pr.items() if name != "headRefOid"
+        }
+        return {
+            **fields,
+            "repository": {"id": self.stack.repo_id},
+            "commits": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                "nodes": [
+                    {
+                        "commit": {
+                            "oid": pr["headRefOid"],
+                            "messageHeadline": pr["title"],
+                            "messageBody": pr["body"],
+                            "statusCheckRollup": None,
+                        }
+                    }
+                ],
+            },
+        }
+
+    def _graphql(
+        self,
+        params: Dict[str, str],
+        query: str,
+    ) -> Dict[str, Any]:
+        with trace.span("graphql", "github", params=params):
+            with self._lock:
+                if "search_query" in params:
+                    response = self._search(params)
+                elif query.startswith("mutation {"):
+                    response = self._update(query)
+                else:
+                    raise GitZenError(
+                        exit_code.GITHUB_ERROR,
+                        f"Unsupported graphql request: {params}",
+                    )
+            self.charge(len(query) + len(json.dumps(response)))
+            return response
+
+    def _search(self, params: Dict[str, str]) -> Dict[str, Any]:
+        match = re.search(r"updated:>=(\S+)", params["search_query"])
+        prs = [
+            pr
+            for pr in self.pull_requests.values()
+            if (
+                pr["updatedAt"] >= match.group(1)
+                if match is not None
+                else pr["state"] == "OPEN"
+            )
+        ]
+        start = int(params.get("pr_cursor", "0"))
+        end = start + page_size
+        return {
+            "data": {
+                "viewer": {"login": self.stack.login},
+                "repository": {"id": self.stack.repo_id},
+                "search": {
+                    "pageInfo": {
+                        "hasNextPage": end < len(prs),
+                        "endCursor": f"{end}",
+                    },
+                    "nodes": [self.node(pr) for pr in prs[start:end]],
+                },
+            }
+        }
+
+    def _update(self, mutation: str) -> Dict[str, Any]:
+        data = {}
+        heads = self.remote_hashes()
+        for match in update_pattern.finditer(mutation):
+            number = int(json.loads(match.group("id")).split("_")[1])
+            pr = self.pull_requests[number]
+            pr["baseRefName"] = json.loads(match.group("base"))
+            pr["title"] = json.loads(match.group("title"))
+            pr["body"] = json.loads(match.group("body"))
+            pr["headRefOid"] = heads[pr["headRefName"]]
+            pr["updatedAt"] = github.sync_time()
+            data[match.group("alias")] = {
+                "pullRequest": {
+                    name: pr[name] for name in ["id", "number", "headRefOid"]
+                }
+            }
+        if len(data) > github.update_chunk_size:
+            raise GitZenError(
+                exit_code.GITHUB_ERROR,
+                f"Too many updates in one mutation: {len(data)}",
+            )
+        return {"data": data}
+
+    def _gh(self, args: str) -> List[str]:
+        command, positional, options = github.parse_gh_args(shlex.split(args))
+        handlers: Dict[
+            str, Callable[[List[str], Dict[str, Optional[str]]], List[str]]
+        ] = {
+            "pr create": self._pr_create,
+            "pr close": self._pr_close,
+            "pr merge": self._pr_merge,
+        }
+        if command not in handlers:
+            raise GitZenError(
+                exit_code.GITHUB_ERROR,
+                f"Unsupported gh command: {args}",
+            )
+        with github.gh_span(args):
+            with self._lock:
+                lines = handlers[command](positional, options)
+            self.charge(len(args) + len("\n".join(lines)))
+            return lines
+
+    def charge(self, bytes: int) -> None:
+        if self.latency is not None:
+            self.latency.charge(bytes=bytes)
+
+    def _pr_create(
+        self,
+        positional: List[str],
+        options: Dict[str, Optional[str]],
+    ) -> List[str]:
+        head = f"{options['--head']}"
+        number = self.add(
+            head,
+            f"{options['--base']}",
+            f"{options['--title']}",
+            f"{options['--body']}",
+            self.remote_hash(head),
+            github.sync_time(),
+        )
+        return [f"https://github.com/bench/bench/pull/{number}"]
+
+    def _pr_close(
+        self,
+        positional: List[str],
+        options: Dict[str, Optional[str]],
+    ) -> List[str]:
+        pr = self.pull_requests[int(positional[0])]
+        pr["state"] = "CLOSED"
+        pr["updatedAt"] = github.sync_time()
+        return []
+
+    def _pr_merge(
+        self,
+        positional: List[str],
+        options: Dict[str, Optional[str]],
+    ) -> List[str]:
+        pr = self.pull_requests[int(positional[0])]
+        token = pr["headRefName"].split("/")[-1]
+        subprocess.run(
+            [
+                "git",
+                "fetch",
+                "--quiet",
+                self.stack.repo_dir,
+                f"refs/gitzen/patches/{token}:refs/heads/master",
+            ],
+            cwd=self.stack.origin_dir,
+            check=True,
+        )
+        pr["state"] = "MERGED"
+        pr["updatedAt"] = github.sync_time()
+        return []
+
+    def remote_hash(self, branch: str) -> str:
+        return self.remote_hashes()[branch]
+
+    def remote_hashes(self) -> Dict[str, str]:
+        """
+        Returns the hash of each branch of the origin repo.
+        """
+        lines = subprocess.run(
+            [
+                "git",
+                "for-each-ref",
+                "--format=%(objectname) %(refname:lstrip=2)",
+                "refs/heads/",
+            ],
+            cwd=self.stack.origin_dir,
+            check=True,
+            stdout=subprocess.PIPE,
+            text=True,
+        ).stdout.splitlines()
+        return {
+            branch: hash
+            for hash, branch in (line.split(" ", 1) for line in lines)
+        }
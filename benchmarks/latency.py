@@ -0,0 +1,102 @@
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from gitzen import git, logger
+
+# The round trips each git command that talks to the remote makes: one
+# for the refs the remote advertises, and one to send or receive the pack
+remote_round_trips = {
+    "clone": 2,
+    "fetch": 2,
+    "ls-remote": 1,
+    "pull": 2,
+    "push": 2,
+}
+
+
+class LatencyModel:
+    """
+    Charges each remote call the time it would take over a network: the
+    round trips it makes, plus its bytes at the bandwidth. A bandwidth of
+    0 is unlimited. The time is slept, so calls made concurrently overlap
+    as they would for real.
+    """
+
+    rtt: float
+    bandwidth: float
+    charged: float
+    calls: int
+    _sleep: Callable[[float], None]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        rtt: float,
+        bandwidth: float = 0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+        self.charged = 0
+        self.calls = 0
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            f"LatencyModel(rtt={self.rtt}, "
+            f"bandwidth={self.bandwidth}, "
+            f"charged={self.charged}, "
+            f"calls={self.calls})"
+        )
+
+    def cost(self, round_trips: int = 1, bytes: int = 0) -> float:
+        transfer = 0 if self.bandwidth == 0 else bytes / self.bandwidth
+        return round_trips * self.rtt + transfer
+
+    def charge(self, round_trips: int = 1, bytes: int = 0) -> None:
+        seconds = self.cost(round_trips, bytes)
+        with self._lock:
+            self.charged += seconds
+            self.calls += 1
+        self._sleep(seconds)
+
+
+class LatencyGitEnv(git.RealEnv):
+    """
+    Runs git for real, charging each command that talks to the remote the
+    latency of its round trips, as if the remote repo, usually a local
+    bare repo, were across a network.
+    """
+
+    latency: LatencyModel
+
+    def __init__(self, logger_env: logger.Env, latency: LatencyModel) -> None:
+        super().__init__(logger_env)
+        self.latency = latency
+
+    def _git(self, args: str) -> Tuple[Optional[int], List[str]]:
+        self._charge(args)
+        return super()._git(args)
+
+    def _git_stdin(
+        self,
+        args: str,
+        input: str,
+    ) -> Tuple[Optional[int], List[str]]:
+        self._charge(args)
+        return super()._git_stdin(args, input)
+
+    def _git_output(
+        self,
+        args: str,
+        input: Optional[str] = None,
+    ) -> Tuple[Optional[int], bytes]:
+        self._charge(args)
+        return super()._git_output(args, input)
+
+    def _charge(self, args: str) -> None:
+        round_trips = remote_round_trips.get(args.split(" ", 1)[0], 0)
+        if round_trips > 0:
+            self.latency.charge(round_trips)
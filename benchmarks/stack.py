@@ -0,0 +1,233 @@
+import os
+import shutil
+import subprocess
+from typing import Dict, List, Optional
+
+# Commits are dated so the same size always gives the same hashes
+commit_time = "1700000000 +0000"
+author = "Bench <bench@example.com>"
+
+
+class SyntheticStack:
+    """
+    A repo whose local branch has a stack of commits on top of the remote
+    branch. Each commit has its patch ref, a pr branch already pushed to
+    the origin repo, and an open pull request. The top commit has been
+    amended since it was pushed.
+    """
+
+    size: int
+    dir: str
+    login: str
+    repo_id: str
+    tokens: List[str]
+    commits: List[str]
+    pr_heads: List[str]
+
+    def __init__(
+        self,
+        size: int,
+        dir: str,
+        login: str,
+        repo_id: str,
+        tokens: List[str],
+        commits: List[str],
+        pr_heads: List[str],
+    ) -> None:
+        self.size = size
+        self.dir = dir
+        self.login = login
+        self.repo_id = repo_id
+        self.tokens = tokens
+        self.commits = commits
+        self.pr_heads = pr_heads
+
+    def __repr__(self) -> str:
+        return f"SyntheticStack(size={self.size}, dir={self.dir})"
+
+    @property
+    def repo_dir(self) -> str:
+        return f"{self.dir}/repo"
+
+    @property
+    def origin_dir(self) -> str:
+        return f"{self.dir}/origin"
+
+    def pr_branch(self, index: int) -> str:
+        return f"gitzen/pr/{self.login}/{self.tokens[index]}"
+
+
+def generate(size: int, dir: str) -> SyntheticStack:
+    """
+    Writes the repo and its origin repo into dir, with every object and
+    ref created by a single fast-import.
+    """
+    login = "bench"
+    tokens = [f"{index + 1:08x}" for index in range(size)]
+    origin_dir = f"{dir}/origin"
+    repo_dir = f"{dir}/repo"
+    run(["git", "init", "--quiet", "--bare", origin_dir])
+    run(["git", "init", "--quiet", "-b", "master", repo_dir])
+    for args in [
+        ["remote", "add", "origin", origin_dir],
+        ["config", "user.email", "bench@example.com"],
+        ["config", "user.name", "Bench"],
+    ]:
+        run(["git", *args], repo_dir)
+    marks = fast_import(repo_dir, stream(login, tokens))
+    run(["git", "reset", "--quiet", "--hard", "master"], repo_dir)
+    run(
+        [
+            "git",
+            "push",
+            "--quiet",
+            "origin",
+            f"{marks[1]}:refs/heads/master",
+            "refs/heads/gitzen/pr/*:refs/heads/gitzen/pr/*",
+        ],
+        repo_dir,
+    )
+    run(["git", "fetch", "--quiet", "origin"], repo_dir)
+    return SyntheticStack(
+        size,
+        dir,
+        login,
+        "R_bench",
+        tokens,
+        [marks[commit_mark(index)] for index in range(size)],
+        [marks[pr_mark(size, index)] for index in range(size)],
+    )
+
+
+def stream(login: str, tokens: List[str]) -> List[str]:
+    """
+    Returns the fast-import commands for the first commit, the stack of
+    commits on master, their patch refs and their pr branches. Each commit
+    adds a file, so each pr branch commit has the tree of its commit.
+    """
+    size = len(tokens)
+    lines = fast_commit("refs/heads/master", 1, None, "First commit", {})
+    for index, token in enumerate(tokens):
+        top = index == size - 1
+        lines += fast_commit(
+            "refs/heads/master",
+            commit_mark(index),
+            None,
+            f"Change {index + 1}\n\nzen-token:{token}\n",
+            {filename(index): f"{index + 1}{' amended' if top else ''}"},
+        )
+        lines += [
+            f"reset refs/gitzen/patches/{token}",
+            f"from :{commit_mark(index)}",
+            "",
+        ]
+    for index, token in enumerate(tokens):
+        lines += fast_commit(
+            f"refs/heads/gitzen/pr/{login}/{token}",
+            pr_mark(size, index),
+            1 if index == 0 else pr_mark(size, index - 1),
+            f"Change {index + 1}",
+            {filename(index): f"{index + 1}"},
+        )
+    return lines
+
+
+def fast_commit(
+    ref: str,
+    mark: int,
+    parent: Optional[int],
+    message: str,
+    files: Dict[str, str],
+) -> List[str]:
+    data = message.encode()
+    lines = [
+        f"commit {ref}",
+        f"mark :{mark}",
+        f"committer {author} {commit_time}",
+        f"data {len(data)}",
+        message,
+    ]
+    if parent is not None:
+        lines.append(f"from :{parent}")
+    for filename, contents in files.items():
+        lines += [f"M 644 inline {filename}", f"data {len(contents) + 1}"]
+        lines.append(contents)
+    lines.append("")
+    return lines
+
+
+def filename(index: int) -> str:
+    """
+    The files are spread over directories, as a single tree of them all
+    would be rewritten by every commit.
+    """
+    return f"dir-{index // 100}/file-{index + 1}"
+
+
+def commit_mark(index: int) -> int:
+    return index + 2
+
+
+def pr_mark(size: int, index: int) -> int:
+    return size + index + 2
+
+
+def fast_import(repo_dir: str, lines: List[str]) -> Dict[int, str]:
+    """
+    Returns the hash of each mark.
+    """
+    marks_file = f"{repo_dir}/.git/bench-marks"
+    subprocess.run(
+        ["git", "fast-import", "--quiet", f"--export-marks={marks_file}"],
+        cwd=repo_dir,
+        input="\n".join(lines) + "\n",
+        text=True,
+        check=True,
+    )
+    marks = {}
+    with open(marks_file) as f:
+        for line in f:
+            mark, hash = line.split()
+            marks[int(mark[1:])] = hash
+    os.remove(marks_file)
+    return marks
+
+
+def copy(stack: SyntheticStack, dir: str) -> SyntheticStack:
+    """
+    Returns a copy of the stack in dir, to be changed by a command.
+    """
+    shutil.copytree(stack.dir, dir, symlinks=True)
+    run(["git", "remote", "set-url", "origin", f"{dir}/origin"], f"{dir}/repo")
+    # the copied index has stale file times, which the next git status
+    # would otherwise spend time refreshing
+    run(["git", "update-index", "-q", "--refresh"], f"{dir}/repo")
+    return SyntheticStack(
+        stack.size,
+        dir,
+        stack.login,
+        stack.repo_id,
+        stack.tokens,
+        stack.commits,
+        stack.pr_heads,
+    )
+
+
+def run(args: List[str], cwd: Optional[str] = None) -> None:
+    subprocess.run(args, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+
+
+def log_records(size: int) -> List[List[str]]:
+    """
+    The records `git log` gives for the commit stack of a stack of size
+    commits, as read by parse_log_records.
+    """
+    return [
+        [
+            f"{index:040x}",
+            f"Commit {index}",
+            f"Details of commit {index}\n\nzen-token:{index:08x}\n",
+            f"{index:08x}\n",
+        ]
+        for index in range(size)
+    ]
@@ -0,0 +1,229 @@
+import json
+import os
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from gitzen import config, console, file, git, logger, trace
+from gitzen.commands import merge, push, status
+from gitzen.types import GitRootDir
+
+from . import stack
+from .github_env import SyntheticGithubEnv
+from .latency import LatencyGitEnv, LatencyModel
+from .stack import SyntheticStack
+
+sizes = [10, 100, 1_000, 10_000]
+baseline_file = f"{os.path.dirname(__file__)}/baseline.json"
+# measured with latency, whose wall times aren't comparable
+latency_baseline_file = f"{os.path.dirname(__file__)}/latency_baseline.json"
+
+# How far each metric may go over its baseline before it is a regression,
+# as a fraction of the baseline plus an allowance for noise
+tolerances = {
+    "wall_time": (0.5, 0.25),
+    "peak_memory": (0.25, 1_000_000),
+    "git_calls": (0.0, 0),
+    "github_calls": (0.0, 0),
+    "file_calls": (0.0, 0),
+    "remote_time": (0.1, 0.05),
+}
+
+Metrics = Dict[str, float]
+Command = Callable[
+    [console.Env, file.Env, git.Env, SyntheticGithubEnv, config.Config],
+    None,
+]
+
+
+def run_status(
+    console_env: console.Env,
+    file_env: file.Env,
+    git_env: git.Env,
+    github_env: SyntheticGithubEnv,
+    cfg: config.Config,
+) -> None:
+    status.status(console_env, file_env, git_env, github_env, cfg)
+
+
+def run_push(
+    console_env: console.Env,
+    file_env: file.Env,
+    git_env: git.Env,
+    github_env: SyntheticGithubEnv,
+    cfg: config.Config,
+) -> None:
+    push.push(console_env, file_env, git_env, github_env, cfg)
+
+
+def run_merge(
+    console_env: console.Env,
+    file_env: file.Env,
+    git_env: git.Env,
+    github_env: SyntheticGithubEnv,
+    cfg: config.Config,
+) -> None:
+    merge.merge(console_env, file_env, git_env, github_env, cfg)
+
+
+# status syncs every pull request, push rebuilds the amended top commit
+# and merge merges the bottom one, which moves every pr branch after it
+commands: Dict[str, Command] = {
+    "status": run_status,
+    "push": run_push,
+    "merge": run_merge,
+}
+
+
+def github_latency() -> LatencyModel:
+    """
+    Typical of the Github API from a developer's machine.
+    """
+    return LatencyModel(rtt=0.1, bandwidth=1_000_000)
+
+
+def remote_latency() -> LatencyModel:
+    """
+    Typical of a git host, per round trip.
+    """
+    return LatencyModel(rtt=0.05)
+
+
+def measure(
+    name: str,
+    template: SyntheticStack,
+    dir: str,
+    memory: bool = False,
+    latency: bool = False,
+) -> Metrics:
+    """
+    Runs the command on a copy of the stack, returning its wall time and
+    the calls made to each Env, or the peak memory allocated by Python
+    when memory is set, as tracing the allocations slows the command.
+
+    With latency, the calls to Github and to the remote repo are charged
+    the time they would take over a network, which is also returned as
+    the remote time.
+    """
+    synthetic = stack.copy(template, dir)
+    github_model = github_latency() if latency else None
+    remote_model = remote_latency() if latency else None
+    github_env = SyntheticGithubEnv(synthetic, github_model)
+    logger_env = logger.Env()
+    file_env = file.RealEnv(logger_env)
+    git_env = (
+        git.RealEnv(logger_env)
+        if remote_model is None
+        else LatencyGitEnv(logger_env, remote_model)
+    )
+    cfg = config.default_config(GitRootDir(synthetic.repo_dir))
+    cwd = os.getcwd()
+    os.chdir(synthetic.repo_dir)
+    if memory:
+        tracemalloc.start()
+    trace.start()
+    start = time.perf_counter()
+    try:
+        commands[name](console.Env(), file_env, git_env, github_env, cfg)
+    except SystemExit as exit:
+        if exit.code:
+            raise RuntimeError(f"{name} exited with {exit.code}")
+    finally:
+        wall_time = time.perf_counter() - start
+        events = trace.chrome_trace()["traceEvents"]
+        trace.stop()
+        git.close(git_env)
+        os.chdir(cwd)
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {"peak_memory": peak}
+    calls = Counter(event["cat"] for event in events)
+    metrics: Metrics = {
+        "wall_time": round(wall_time, 3),
+        "git_calls": calls["git"],
+        "github_calls": calls["github"],
+        "file_calls": calls["file"],
+    }
+    if github_model is not None and remote_model is not None:
+        remote_time = github_model.charged + remote_model.charged
+        metrics["remote_time"] = round(remote_time, 3)
+    return metrics
+
+
+def run(
+    dir: str,
+    names: List[str],
+    run_sizes: List[int],
+    report: Callable[[str, Metrics], None],
+    latency: bool = False,
+) -> Dict[str, Metrics]:
+    """
+    Measures each command on a stack of each size, keyed by command and
+    size, e.g. push/100. The stack of each size is generated once.
+    """
+    results = {}
+    for size in run_sizes:
+        template = stack.generate(size, f"{dir}/{size}")
+        for name in names:
+            key = f"{name}/{size}"
+            run_dir = f"{dir}/{size}-{name}"
+            results[key] = {
+                **measure(name, template, run_dir, latency=latency),
+                **measure(name, template, f"{run_dir}-memory", memory=True),
+            }
+            report(key, results[key])
+    return results
+
+
+def regressions(
+    results: Dict[str, Metrics],
+    baseline: Dict[str, Metrics],
+) -> List[str]:
+    """
+    Describes each metric that has gone over its tolerance of the
+    baseline. Metrics without a baseline are not checked.
+    """
+    found = []
+    for key, metrics in results.items():
+        expected = baseline.get(key, {})
+        for metric, value in metrics.items():
+            if metric not in expected:
+                continue
+            fraction, allowance = tolerances[metric]
+            limit = expected[metric] * (1 + fraction) + allowance
+            if value > limit:
+                found.append(
+                    f"{key} {metric}: {value} is over {limit:g}"
+                    f" (baseline {expected[metric]})"
+                )
+    return found
+
+
+def order(item: Tuple[str, Metrics]) -> Tuple[str, int]:
+    name, size = item[0].split("/")
+    return name, int(size)
+
+
+def load_baseline(filename: str = baseline_file) -> Dict[str, Metrics]:
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(
+    results: Dict[str, Metrics],
+    filename: str = baseline_file,
+    baseline: Optional[Dict[str, Metrics]] = None,
+) -> None:
+    """
+    Replaces the baseline of the measured commands and sizes, keeping the
+    rest.
+    """
+    updated = {**(baseline or {}), **results}
+    with open(filename, "w") as f:
+        json.dump(dict(sorted(updated.items(), key=order)), f, indent=2)
+        f.write("\n")
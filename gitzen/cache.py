@@ -0,0 +1,306 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from gitzen import file, git
+from gitzen.models.commit_cache import CommitCache
+from gitzen.models.git_commit import GitCommit
+from gitzen.models.github_commit import GithubCommit
+from gitzen.models.github_pull_request import PullRequest
+from gitzen.models.pull_request_snapshot import PullRequestSnapshot
+from gitzen.types import (
+    CommitBody,
+    CommitHash,
+    CommitTitle,
+    CommitWipStatus,
+    GitBranchName,
+    GithubRepoId,
+    GithubUsername,
+    PullRequestBody,
+    PullRequestId,
+    PullRequestMergeable,
+    PullRequestNumber,
+    PullRequestReviewDecision,
+    PullRequestTitle,
+    ZenToken,
+)
+
+# Bump when the layout of a cache file changes, so older files are ignored
+cache_version = 1
+max_cached_commits = 5000
+
+
+# What this process last read from or wrote to each cache file, with the
+# version of the file, so a long-lived process such as the daemon only
+# parses a file again once something else has changed it
+_parsed: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+
+
+def cache_dir(git_env: git.Env) -> str:
+    return f"{git.git_dir(git_env)}/gitzen"
+
+
+def read_cache_file(file_env: file.Env, filename: str) -> Dict[str, Any]:
+    """
+    Returns the contents of the cache file, or an empty dict if it is
+    missing, unreadable or from another version.
+    """
+    try:
+        with file.io_read(file_env, filename) as f:
+            contents = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(contents, dict):
+        return {}
+    if contents.get("version") != cache_version:
+        return {}
+    return contents
+
+
+def parsed(file_env: file.Env, filename: str) -> Optional[Any]:
+    """
+    Returns what was last read from or written to the file, if it has not
+    changed since.
+    """
+    entry = _parsed.get(filename)
+    if entry is None or entry[0] != file.version(file_env, filename):
+        return None
+    return entry[1]
+
+
+def remember(file_env: file.Env, filename: str, value: Any) -> None:
+    version = file.version(file_env, filename)
+    if version is not None:
+        _parsed[filename] = (version, value)
+
+
+def write_cache_file(
+    file_env: file.Env,
+    git_env: git.Env,
+    filename: str,
+    contents: Dict[str, Any],
+) -> None:
+    file.make_dirs(file_env, cache_dir(git_env))
+    # written aside, then moved over the cache file, so another process
+    # reading it meanwhile, e.g. a background sync, finds it whole
+    temporary = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with file.io_write(file_env, temporary) as f:
+            json.dump({"version": cache_version, **contents}, f)
+        file.replace(file_env, temporary, filename)
+    except BaseException:
+        file.remove(file_env, temporary)
+        raise
+
+
+def commits_file(git_env: git.Env) -> str:
+    return f"{cache_dir(git_env)}/commits.json"
+
+
+def load_commits(
+    file_env: file.Env,
+    git_env: git.Env,
+    max_size: int = max_cached_commits,
+) -> CommitCache:
+    filename = commits_file(git_env)
+    remembered = parsed(file_env, filename)
+    if remembered is not None:
+        return CommitCache(max_size, remembered)
+    contents = read_cache_file(file_env, filename)
+    commits: List[GitCommit] = []
+    try:
+        for hash, token, headline, body, wip in contents.get("commits", []):
+            commits.append(
+                GitCommit(
+                    zen_token=ZenToken(token),
+                    hash=CommitHash(hash),
+                    headline=CommitTitle(headline),
+                    body=CommitBody(body),
+                    wip=CommitWipStatus(wip),
+                )
+            )
+    except (TypeError, ValueError):
+        commits = []
+    remember(file_env, filename, commits)
+    return CommitCache(max_size, commits)
+
+
+def save_commits(
+    file_env: file.Env,
+    git_env: git.Env,
+    commit_cache: CommitCache,
+) -> None:
+    filename = commits_file(git_env)
+    write_cache_file(
+        file_env,
+        git_env,
+        filename,
+        {
+            "commits": [
+                [
+                    commit.hash.value,
+                    commit.zen_token.value,
+                    commit.messageHeadline.value,
+                    commit.messageBody.value,
+                    commit.wip.value,
+                ]
+                for commit in commit_cache.commits
+            ]
+        },
+    )
+    remember(file_env, filename, commit_cache.commits)
+
+
+def pull_requests_file(git_env: git.Env) -> str:
+    return f"{cache_dir(git_env)}/pull_requests.json"
+
+
+def load_pull_requests(
+    file_env: file.Env,
+    git_env: git.Env,
+) -> Optional[PullRequestSnapshot]:
+    """
+    Returns the pull requests from the last sync, or None if there has
+    not been one.
+    """
+    filename = pull_requests_file(git_env)
+    snapshot = parsed(file_env, filename)
+    if snapshot is None:
+        contents = read_cache_file(file_env, filename)
+        try:
+            snapshot = PullRequestSnapshot(
+                contents["synced_at"],
+                GithubUsername(contents["login"]),
+                GithubRepoId(contents["repo_id"]),
+                [
+                    (entry["updated_at"], pull_request_from_json(entry))
+                    for entry in contents["pull_requests"]
+                ],
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+        remember(file_env, filename, snapshot)
+    return copy_snapshot(snapshot)
+
+
+def save_pull_requests(
+    file_env: file.Env,
+    git_env: git.Env,
+    snapshot: PullRequestSnapshot,
+) -> None:
+    filename = pull_requests_file(git_env)
+    write_cache_file(
+        file_env,
+        git_env,
+        filename,
+        {
+            "synced_at": snapshot.synced_at,
+            "login": snapshot.login.value,
+            "repo_id": snapshot.repo_id.value,
+            "pull_requests": [
+                {"updated_at": updated_at, **pull_request_to_json(pr)}
+                for updated_at, pr in snapshot.entries
+            ],
+        },
+    )
+    remember(file_env, filename, copy_snapshot(snapshot))
+
+
+def copy_snapshot(snapshot: PullRequestSnapshot) -> PullRequestSnapshot:
+    return PullRequestSnapshot(
+        snapshot.synced_at,
+        snapshot.login,
+        snapshot.repo_id,
+        snapshot.entries,
+    )
+
+
+def pull_request_to_json(pr: PullRequest) -> Dict[str, Any]:
+    return {
+        "id": pr.id.value,
+        "zen_token": pr.zen_token.value,
+        "number": pr.number.value,
+        "author": pr.author.value,
+        "title": pr.title.value,
+        "body": pr.body.value,
+        "base": pr.baseRefName.value,
+        "head": pr.headRefName.value,
+        "head_hash": pr.headHash.value,
+        "mergeable": pr.mergeable.value,
+        "review_decision": pr.reviewDecision.value,
+        "repo_id": pr.repoId.value,
+        "commits": [
+            [
+                None if commit.zen_token is None else commit.zen_token.value,
+                commit.hash.value,
+                commit.messageHeadline.value,
+                commit.messageBody.value,
+                commit.wip.value,
+            ]
+            for commit in pr.commits
+        ],
+    }
+
+
+def pull_request_from_json(entry: Dict[str, Any]) -> PullRequest:
+    commits = []
+    for token, hash, headline, body, wip in entry["commits"]:
+        commits.append(
+            GithubCommit(
+                zen_token=None if token is None else ZenToken(token),
+                hash=CommitHash(hash),
+                headline=CommitTitle(headline),
+                body=CommitBody(body),
+                wip=CommitWipStatus(wip),
+            )
+        )
+    return PullRequest(
+        PullRequestId(entry["id"]),
+        ZenToken(entry["zen_token"]),
+        PullRequestNumber(entry["number"]),
+        GithubUsername(entry["author"]),
+        PullRequestTitle(entry["title"]),
+        PullRequestBody(entry["body"]),
+        GitBranchName(entry["base"]),
+        GitBranchName(entry["head"]),
+        CommitHash(entry["head_hash"]),
+        PullRequestMergeable(entry["mergeable"]),
+        PullRequestReviewDecision(entry["review_decision"]),
+        GithubRepoId(entry["repo_id"]),
+        commits,
+    )
+
+
+def etags_file(git_env: git.Env) -> str:
+    return f"{cache_dir(git_env)}/etags.json"
+
+
+def load_etags(
+    file_env: file.Env,
+    git_env: git.Env,
+) -> Dict[str, Tuple[str, Any]]:
+    """
+    Returns the last response to each Github GET request, with its ETag.
+    """
+    contents = read_cache_file(file_env, etags_file(git_env))
+    try:
+        return {
+            path: (etag, response)
+            for path, (etag, response) in contents.get("etags", {}).items()
+        }
+    except (AttributeError, TypeError, ValueError):
+        return {}
+
+
+def save_etags(
+    file_env: file.Env,
+    git_env: git.Env,
+    etags: Dict[str, Tuple[str, Any]],
+) -> None:
+    write_cache_file(
+        file_env,
+        git_env,
+        etags_file(git_env),
+        {"etags": {path: list(entry) for path, entry in etags.items()}},
+    )
@@ -1,46 +1,136 @@
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Optional
 
-from gitzen import config, console, file, git, github, logger
-from gitzen.commands import hook, init, merge, push, status
+from gitzen import console, file, logger, trace
+from gitzen.commands import registry
+from gitzen.models.command_context import CommandContext
+
+if TYPE_CHECKING:
+    # only imported when profiling
+    from gitzen import profile
 
 
 def main(args: List[str]) -> None:
-    logs: List[str] = []
-    console_env, file_env, git_env, github_env = environments(logs)
-    root_dir = git.root_dir(git_env)
-    cfg = config.load(console_env, file_env, root_dir)
     args.pop(0)  # remove commands own name
-    while len(args) > 0:
-        arg = args[0]
-        args.pop(0)
-        if arg == "--log":
-            logs.extend(args[0].split(","))
-            console_env, file_env, git_env, github_env = environments(logs)
-        if arg == "init":
-            init.install_hook(console_env, file_env, root_dir)
-            return
-        if arg == "hook":
-            hook.main(file_env, args[0])
-            return
-        if arg == "status":
-            status.status(console_env, git_env, github_env)
-            return
-        if arg == "push":
-            push.push(console_env, file_env, git_env, github_env, cfg)
-            return
-        if arg == "merge":
-            merge.merge(console_env, file_env, git_env, github_env, cfg)
-            return
-    print("ERROR: no recognised command found")
-
-
-def environments(
+    logs: List[str] = []
+    trace_file: Optional[str] = None
+    profile_file: Optional[str] = None
+    while len(args) > 1 and args[0] in ["--log", "--trace", "--profile"]:
+        if args[0] == "--log":
+            logs.extend(args[1].split(","))
+        elif args[0] == "--trace":
+            trace_file = args[1]
+        else:
+            profile_file = args[1]
+        del args[:2]
+    command = registry.find(args[0]) if len(args) > 0 else None
+    if command is None:
+        print("ERROR: no recognised command found")
+        return
+    if trace_file is not None:
+        trace.start()
+    profiler = None
+    if profile_file is not None:
+        from gitzen import profile
+
+        profiler = profile.start()
+    try:
+        with trace.span(command.name, "command", args=args[1:]):
+            context = prepare(logs, command.needs)
+            try:
+                command.load()(context, args[1:])
+            finally:
+                context.close()
+    finally:
+        if profiler is not None and profile_file is not None:
+            save_profile(logs, profiler, profile_file)
+        if trace_file is not None:
+            save_trace(logs, trace_file)
+
+
+def save_trace(log_sections: List[str], filename: str) -> None:
+    """
+    Writes the spans recorded while running the command as Chrome trace
+    event JSON, for chrome://tracing or Perfetto.
+    """
+    import json
+
+    events = trace.chrome_trace()
+    trace.stop()
+    file_env = file.RealEnv(logger.RealEnv(log_sections))
+    with file.io_write(file_env, filename) as f:
+        json.dump(events, f)
+
+
+def save_profile(
     log_sections: List[str],
-) -> Tuple[console.Env, file.Env, git.Env, github.Env]:
+    profiler: "profile.Profiler",
+    filename: str,
+) -> None:
+    """
+    Writes the command's profile as pstats to <filename>.pstats, and its
+    sampled stacks to <filename>.collapsed for flame graphs, reporting the
+    time spent in Python and blocked on git and Github.
+    """
+    import sys
+
+    from gitzen import profile
+
+    profiler.stop()
+    profiler.dump_stats(f"{filename}.pstats")
+    file_env = file.RealEnv(logger.RealEnv(log_sections))
+    with file.io_write(file_env, f"{filename}.collapsed") as f:
+        f.writelines(f"{line}\n" for line in profiler.collapsed())
+    print(f"Profile: {profile.summary(profiler)}", file=sys.stderr)
+
+
+def prepare(log_sections: List[str], needs: int) -> CommandContext:
+    """
+    Sets up only what the command needs, importing the modules for it
+    here, so commands that need less start sooner.
+    """
     logger_env = logger.RealEnv(log_sections)
-    return (
-        console.RealEnv(log_sections),
-        file.RealEnv(logger_env),
-        git.RealEnv(logger_env),
-        github.RealEnv(logger_env),
+    console_env = console.RealEnv(log_sections)
+    file_env = file.RealEnv(logger_env)
+    if needs < registry.NEEDS_REPO:
+        return CommandContext(log_sections, console_env, file_env)
+    from gitzen import git
+
+    git_env = git.RealEnv(logger_env)
+    root_dir = git.root_dir(git_env)
+    if needs < registry.NEEDS_CONFIG:
+        return CommandContext(
+            log_sections,
+            console_env,
+            file_env,
+            git_env,
+            root_dir,
+        )
+    from gitzen import config
+
+    cfg = config.load(console_env, file_env, root_dir)
+    if needs < registry.NEEDS_GITHUB:
+        return CommandContext(
+            log_sections,
+            console_env,
+            file_env,
+            git_env,
+            root_dir,
+            cfg,
+        )
+    from gitzen import github
+
+    github_env = github.new_env(
+        logger_env,
+        file_env,
+        git_env,
+        cfg.github_client,
+    )
+    return CommandContext(
+        log_sections,
+        console_env,
+        file_env,
+        git_env,
+        root_dir,
+        cfg,
+        github_env,
     )
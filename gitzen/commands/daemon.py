@@ -0,0 +1,49 @@
+from typing import List
+
+from gitzen import console, daemon, daemon_client, file, git, github, logger
+from gitzen.commands import registry
+from gitzen.models.command_context import CommandContext
+
+
+def run_command(context: CommandContext, args: List[str]) -> None:
+    """
+    Serves the commands forwarded from the CLI for this repo, until
+    stopped with `daemon --stop`.
+    """
+    console_env = context.console_env
+    if "--stop" in args:
+        if not daemon_client.stop(context.root_dir.value):
+            console.info(console_env, "No gitzen daemon is running")
+        return
+    file_env = context.file_env
+    logger_env = logger.RealEnv(context.log_sections)
+    git_dir = git.git_dir(context.git_env)
+    file.make_dirs(file_env, f"{git_dir}/gitzen")
+    warm = daemon.Daemon(
+        context.log_sections,
+        file_env,
+        git.RealEnv(logger_env),
+        context.root_dir,
+        lambda: git.RealEnv(logger_env),
+        lambda git_env, cfg: github.new_env(
+            logger_env,
+            file_env,
+            git_env,
+            cfg.github_client,
+        ),
+        dispatch,
+    )
+    path = daemon_client.socket_path(git_dir)
+    console.info(console_env, f"gitzen daemon listening on {path}")
+    try:
+        daemon.serve(path, warm.run)
+    finally:
+        warm.close()
+
+
+def dispatch(context: CommandContext, args: List[str]) -> None:
+    command = registry.find(args[0])
+    if command is None:
+        console.error(context.console_env, "no recognised command found")
+        return
+    command.load()(context, args[1:])
@@ -1,8 +1,24 @@
+import os
 import re
-from random import choice
-from string import hexdigits
+from typing import TYPE_CHECKING, List
 
-from gitzen import file, patterns
+from gitzen import file, logger, patterns
+
+if TYPE_CHECKING:
+    # not imported by git-zen-hook, which has no context
+    from gitzen.models.command_context import CommandContext
+
+
+def run_command(context: "CommandContext", args: List[str]) -> None:
+    main(context.file_env, args[0])
+
+
+def run(args: List[str]) -> None:
+    """
+    The entry point of git-zen-hook, which is run for every commit, so it
+    only imports this module, and doesn't look up the repo or config.
+    """
+    main(file.RealEnv(logger.Env()), args[1])
 
 
 def main(file_env: file.Env, filename: str) -> None:
@@ -28,7 +44,7 @@ def handle_commit_message(file_env: file.Env, filename: str) -> None:
 # We want to deal with it as a str, rather then ZenToken as we
 # are only about to insert the value into another str.
 def gen_zen_token() -> str:
-    return "".join(choice(hexdigits) for i in range(8)).lower()
+    return os.urandom(4).hex()
 
 
 def handle_interactive_rebase(file_env: file.Env, filename: str) -> None:
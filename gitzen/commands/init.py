@@ -1,11 +1,17 @@
 import os
 import stat
+from typing import List
 
 from gitzen import console, file
 from gitzen.console import info
+from gitzen.models.command_context import CommandContext
 from gitzen.types import GitRootDir
 
 
+def run_command(context: CommandContext, args: List[str]) -> None:
+    install_hook(context.console_env, context.file_env, context.root_dir)
+
+
 def install_hook(
     console_env: console.Env,
     file_env: file.Env,
@@ -17,7 +23,7 @@ def install_hook(
         hook,
         [
             "#!/usr/bin/env bash",
-            "git zen hook $1",
+            'exec git-zen-hook "$1"',
             "",
         ],
     )
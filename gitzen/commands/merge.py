@@ -1,5 +1,20 @@
+from typing import List
+
 from gitzen import config, console, exit_code, file, git, github, logger
-from gitzen.commands.push import prepare_patches, push
+from gitzen.commands.push import commit_tree_hash, prepare_patches, push
+from gitzen.models.command_context import CommandContext
+from gitzen.models.commit_branches import CommitBranches
+from gitzen.types import GitBranchName
+
+
+def run_command(context: CommandContext, args: List[str]) -> None:
+    merge(
+        context.console_env,
+        context.file_env,
+        context.git_env,
+        context.github_env,
+        context.cfg,
+    )
 
 
 def merge(
@@ -9,7 +24,7 @@ def merge(
     github_env: github.Env,
     cfg: config.Config,
 ) -> None:
-    status, stack = prepare_patches(
+    _, stack = prepare_patches(
         console_env,
         file_env,
         git_env,
@@ -18,14 +33,13 @@ def merge(
     )
     my_pr = stack[0].pull_request
     if my_pr:
-        gh_pr = status.pull_requests[0]
-        if my_pr.headHash == gh_pr.headHash:
+        if pr_is_up_to_date(git_env, stack[0]):
             console.info(
                 console_env,
-                f"Merge Pull Request {gh_pr.number.value} {gh_pr.title.value}",
+                f"Merge Pull Request {my_pr.number.value} {my_pr.title.value}",
             )
-            github.merge_squash(github_env, gh_pr)
-            git.delete_patch(gh_pr.zen_token, cfg.root_dir)
+            github.merge_squash(github_env, my_pr)
+            git.delete_patch(git_env, my_pr.zen_token)
             remote_branch = cfg.default_branch
             git.switch(git_env, remote_branch)
             pull_log = git.pull(git_env, cfg.remote, remote_branch)
@@ -58,3 +72,22 @@ def merge(
             exit(exit_code.LOCAL_COMMIT_REMOTE_PR_DIFFERENT_HASH)
     else:
         console.info(console_env, "No Pull Requests to be merged.")
+
+
+def pr_is_up_to_date(
+    git_env: git.Env,
+    commit_branches: CommitBranches,
+) -> bool:
+    """
+    The pull request is up to date when its head has the tree of the local
+    commit. It is the pull request of the commit that is compared, as the
+    pull requests are not numbered in stack order.
+    """
+    pr = commit_branches.pull_request
+    if pr is None:
+        return False
+    head = git.read_commit(git_env, GitBranchName(pr.headHash.value))
+    return head is not None and head.tree == commit_tree_hash(
+        git_env,
+        commit_branches.git_commit,
+    )
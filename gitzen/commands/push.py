@@ -1,8 +1,27 @@
-from typing import Dict, List, Optional, Tuple
+import json
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
-# trunk-ignore(flake8/E501)
-from gitzen import branches, config, console, exit_code, file, git, github, logger, repo
+from gitzen import (
+    branches,
+    config,
+    console,
+    exit_code,
+    file,
+    git,
+    github,
+    journal,
+    repo,
+    trace,
+)
 from gitzen.config import Config
+from gitzen.models.command_context import CommandContext
 from gitzen.models.commit_branches import CommitBranches
 from gitzen.models.commit_pr import CommitPr
 from gitzen.models.git_commit import GitCommit
@@ -10,54 +29,98 @@ from gitzen.models.git_patch import GitPatch
 from gitzen.models.github_info import GithubInfo
 from gitzen.models.github_pull_request import PullRequest
 from gitzen.models.gitzen_error import GitZenError
+from gitzen.models.pull_request_update import PullRequestUpdate
+from gitzen.models.push_journal import PushJournal
+from gitzen.models.push_plan import PushPlan
+from gitzen.models.ref_tip import RefTip
+from gitzen.models.ref_transaction import RefTransaction
 from gitzen.types import (
     CommitHash,
-    CommitTitle,
     GitBranchName,
     GithubUsername,
-    GitRootDir,
+    TreeHash,
     ZenToken,
 )
 
 
+def run_command(context: CommandContext, args: List[str]) -> None:
+    push(
+        context.console_env,
+        context.file_env,
+        context.git_env,
+        context.github_env,
+        context.cfg,
+        dry_run="--dry-run" in args,
+        resume="--resume" in args,
+    )
+
+
 def push(
     console_env: console.Env,
     file_env: file.Env,
     git_env: git.Env,
     github_env: github.Env,
     cfg: config.Config,
+    dry_run: bool = False,
+    resume: bool = False,
 ) -> None:
+    """
+    Plans the push, then runs the plan. A dry run prints the plan as JSON
+    instead, and leaves the branches, the remote, Github and the caches
+    untouched.
+    Resuming runs the steps left by an interrupted push.
+    """
     initial_branch = repo.get_local_branch_name(console_env, git_env)
     return_code: int = 0
     try:
         verify_supported_branch(cfg, initial_branch)
-        status, commit_stack, pr_head_hashes = prepare_pr_branches(
-            console_env,
-            file_env,
-            git_env,
-            github_env,
-            cfg,
-        )
-        publish_pr_branches(
-            console_env,
-            git_env,
-            commit_stack,
-            pr_head_hashes,
-            cfg,
-        )
-        regenerate_prs(
-            console_env,
-            github_env,
-            commit_stack,
-            pr_head_hashes,
-            status.username,
-            cfg,
-        )
+        if dry_run:
+            plan = plan_push(
+                console.Env(),
+                file.DryRunEnv(file_env),
+                git_env,
+                github_env,
+                cfg,
+                rebase=False,
+            )
+            operations = plan_operations(plan, cfg)
+            console.info(
+                console_env,
+                json.dumps(
+                    {
+                        "operations": operations,
+                        "cost": operations_cost(operations),
+                    },
+                    indent=2,
+                ),
+            )
+        elif resume:
+            resume_push(console_env, file_env, git_env, github_env, cfg)
+        else:
+            plan = plan_push(console_env, file_env, git_env, github_env, cfg)
+            steps = plan_steps(plan, cfg)
+            journal.start(
+                file_env,
+                git_env,
+                PushJournal(stack_hashes(plan), steps, []),
+            )
+            execute_plan(
+                console_env,
+                file_env,
+                git_env,
+                github_env,
+                cfg,
+                plan,
+                steps,
+            )
     except GitZenError as error:
         console.error(console_env, error.message)
+        if journal.load(file_env, git_env) is not None:
+            console.info(
+                console_env,
+                "Run 'git zen push --resume' to finish the push",
+            )
         return_code = error.exit_code
-    finally:
-        git.switch(git_env, initial_branch)
     exit(return_code)
 
 
@@ -71,38 +134,300 @@ def verify_supported_branch(cfg: config.Config, branch: GitBranchName) -> None:
     )
 
 
-def prepare_pr_branches(
+@trace.traced
+def plan_push(
     console_env: console.Env,
     file_env: file.Env,
     git_env: git.Env,
     github_env: github.Env,
     cfg: Config,
-) -> Tuple[GithubInfo, List[CommitBranches], List[CommitHash]]:
-    status, commit_stack = prepare_patches(
+    rebase: bool = True,
+) -> PushPlan:
+    """
+    Works out everything the push will change. Only the local branch is
+    changed, being rebased onto the freshly fetched remote branch when
+    rebase is set. Otherwise the plan is against the remote branch as last
+    fetched.
+    """
+    ref_changes = RefTransaction()
+    refs = git.ref_tips(git_env, git.gitzen_ref_prefixes)
+    status, closed, commit_stack = stack_commits(
         console_env,
         file_env,
         git_env,
         github_env,
         cfg,
+        ref_changes,
+        refs,
+        rebase,
+    )
+    tip_hashes, head_hashes = plan_pr_branches(git_env, commit_stack, refs)
+    return PushPlan(
+        status,
+        ref_changes,
+        closed,
+        commit_stack,
+        tip_hashes,
+        head_hashes,
     )
-    pr_head_hashes = update_pr_branches(
+
+
+def resume_push(
+    console_env: console.Env,
+    file_env: file.Env,
+    git_env: git.Env,
+    github_env: github.Env,
+    cfg: config.Config,
+) -> None:
+    """
+    Runs the steps of an interrupted push that didn't complete. The stack
+    is planned again, without rebasing, to find what the steps apply to.
+    """
+    unfinished = journal.load(file_env, git_env)
+    if unfinished is None:
+        console.info(console_env, "No interrupted push to resume")
+        return
+    plan = plan_push(
         console_env,
+        file_env,
         git_env,
-        commit_stack,
+        github_env,
+        cfg,
+        rebase=False,
+    )
+    if stack_hashes(plan) != unfinished.commits:
+        raise GitZenError(
+            exit_code.PUSH_JOURNAL_OUT_OF_DATE,
+            "The commits have changed since the push was interrupted. "
+            "Run 'git zen push' to push them.",
+        )
+    execute_plan(
+        console_env,
+        file_env,
+        git_env,
+        github_env,
+        cfg,
+        plan,
+        unfinished.pending,
     )
-    git.switch(git_env, cfg.default_branch)
-    return status, commit_stack, pr_head_hashes
 
 
+@trace.traced
+def execute_plan(
+    console_env: console.Env,
+    file_env: file.Env,
+    git_env: git.Env,
+    github_env: github.Env,
+    cfg: config.Config,
+    plan: PushPlan,
+    steps: List[str],
+) -> None:
+    """
+    Runs the given steps of the plan, recording each in the journal as it
+    completes. The journal is removed once they have all run.
+
+    The refs are always brought up to date, as the plan only rebuilds the
+    pr branches that aren't.
+    """
+    pending = set(steps)
+    record = journal.recorder(file_env, git_env)
+    for pr in plan.closed:
+        closed = step("close-pr", pr.number.value)
+        if closed in pending:
+            close_pull_requests(console_env, github_env, [pr])
+            record(closed)
+    pr_head_hashes = build_planned_branches(console_env, git_env, plan)
+    if "update-refs" in pending:
+        record("update-refs")
+    if "push" in pending:
+        publish_pr_branches(
+            console_env,
+            git_env,
+            plan.commit_stack,
+            pr_head_hashes,
+            cfg,
+        )
+        record("push")
+    regenerate_prs(
+        console_env,
+        git_env,
+        github_env,
+        plan.commit_stack,
+        plan.status.username,
+        cfg,
+        pending,
+        record,
+    )
+    journal.finish(file_env, git_env)
+
+
+def stack_hashes(plan: PushPlan) -> List[CommitHash]:
+    return [cb.git_commit.hash for cb in plan.commit_stack]
+
+
+def plan_steps(plan: PushPlan, cfg: config.Config) -> List[str]:
+    """
+    Names the steps of the plan, in the order they are run, for the
+    journal. The refs are all updated in one step.
+    """
+    return list(
+        dict.fromkeys(
+            operation_step(operation)
+            for operation in plan_operations(plan, cfg)
+        )
+    )
+
+
+def operation_step(operation: Dict[str, Any]) -> str:
+    kind = operation["op"]
+    if kind in ["update-ref", "create-branch", "update-branch"]:
+        return "update-refs"
+    if kind == "push":
+        return "push"
+    if kind == "create-pr":
+        return step(kind, operation["head"])
+    return step(kind, operation["number"])
+
+
+def step(kind: str, subject: Any) -> str:
+    return f"{kind} {subject}"
+
+
+def plan_operations(
+    plan: PushPlan,
+    cfg: config.Config,
+) -> List[Dict[str, Any]]:
+    """
+    Lists the operations of the plan, in the order they are run.
+    """
+    operations: List[Dict[str, Any]] = [
+        {"op": "close-pr", "number": pr.number.value, "title": pr.title.value}
+        for pr in plan.closed
+    ]
+    operations.extend(
+        {"op": "update-ref", "change": command}
+        for command in plan.ref_changes.commands
+    )
+    pushed: List[str] = []
+    pr_operations: List[Dict[str, Any]] = []
+    base_branch = cfg.default_branch
+    for commit_branches, tip_hash, head_hash in zip(
+        plan.commit_stack,
+        plan.tip_hashes,
+        plan.head_hashes,
+    ):
+        commit = commit_branches.git_commit
+        pr = commit_branches.pull_request
+        pr_branch = commit_branches.head
+        if head_hash is None:
+            kind = "create-branch" if tip_hash is None else "update-branch"
+            operations.append(
+                {
+                    "op": kind,
+                    "branch": pr_branch.value,
+                    "commit": commit.hash.value,
+                }
+            )
+        if pr is None:
+            pr_operations.append(
+                {
+                    "op": "create-pr",
+                    "head": pr_branch.value,
+                    "base": base_branch.value,
+                    "title": commit.messageHeadline.value,
+                }
+            )
+        if pr is None or head_hash is None or pr.headHash != head_hash:
+            pushed.append(pr_branch.value)
+        if pr is not None and pr.headHash != head_hash:
+            pr_operations.append(
+                {
+                    "op": "update-pr",
+                    "number": pr.number.value,
+                    "head": pr_branch.value,
+                    "base": base_branch.value,
+                    "title": commit.messageHeadline.value,
+                }
+            )
+        base_branch = pr_branch
+    if pushed:
+        operations.append(
+            {"op": "push", "remote": cfg.remote.value, "branches": pushed}
+        )
+    return operations + pr_operations
+
+
+def operations_cost(operations: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Estimates the cost of the operations: the commits written, the refs
+    changed, the pushes to the remote and the requests made to Github.
+    The pull request updates are sent together, in chunks of
+    github.update_chunk_size.
+    """
+    kinds = [operation["op"] for operation in operations]
+    commits = kinds.count("create-branch") + kinds.count("update-branch")
+    return {
+        "commits": commits,
+        "refs": kinds.count("update-ref") + commits,
+        "pushes": kinds.count("push"),
+        "github_requests": (
+            kinds.count("close-pr")
+            + kinds.count("create-pr")
+            + -(-kinds.count("update-pr") // github.update_chunk_size)
+        ),
+    }
+
+
+@trace.traced
 def prepare_patches(
     console_env: console.Env,
     file_env: file.Env,
     git_env: git.Env,
     github_env: github.Env,
     cfg: Config,
+    transaction: Optional[RefTransaction] = None,
 ) -> Tuple[GithubInfo, List[CommitBranches]]:
+    """
+    The patch refs are staged in the transaction when one is given,
+    otherwise they are updated before returning.
+    """
+    ref_changes = RefTransaction() if transaction is None else transaction
+    status, closed, commit_stack = stack_commits(
+        console_env,
+        file_env,
+        git_env,
+        github_env,
+        cfg,
+        ref_changes,
+        git.ref_tips(git_env, git.gitzen_ref_prefixes),
+    )
+    close_pull_requests(console_env, github_env, closed)
+    if transaction is None:
+        git.update_refs(git_env, ref_changes)
+    return status, commit_stack
+
+
+@trace.traced
+def stack_commits(
+    console_env: console.Env,
+    file_env: file.Env,
+    git_env: git.Env,
+    github_env: github.Env,
+    cfg: Config,
+    transaction: RefTransaction,
+    refs: Dict[str, RefTip],
+    rebase: bool = True,
+) -> Tuple[GithubInfo, List[PullRequest], List[CommitBranches]]:
+    """
+    Matches the local commits to their pull requests. The patch refs, and
+    the deletion of the refs of pull requests whose commits have gone
+    away, are staged in the transaction. Those pull requests are returned
+    to be closed.
+    The gitzen refs are looked up in refs, listed before the rebase, which
+    only moves the local branch.
+    """
     console.info(console_env, "Preparing patches")
-    status = github.fetch_info(console_env, git_env, github_env)
+    status = github.sync_info(console_env, file_env, git_env, github_env)
     local_branch = status.local_branch
     branches.validate_not_remote_pr(console_env, local_branch)
     remote_branch = branches.get_required_remote_branch(
@@ -111,31 +436,41 @@ def prepare_patches(
         cfg,
     )
     remote_target = GitBranchName(f"{cfg.remote.value}/{remote_branch.value}")
-    git.fetch(git_env, cfg.remote)
-    git.rebase(git_env, remote_target)
+    if rebase:
+        git.fetch(git_env, cfg.remote)
+        git.rebase(git_env, remote_target)
     commits = repo.get_commit_stack(
         console_env,
         git_env,
         cfg.remote,
         remote_branch,
+        file_env,
     )
-    update_patches(console_env, file_env, cfg.root_dir, commits)
-    commit_stack = clean_up_deleted_commits(
-        console_env,
-        git_env,
-        github_env,
+    update_patches(console_env, git_env, commits, transaction, refs)
+    closed, kept = deleted_commits(
         status.pull_requests,
         commits,
-        cfg.root_dir,
+        transaction,
+        refs,
     )
-    pr_count = len(commit_stack)
-    new_commits = [CommitPr(commit, None) for commit in commits[pr_count:]]
-    commit_stack.extend(new_commits)
-    return status, rethread_stack(
-        status.username,
-        commit_stack,
-        remote_branch,
-        remote_target=remote_target,
+    # pull requests are matched to commits by zen-token, as they are not
+    # created in stack order
+    commit_prs = {
+        commit_pr.git_commit.zen_token: commit_pr for commit_pr in kept
+    }
+    commit_stack = [
+        commit_prs.get(commit.zen_token, CommitPr(commit, None))
+        for commit in commits
+    ]
+    return (
+        status,
+        closed,
+        rethread_stack(
+            status.username,
+            commit_stack,
+            remote_branch,
+            remote_target=remote_target,
+        ),
     )
 
 
@@ -145,70 +480,95 @@ def rethread_stack(
     prev_head: GitBranchName,
     remote_target: Optional[GitBranchName] = None,
 ) -> List[CommitBranches]:
-    if len(commit_stack) == 0:
-        return []
-    hd = commit_stack[0]
-    head = branches.pr_branch_spec(author, hd.git_commit.zen_token)
-    result: List[CommitBranches] = [
-        CommitBranches(
-            hd.git_commit,
-            prev_head,
-            head,
-            hd.pull_request,
-            remote_target,
-        ),
-    ]
-    result.extend(rethread_stack(author, commit_stack[1:], head))
+    """
+    Each pr branch is based on the pr branch of the commit before it. Only
+    the first is given the remote_target.
+    """
+    result: List[CommitBranches] = []
+    base = prev_head
+    for commit_pr in commit_stack:
+        head = branches.pr_branch_spec(author, commit_pr.git_commit.zen_token)
+        result.append(
+            CommitBranches(
+                commit_pr.git_commit,
+                base,
+                head,
+                commit_pr.pull_request,
+                remote_target,
+            )
+        )
+        base = head
+        remote_target = None
     return result
 
 
-def clean_up_deleted_commits(
-    console_env: console.Env,
-    git_env: git.Env,
-    github_env: github.Env,
+def deleted_commits(
     pull_requests: List[PullRequest],
     commits: List[GitCommit],
-    root_dir: GitRootDir,
-) -> List[CommitPr]:
+    transaction: RefTransaction,
+    refs: Dict[str, RefTip],
+) -> Tuple[List[PullRequest], List[CommitPr]]:
     """
-    Any PR that has a zen-token that isn't in the current commit stack
-    is closed as the commit has gone away.
-    Issue: if commit is on another branch?
+    Returns the PRs whose commits have gone away, staging the deletion of
+    their branch and patch refs in the transaction, and the remaining PRs
+    paired with their commits.
     """
     zen_tokens: Dict[ZenToken, GitCommit] = {}
     for commit in commits:
         zen_tokens[commit.zen_token] = commit
+    closed: List[PullRequest] = []
     kept: List[CommitPr] = []
     for pr in pull_requests:
         if pr.zen_token not in zen_tokens:
-            console.warn(
-                console_env,
-                f"No commit for Pull Request {pr.number} closing: {pr.title}",
-            )
-            github.close_pull_request_with_comment(
-                github_env,
-                pr,
-                "Closing pull request: commit has gone away",
-            )
-            if git.branch_exists(git_env, pr.headRefName):
-                git.branch_delete(git_env, pr.headRefName)
-            git.delete_patch(pr.zen_token, root_dir)
+            closed.append(pr)
+            for ref in [
+                git.branch_ref(pr.headRefName),
+                git.gitzen_patch_full_ref(pr.zen_token),
+            ]:
+                tip = refs.get(ref)
+                if tip is not None:
+                    transaction.delete(ref, tip.hash)
         else:
             commit = zen_tokens[pr.zen_token]
             kept.append(CommitPr(commit, pr))
-    return kept
+    return closed, kept
+
+
+@trace.traced
+def close_pull_requests(
+    console_env: console.Env,
+    github_env: github.Env,
+    pull_requests: List[PullRequest],
+) -> None:
+    for pr in pull_requests:
+        console.warn(
+            console_env,
+            f"No commit for Pull Request {pr.number} closing: {pr.title}",
+        )
+        github.close_pull_request_with_comment(
+            github_env,
+            pr,
+            "Closing pull request: commit has gone away",
+        )
 
 
 def update_patches(
     console_env: console.Env,
-    file_env: file.Env,
-    root_dir: GitRootDir,
+    git_env: git.Env,
     commits: List[GitCommit],
+    transaction: RefTransaction,
+    refs: Optional[Dict[str, RefTip]] = None,
 ) -> None:
+    if refs is None:
+        refs = git.ref_tips(git_env, git.gitzen_ref_prefixes)
     for commit in commits:
         patch = GitPatch(commit.zen_token, commit.hash)
-        if git.outdated_patch(file_env, patch, root_dir):
-            git.write_patch(file_env, patch, root_dir)
+        tip = refs.get(git.gitzen_patch_full_ref(patch.zen_token))
+        if tip is None or tip.hash != patch.hash:
+            transaction.update(
+                git.gitzen_patch_full_ref(patch.zen_token),
+                patch.hash,
+            )
             console.info(
                 console_env,
                 (
@@ -218,172 +578,241 @@ def update_patches(
             )
 
 
-def update_pr_branches(
-    console_env: console.Env,
+@trace.traced
+def plan_pr_branches(
     git_env: git.Env,
     commit_stack: List[CommitBranches],
-) -> List[CommitHash]:
-    if len(commit_stack) == 0:
-        return []
-    hashes: List[CommitHash] = []
-    hashes.append(update_pr_branch(console_env, git_env, commit_stack[0]))
-    hashes.extend(
-        update_pr_branches(
-            console_env,
-            git_env,
-            commit_stack[1:],
-        )
+    refs: Optional[Dict[str, RefTip]] = None,
+) -> Tuple[List[Optional[CommitHash]], List[Optional[CommitHash]]]:
+    """
+    Returns the current hash of each pr branch, and the hash it is kept at,
+    or None where it is to be rebuilt. Once a pr branch is rebuilt, so is
+    each one after it, as they are built on its new hash.
+
+    A pr branch is kept when its tip has the tree of the local commit and
+    the expected base as a parent. The tips come from refs and the trees
+    from a single log, so the git calls don't grow with the stack.
+    """
+    if refs is None:
+        refs = git.ref_tips(git_env, git.gitzen_ref_prefixes)
+    tips = [refs.get(git.branch_ref(cb.head)) for cb in commit_stack]
+    trees = git.tree_hashes(
+        git_env,
+        [
+            cb.git_commit.hash
+            for cb, tip in zip(commit_stack, tips)
+            if tip is not None
+        ],
     )
-    return hashes
+    tip_hashes: List[Optional[CommitHash]] = []
+    head_hashes: List[Optional[CommitHash]] = []
+    base_hash: Optional[CommitHash] = None
+    rebuilt = False
+    for commit_branches, tip in zip(commit_stack, tips):
+        tip_hashes.append(None if tip is None else tip.hash)
+        if not rebuilt and base_hash is None:
+            base_hash = resolve_hash(git_env, pr_branch_base(commit_branches))
+        commit = commit_branches.git_commit
+        rebuilt = (
+            rebuilt
+            or tip is None
+            or base_hash not in tip.parents
+            or tip.tree != trees.get(commit.hash)
+        )
+        if tip is not None and not rebuilt:
+            base_hash = tip.hash
+        head_hashes.append(None if rebuilt else base_hash)
+    return tip_hashes, head_hashes
 
 
-def pr_source(
-    last_pr: Optional[PullRequest],
-    cfg: config.Config,
-) -> GitBranchName:
-    if last_pr is None:
-        source = cfg.default_branch
-    else:
-        source = GitBranchName(last_pr.zen_token.value)
-    return source
+@trace.traced
+def build_planned_branches(
+    console_env: console.Env,
+    git_env: git.Env,
+    plan: PushPlan,
+) -> List[CommitHash]:
+    """
+    Builds the pr branches the plan rebuilds, then updates them along with
+    the planned ref changes in one transaction. Returns the hash of each
+    pr branch.
+    """
+    transaction = RefTransaction(plan.ref_changes.commands)
+    hashes: List[CommitHash] = []
+    base_hash: Optional[CommitHash] = None
+    for commit_branches, head_hash in zip(plan.commit_stack, plan.head_hashes):
+        if head_hash is None:
+            head_hash = update_pr_branch(
+                console_env,
+                git_env,
+                commit_branches,
+                transaction,
+                base_hash,
+            )
+        hashes.append(head_hash)
+        base_hash = head_hash
+    git.update_refs(git_env, transaction)
+    return hashes
 
 
 def update_pr_branch(
     console_env: console.Env,
     git_env: git.Env,
     commit_branches: CommitBranches,
+    transaction: RefTransaction,
+    base_hash: Optional[CommitHash] = None,
 ) -> CommitHash:
     """
+    Builds the pr branch commit directly from the tree of the local commit
+    using plumbing commands, so the worktree and index are never touched.
+    base_hash is the new hash of the previous pr branch, if it has already
+    been built, as its ref is only staged in the transaction.
     Returns the hash of the updated pr branch.
     """
-    if commit_branches.remote_target is None:
-        base = commit_branches.base
-    else:
-        base = commit_branches.remote_target
     head = commit_branches.head
-    zen_token = commit_branches.git_commit.zen_token
-    if not git.branch_exists(git_env, head):
-        git.branch_create(git_env, head, base)
-        cherry_pick_branch(
-            console_env,
-            git_env,
-            zen_token,
-            head,
-            commit_branches.git_commit.messageHeadline,
-        )
-        hash = CommitHash(git.rev_parse(git_env, "HEAD")[0])
-    else:
-        git.switch(git_env, head)
-        git.status(git_env)
-        git.log_graph(git_env)
-        git.rebase(git_env, base)
-        commit = commit_branches.git_commit
-        git.restore_staged_worktree(
+    commit = commit_branches.git_commit
+    if base_hash is None:
+        base_hash = resolve_hash(git_env, pr_branch_base(commit_branches))
+    tree = commit_tree_hash(git_env, commit)
+    tip = git.read_commit(git_env, head)
+    if tip is None:
+        hash = git.commit_tree(
             git_env,
-            GitBranchName(commit.hash.value),
+            tree,
+            [base_hash],
+            [commit.messageHeadline.value],
         )
-        log = git.status(git_env)
-        if not logger.line_contains(
-            "nothing to commit, working tree clean",
-            log,
-        ):
-            git.commit(
-                git_env,
-                [
-                    f"{commit.messageHeadline.value}",
-                    "",
-                    f"{commit.messageBody.value}",
-                    f"(updated from commit {commit.hash.value})",
-                ],
-            )
-        hash = CommitHash(git.rev_parse(git_env, "HEAD")[0])
-        git.status(git_env)
-        git.log_graph(git_env)
+        transaction.create(git.branch_ref(head), hash)
+        return hash
+    if tip.tree == tree and base_hash in tip.parents:
+        return tip.hash
+    # keep the existing pr branch history, and merge in the base so the
+    # pull request only shows the changes from the local commit
+    hash = git.commit_tree(
+        git_env,
+        tree,
+        [tip.hash, base_hash],
+        [
+            f"{commit.messageHeadline.value}",
+            "",
+            f"{commit.messageBody.value}",
+            f"(updated from commit {commit.hash.value})",
+        ],
+    )
+    transaction.update(git.branch_ref(head), hash, tip.hash)
     return hash
 
 
-def cherry_pick_branch(
-    console_env: console.Env,
-    git_env: git.Env,
-    zen_token: ZenToken,
-    branch: GitBranchName,
-    title: CommitTitle,
-) -> None:
-    original_branch = repo.get_local_branch_name(console_env, git_env)
-    patch_ref = git.gitzen_patch_ref(zen_token)
-    git.switch(git_env, branch)
-    git.restore_staged_worktree(git_env, patch_ref)
-    log = git.status(git_env)
-    if not logger.line_contains(
-        "nothing to commit, working tree clean",
-        log,
-    ):
-        git.commit(git_env, [title.value])
-    git.switch(git_env, original_branch)
+def pr_branch_base(commit_branches: CommitBranches) -> GitBranchName:
+    if commit_branches.remote_target is None:
+        return commit_branches.base
+    return commit_branches.remote_target
+
 
+def commit_tree_hash(git_env: git.Env, commit: GitCommit) -> TreeHash:
+    tree = git.tree_hash(git_env, GitBranchName(commit.hash.value))
+    if tree is None:
+        raise GitZenError(
+            exit_code.GIT_ERROR,
+            f"Unable to read tree of commit {commit.hash.value}",
+        )
+    return tree
+
+
+def resolve_hash(git_env: git.Env, branch: GitBranchName) -> CommitHash:
+    hash = git.ref_hash(git_env, branch)
+    if hash is None:
+        raise GitZenError(
+            exit_code.GIT_ERROR,
+            f"Unable to resolve branch {branch.value}",
+        )
+    return hash
 
+
+@trace.traced
 def publish_pr_branches(
     console_env: console.Env,
     git_env: git.Env,
     commit_stack: List[CommitBranches],
     pr_head_hashes: List[CommitHash],
     cfg: config.Config,
-    parent_pr_branch_updated: bool = False,
 ) -> None:
-    if len(commit_stack) == 0:
-        return
-    cb = commit_stack[0]
-    pr_branch = cb.head
-    existing_pr = cb.pull_request
-    if not existing_pr or existing_pr.headHash != pr_head_hashes[0]:
-        console.info(
-            console_env,
-            f"Updating remote branch: {cfg.remote.value}/{pr_branch.value}",
-        )
-        if parent_pr_branch_updated:
-            git.push_force_with_lease(git_env, cfg.remote, pr_branch)
-        else:
-            git.push(git_env, cfg.remote, pr_branch)
-        parent_pr_branch_updated = True
-    publish_pr_branches(
-        console_env,
-        git_env,
-        commit_stack[1:],
-        pr_head_hashes[1:],
-        cfg,
-        parent_pr_branch_updated,
-    )
+    """
+    Pushes every changed pr branch in a single atomic push, leasing each
+    on the hash last fetched from the remote.
+    """
+    changed: List[Tuple[GitBranchName, Optional[CommitHash]]] = []
+    for cb, pr_head_hash in zip(commit_stack, pr_head_hashes):
+        pr_branch = cb.head
+        existing_pr = cb.pull_request
+        if not existing_pr or existing_pr.headHash != pr_head_hash:
+            console.info(
+                console_env,
+                (
+                    "Updating remote branch: "
+                    f"{cfg.remote.value}/{pr_branch.value}"
+                ),
+            )
+            expected = git.remote_branch_hash(git_env, cfg.remote, pr_branch)
+            changed.append((pr_branch, expected))
+    git.push_atomic(git_env, cfg.remote, changed)
+
 
+# A task to run once the task for the branch it depends on has succeeded
+ScheduledTask = Tuple[Optional[GitBranchName], Callable[[], None]]
 
+
+@trace.traced
 def regenerate_prs(
     console_env: console.Env,
+    git_env: git.Env,
     github_env: github.Env,
     commit_stack: List[CommitBranches],
-    pr_head_hashes: List[CommitHash],
     author: GithubUsername,
     cfg: config.Config,
-    last_pr_branch: Optional[GitBranchName] = None,
+    steps: Set[str],
+    record: Callable[[str], None],
 ) -> None:
-    if len(commit_stack) == 0:
-        return
-    if last_pr_branch is None:
-        base_branch = cfg.default_branch
-    else:
-        base_branch = last_pr_branch
-    commit_branches = commit_stack[0]
-    commit = commit_branches.git_commit
-    pr = commit_branches.pull_request
-    pr_branch = commit_branches.head
-    if pr is None:
-        console.info(
-            console_env,
-            f"Creating Pull Request: {base_branch.value} <- {pr_branch.value}",
-        )
-        github.create_pull_request(github_env, pr_branch, base_branch, commit)
-    else:
+    """
+    Creates the missing pull requests, then updates the changed pull
+    requests together, as planned in the steps. Each step is recorded once
+    it has completed.
+
+    Pull requests are created concurrently, except where the base branch
+    is not yet on the remote, when it waits for the pull request for that
+    branch.
+    """
+    creations: Dict[GitBranchName, ScheduledTask] = {}
+    updates: List[PullRequestUpdate] = []
+    base_branch = cfg.default_branch
+    for commit_branches in commit_stack:
+        commit = commit_branches.git_commit
+        pr = commit_branches.pull_request
         pr_branch = commit_branches.head
-        existing_pr = commit_branches.pull_request
-        if not existing_pr or existing_pr.headHash != pr_head_hashes[0]:
+        if pr is None and step("create-pr", pr_branch.value) in steps:
+            console.info(
+                console_env,
+                (
+                    "Creating Pull Request: "
+                    f"{base_branch.value} <- {pr_branch.value}"
+                ),
+            )
+            on_remote = git.remote_branch_hash(
+                git_env,
+                cfg.remote,
+                base_branch,
+            )
+            creations[pr_branch] = (
+                None if on_remote else base_branch,
+                partial(
+                    create_pull_request,
+                    github_env,
+                    pr_branch,
+                    base_branch,
+                    commit,
+                    record,
+                ),
+            )
+        elif pr is not None and step("update-pr", pr.number.value) in steps:
             console.info(
                 console_env,
                 (
@@ -392,18 +821,62 @@ def regenerate_prs(
                     f" <- {pr_branch.value}"
                 ),
             )
-            github.update_pull_request(
-                github_env,
-                pr_branch,
-                base_branch,
-                commit,
-            )
-    regenerate_prs(
-        console_env,
-        github_env,
-        commit_stack[1:],
-        pr_head_hashes[1:],
-        author,
-        cfg,
-        pr_branch,
-    )
+            updates.append(PullRequestUpdate(pr, base_branch, commit))
+        base_branch = pr_branch
+    run_in_dependency_order(creations, cfg.pr_concurrency)
+    github.update_pull_requests(github_env, updates)
+    for update in updates:
+        record(step("update-pr", update.pull_request.number.value))
+
+
+def create_pull_request(
+    github_env: github.Env,
+    head: GitBranchName,
+    base: GitBranchName,
+    commit: GitCommit,
+    record: Callable[[str], None],
+) -> None:
+    github.create_pull_request(github_env, head, base, commit)
+    record(step("create-pr", head.value))
+
+
+def run_in_dependency_order(
+    tasks: Dict[GitBranchName, ScheduledTask],
+    limit: int,
+) -> None:
+    """
+    Runs the tasks on up to limit threads, starting each task once the
+    task it depends on has succeeded. A task whose dependency fails is
+    not run. The first error is raised once the running tasks finish.
+    """
+    pending = dict(tasks)
+    succeeded: Set[GitBranchName] = set()
+    failed: Set[GitBranchName] = set()
+    errors: List[BaseException] = []
+    running: Dict[Future, GitBranchName] = {}
+    with ThreadPoolExecutor(max_workers=max(1, limit)) as executor:
+        while pending or running:
+            for branch, (dependency, task) in list(pending.items()):
+                if dependency in failed:
+                    failed.add(branch)
+                    del pending[branch]
+                elif (
+                    dependency is None
+                    or dependency not in tasks
+                    or dependency in succeeded
+                ):
+                    running[executor.submit(task)] = branch
+                    del pending[branch]
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                branch = running.pop(future)
+                error = future.exception()
+                if error is None:
+                    succeeded.add(branch)
+                else:
+                    failed.add(branch)
+                    errors.append(error)
+    if errors:
+        raise errors[0]
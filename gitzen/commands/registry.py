@@ -0,0 +1,26 @@
+from typing import Dict, Optional
+
+from gitzen.models.command import Command
+
+# What a command needs set up, each level including those before it
+NEEDS_FILES = 0
+NEEDS_REPO = 1
+NEEDS_CONFIG = 2
+NEEDS_GITHUB = 3
+
+commands: Dict[str, Command] = {
+    command.name: command
+    for command in [
+        Command("init", "gitzen.commands.init", NEEDS_REPO),
+        Command("hook", "gitzen.commands.hook", NEEDS_FILES),
+        Command("status", "gitzen.commands.status", NEEDS_GITHUB),
+        Command("sync", "gitzen.commands.sync", NEEDS_GITHUB),
+        Command("push", "gitzen.commands.push", NEEDS_GITHUB),
+        Command("merge", "gitzen.commands.merge", NEEDS_GITHUB),
+        Command("daemon", "gitzen.commands.daemon", NEEDS_CONFIG),
+    ]
+}
+
+
+def find(name: str) -> Optional[Command]:
+    return commands.get(name)
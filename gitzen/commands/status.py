@@ -1,12 +1,62 @@
-from gitzen import console, git, github
+import subprocess
+from datetime import timedelta
+from typing import Callable, List, Optional
+
+from gitzen import cache, config, console, file, git, github
+from gitzen.models.command_context import CommandContext
+from gitzen.models.github_pull_request import PullRequest
+
+
+def run_command(context: CommandContext, args: List[str]) -> None:
+    status(
+        context.console_env,
+        context.file_env,
+        context.git_env,
+        context.github_env,
+        context.cfg,
+        cached="--cached" in args,
+    )
 
 
 def status(
     console_env: console.Env,
+    file_env: file.Env,
     git_env: git.Env,
     github_env: github.Env,
+    cfg: Optional[config.Config] = None,
+    cached: bool = False,
+    refresh: Optional[Callable[[], None]] = None,
+) -> None:
+    """
+    Shows our open Pull Requests.
+
+    When cached, they are shown from the last sync without contacting
+    Github, and are refreshed in the background if older than the
+    configured ttl.
+    """
+    snapshot = cache.load_pull_requests(file_env, git_env) if cached else None
+    if snapshot is None:
+        prs = github.sync_info(
+            console_env,
+            file_env,
+            git_env,
+            github_env,
+            full=True,
+        ).pull_requests
+        show_pull_requests(console_env, prs)
+        return
+    age = github.sync_age(snapshot.synced_at)
+    console.info(console_env, f"Pull Requests as of {describe_age(age)}")
+    show_pull_requests(console_env, snapshot.pull_requests)
+    ttl = timedelta(seconds=300 if cfg is None else cfg.status_ttl)
+    if age is None or age > ttl:
+        (refresh_in_background if refresh is None else refresh)()
+
+
+def show_pull_requests(
+    console_env: console.Env,
+    prs: List[PullRequest],
 ) -> None:
-    prs = github.fetch_info(console_env, git_env, github_env).pull_requests
     if len(prs) == 0:
         console.info(console_env, "Stack is empty - no Pull Requests found")
         exit
@@ -15,3 +65,28 @@ def status(
         m = pr.mergeable.value
         t = pr.title.value
         console.info(console_env, f"PR-{n} - {m} - {t}")
+
+
+def describe_age(age: Optional[timedelta]) -> str:
+    if age is None:
+        return "an unknown time"
+    seconds = int(age.total_seconds())
+    for unit, size in [("day", 86400), ("hour", 3600), ("minute", 60)]:
+        if seconds >= size:
+            count = seconds // size
+            return f"{count} {unit}{'' if count == 1 else 's'} ago"
+    return "just now"
+
+
+def refresh_in_background() -> None:
+    """
+    Starts a sync that outlives this process, so the next cached status
+    is up to date.
+    """
+    subprocess.Popen(
+        ["git", "zen", "sync"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
@@ -0,0 +1,18 @@
+from typing import List
+
+from gitzen import console, github
+from gitzen.models.command_context import CommandContext
+
+
+def run_command(context: CommandContext, args: List[str]) -> None:
+    """
+    Brings the cached Pull Requests up to date, without showing them.
+    This is run in the background by `status --cached`.
+    """
+    github.sync_info(
+        console.Env(),
+        context.file_env,
+        context.git_env,
+        context.github_env,
+        full=True,
+    )
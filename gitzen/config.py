@@ -11,6 +11,9 @@ class Config:
     _default_branch: GitBranchName
     _remote_branches: List[GitBranchName]
     _remote: GitRemoteName
+    _github_client: str
+    _pr_concurrency: int
+    _status_ttl: int
 
     def __init__(
         self,
@@ -18,11 +21,17 @@ class Config:
         default_branch: GitBranchName,
         remote_branches: List[GitBranchName],
         remote: GitRemoteName,
+        github_client: str = "gh",
+        pr_concurrency: int = 4,
+        status_ttl: int = 300,
     ) -> None:
         self._root_dir = root_dir
         self._default_branch = default_branch
         self._remote_branches = remote_branches
         self._remote = remote
+        self._github_client = github_client
+        self._pr_concurrency = pr_concurrency
+        self._status_ttl = status_ttl
 
     @property
     def root_dir(self) -> GitRootDir:
@@ -40,12 +49,38 @@ class Config:
     def remote(self) -> GitRemoteName:
         return self._remote
 
+    @property
+    def github_client(self) -> str:
+        """
+        How to talk to Github: "gh" runs the gh CLI for each request,
+        "http" makes the requests from within gitzen.
+        """
+        return self._github_client
+
+    @property
+    def pr_concurrency(self) -> int:
+        """
+        The most Pull Requests to create at the same time.
+        """
+        return self._pr_concurrency
+
+    @property
+    def status_ttl(self) -> int:
+        """
+        The seconds after which `status --cached` refreshes its Pull
+        Requests in the background.
+        """
+        return self._status_ttl
+
     def __eq__(self, __o: object) -> bool:
         return (
             self.root_dir == __o.root_dir
             and self.default_branch == __o.default_branch
             and self.remote_branches == __o.remote_branches
             and self.remote == __o.remote
+            and self.github_client == __o.github_client
+            and self.pr_concurrency == __o.pr_concurrency
+            and self.status_ttl == __o.status_ttl
         )
 
 
@@ -58,15 +93,19 @@ def default_config(root_dir: GitRootDir) -> Config:
     )
 
 
+def config_file(root_dir: GitRootDir) -> str:
+    return f"{root_dir.value}/.gitzen.yml"
+
+
 def load(
     console_env: console.Env,
     file_env: file.Env,
     root_dir: GitRootDir,
 ) -> Config:
-    config_file = f"{root_dir.value}/.gitzen.yml"
-    if exists(config_file):
-        console.info(console_env, f"Reading config from {config_file}")
-        gitzen_yml = yaml.read(file_env, config_file)
+    filename = config_file(root_dir)
+    if exists(filename):
+        console.info(console_env, f"Reading config from {filename}")
+        gitzen_yml = yaml.read(file_env, filename)
         default_branch = GitBranchName(gitzen_yml["defaultBranch"])
         remote_branches = [
             GitBranchName(branch) for branch in gitzen_yml["remoteBranches"]
@@ -76,5 +115,8 @@ def load(
             default_branch,
             remote_branches,
             GitRemoteName(gitzen_yml["remote"]),
+            gitzen_yml.get("githubClient", "gh"),
+            gitzen_yml.get("prConcurrency", 4),
+            gitzen_yml.get("statusTtl", 300),
         )
     return default_config(root_dir)
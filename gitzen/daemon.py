@@ -0,0 +1,249 @@
+import os
+import socket
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from gitzen import config, console, exit_code, file, git, github
+from gitzen.daemon_client import receive, send
+from gitzen.models.command_context import CommandContext
+from gitzen.models.gitzen_error import GitZenError
+from gitzen.types import GitRootDir
+
+Dispatch = Callable[[CommandContext, List[str]], None]
+
+
+class Watch:
+    """
+    Notices when any of the files or directories change, by their modified
+    time and size. Below each of the trees, every directory is watched, so
+    a file added, removed or replaced anywhere in it is noticed.
+    """
+
+    _file_env: file.Env
+    _filenames: List[str]
+    _trees: List[str]
+    _versions: Dict[str, Optional[Tuple[int, int]]]
+
+    def __init__(
+        self,
+        file_env: file.Env,
+        filenames: List[str],
+        trees: Optional[List[str]] = None,
+    ) -> None:
+        self._file_env = file_env
+        self._filenames = filenames
+        self._trees = [] if trees is None else trees
+        self._versions = self._latest()
+
+    def changed(self) -> bool:
+        """
+        Whether anything has changed since the watch was made or last
+        asked.
+        """
+        latest = self._latest()
+        changed = latest != self._versions
+        self._versions = latest
+        return changed
+
+    def _latest(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        filenames = list(self._filenames)
+        for tree in self._trees:
+            filenames.extend(file.directories(self._file_env, tree))
+        return {
+            filename: file.version(self._file_env, filename)
+            for filename in filenames
+        }
+
+
+class Daemon:
+    """
+    Runs the commands forwarded by the CLI for one repo, keeping the git
+    and Github envs and the config between them, until the files they were
+    built from change. The git env keeps its listing of the refs until
+    HEAD or a ref changes. The commit and pull request caches are kept
+    warm by the cache module.
+    """
+
+    _log_sections: List[str]
+    _file_env: file.Env
+    _root_dir: GitRootDir
+    _new_git_env: Callable[[], git.Env]
+    _new_github_env: Callable[[git.Env, config.Config], github.Env]
+    _dispatch: Dispatch
+    _watch: Watch
+    _refs_watch: Watch
+    _git_env: Optional[git.Env]
+    _github_env: Optional[github.Env]
+    _cfg: Optional[config.Config]
+
+    def __init__(
+        self,
+        log_sections: List[str],
+        file_env: file.Env,
+        git_env: git.Env,
+        root_dir: GitRootDir,
+        new_git_env: Callable[[], git.Env],
+        new_github_env: Callable[[git.Env, config.Config], github.Env],
+        dispatch: Dispatch,
+    ) -> None:
+        self._log_sections = log_sections
+        self._file_env = file_env
+        self._root_dir = root_dir
+        self._new_git_env = new_git_env
+        self._new_github_env = new_github_env
+        self._dispatch = dispatch
+        git_dir = git.git_dir(git_env)
+        self._watch = Watch(
+            file_env,
+            [
+                config.config_file(root_dir),
+                f"{git_dir}/config",
+                f"{git_dir}/objects/pack",
+            ],
+        )
+        self._refs_watch = Watch(
+            file_env,
+            [f"{git_dir}/HEAD", f"{git_dir}/packed-refs"],
+            [f"{git_dir}/refs"],
+        )
+        self._git_env = git_env
+        self._github_env = None
+        self._cfg = None
+
+    def run(self, console_env: console.Env, args: List[str]) -> None:
+        if self._watch.changed():
+            self.close()
+        git_env = self._git_env
+        if git_env is None:
+            git_env = self._git_env = self._new_git_env()
+        if self._refs_watch.changed():
+            git.refs_changed(git_env)
+        cfg = self._cfg
+        if cfg is None:
+            cfg = self._cfg = config.load(
+                console.Env(),
+                self._file_env,
+                self._root_dir,
+            )
+        github_env = self._github_env
+        if github_env is None:
+            github_env = self._github_env = self._new_github_env(git_env, cfg)
+        context = CommandContext(
+            self._log_sections,
+            console_env,
+            self._file_env,
+            git_env,
+            self._root_dir,
+            cfg,
+            github_env,
+        )
+        self._dispatch(context, args)
+
+    def close(self) -> None:
+        if self._git_env is not None:
+            git.close(self._git_env)
+        if self._github_env is not None:
+            github.close(self._github_env)
+        self._git_env = None
+        self._github_env = None
+        self._cfg = None
+
+
+class SocketConsoleEnv(console.Env):
+    """
+    Sends the console output to the CLI the command came from.
+    """
+
+    connection: socket.socket
+    connected: bool
+
+    def __init__(self, connection: socket.socket) -> None:
+        super().__init__()
+        self.connection = connection
+        self.connected = True
+
+    def _print(self, message: str) -> None:
+        if self.connected:
+            try:
+                send(self.connection, {"out": message})
+            except OSError:
+                self.connected = False
+
+
+def serve(
+    path: str,
+    run: Callable[[console.Env, List[str]], None],
+) -> None:
+    """
+    Runs each command sent to the socket, one at a time, until asked to
+    stop.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(path)
+        os.chmod(path, 0o600)
+        server.listen()
+        try:
+            while True:
+                connection, _ = server.accept()
+                with connection:
+                    if not serve_request(connection, run):
+                        return
+        finally:
+            os.remove(path)
+
+
+def serve_request(
+    connection: socket.socket,
+    run: Callable[[console.Env, List[str]], None],
+) -> bool:
+    """
+    Runs the command sent on the connection, returning False when the
+    daemon has been asked to stop.
+    """
+    try:
+        request = next(receive(connection), {})
+    except (OSError, ValueError):
+        return True
+    if request.get("stop"):
+        reply(connection, {"exit": 0})
+        return False
+    args = request.get("args")
+    if not args:
+        return True
+    console_env = SocketConsoleEnv(connection)
+    code = run_request(console_env, run, args)
+    reply(connection, {"exit": code})
+    return True
+
+
+def run_request(
+    console_env: console.Env,
+    run: Callable[[console.Env, List[str]], None],
+    args: List[str],
+) -> int:
+    """
+    Runs the command, returning the exit code it would have exited the CLI
+    with. No error stops the daemon.
+    """
+    try:
+        run(console_env, args)
+    except SystemExit as error:
+        if error.code is None or isinstance(error.code, int):
+            return error.code or 0
+        console.error(console_env, f"{error.code}")
+        return 1
+    except GitZenError as error:
+        console.error(console_env, error.message)
+        return error.exit_code
+    except Exception as error:
+        console.error(console_env, f"{type(error).__name__}: {error}")
+        return exit_code.DAEMON_ERROR
+    return 0
+
+
+def reply(connection: socket.socket, message: Dict[str, Any]) -> None:
+    try:
+        send(connection, message)
+    except OSError:
+        pass
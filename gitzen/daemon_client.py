@@ -0,0 +1,95 @@
+import json
+import os
+import socket
+from typing import Any, Dict, Iterator, List, Optional
+
+from gitzen import exit_code
+
+# The commands the CLI hands over to a running daemon
+forwarded_commands = ["status", "push", "merge", "sync"]
+
+
+def socket_path(git_dir: str) -> str:
+    return f"{git_dir}/gitzen/daemon.sock"
+
+
+def find_socket(cwd: str) -> Optional[str]:
+    """
+    Returns the daemon socket of the repo holding cwd, if there is one.
+    The repo is found without running git, so forwarding stays cheap.
+    """
+    directory = os.path.abspath(cwd)
+    while True:
+        git_dir = os.path.join(directory, ".git")
+        if os.path.isdir(git_dir):
+            path = socket_path(git_dir)
+            return path if os.path.exists(path) else None
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def forward(cwd: str, args: List[str]) -> Optional[int]:
+    """
+    Runs the command in the repo's daemon, printing its output and
+    returning its exit code. Returns None, without running anything, if
+    there is no daemon to run it.
+    """
+    if len(args) == 0 or args[0] not in forwarded_commands:
+        return None
+    if any(option in args for option in ["--log", "--trace", "--profile"]):
+        return None
+    path = find_socket(cwd)
+    if path is None:
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except OSError:
+        # left behind by a daemon that has gone
+        client.close()
+        return None
+    with client:
+        try:
+            send(client, {"args": args})
+            for message in receive(client):
+                if "out" in message:
+                    print(message["out"])
+                if "exit" in message:
+                    return message["exit"]
+        except (OSError, ValueError):
+            pass
+    print("ERROR: Lost contact with the gitzen daemon")
+    return exit_code.DAEMON_ERROR
+
+
+def stop(cwd: str) -> bool:
+    """
+    Asks the repo's daemon to stop, returning whether there was one.
+    """
+    path = find_socket(cwd)
+    if path is None:
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+            send(client, {"stop": True})
+            for _ in receive(client):
+                pass
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def send(connection: socket.socket, message: Dict[str, Any]) -> None:
+    connection.sendall(f"{json.dumps(message)}\n".encode())
+
+
+def receive(connection: socket.socket) -> Iterator[Dict[str, Any]]:
+    """
+    Yields each message sent on the connection.
+    """
+    with connection.makefile("r") as reader:
+        for line in reader:
+            yield json.loads(line)
@@ -8,3 +8,6 @@ LOCAL_COMMIT_REMOTE_PR_DIFFERENT_HASH: int = 7
 PULL_REJECTED: int = 8
 GIT_ERROR: int = 9
 UNSUPPORTED_BRANCH_FOR_PUSH: int = 10
+GITHUB_ERROR: int = 11
+DAEMON_ERROR: int = 12
+PUSH_JOURNAL_OUT_OF_DATE: int = 13
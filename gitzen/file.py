@@ -1,6 +1,8 @@
-from typing import IO, Any, List
+import io
+import os
+from typing import IO, Any, List, Optional, Set, Tuple
 
-from gitzen import logger
+from gitzen import logger, trace
 
 
 class Env:
@@ -13,6 +15,21 @@ class Env:
     def open(self, filename: str, mode: str) -> IO[Any]:
         pass
 
+    def make_dirs(self, dirname: str) -> None:
+        pass
+
+    def version(self, filename: str) -> Optional[Tuple[int, int]]:
+        pass
+
+    def directories(self, dirname: str) -> List[str]:
+        pass
+
+    def remove(self, filename: str) -> None:
+        pass
+
+    def replace(self, source: str, filename: str) -> None:
+        pass
+
 
 class RealEnv(Env):
     logger_env: logger.Env
@@ -27,19 +44,93 @@ class RealEnv(Env):
     def write(self, filename: str, contents: List[str]) -> None:
         self._log(f"write '{filename}'")
         [self._log(f"| {line}") for line in contents]
-        with open(filename, "w") as f:
-            f.write("\n".join(contents))
+        with trace.span("write", "file", filename=filename) as traced:
+            with open(filename, "w") as f:
+                traced.set("bytes_in", f.write("\n".join(contents)))
 
     def read(self, filename: str) -> List[str]:
         self._log(f"read '{filename}'")
-        with open(filename, "r") as f:
-            contents = f.read().splitlines()
-            [self._log(f"| {line}") for line in contents]
-            return contents
+        with trace.span("read", "file", filename=filename) as traced:
+            with open(filename, "r") as f:
+                text = f.read()
+            traced.set("bytes_out", len(text))
+        contents = text.splitlines()
+        [self._log(f"| {line}") for line in contents]
+        return contents
 
     def open(self, filename: str, mode: str) -> IO[Any]:
         self._log(f"open '{filename}' [{mode}]")
-        return open(filename, mode)
+        with trace.span("open", "file", filename=filename, mode=mode):
+            return open(filename, mode)
+
+    def make_dirs(self, dirname: str) -> None:
+        self._log(f"make dirs '{dirname}'")
+        os.makedirs(dirname, exist_ok=True)
+
+    def version(self, filename: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def directories(self, dirname: str) -> List[str]:
+        return [path for path, _, _ in os.walk(dirname)]
+
+    def remove(self, filename: str) -> None:
+        self._log(f"remove '{filename}'")
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+
+    def replace(self, source: str, filename: str) -> None:
+        self._log(f"replace '{filename}' with '{source}'")
+        os.replace(source, filename)
+
+
+class DryRunEnv(Env):
+    """
+    Reads through to another env, but drops every change. A file written
+    reads as it was, and has no version, so it is never taken as parsed.
+    """
+
+    env: Env
+    _changed: Set[str]
+
+    def __init__(self, env: Env) -> None:
+        super().__init__()
+        self.env = env
+        self._changed = set()
+
+    def write(self, filename: str, contents: List[str]) -> None:
+        self._changed.add(filename)
+
+    def read(self, filename: str) -> List[str]:
+        return self.env.read(filename)
+
+    def open(self, filename: str, mode: str) -> IO[Any]:
+        if mode == "r":
+            return self.env.open(filename, mode)
+        self._changed.add(filename)
+        return io.StringIO()
+
+    def make_dirs(self, dirname: str) -> None:
+        pass
+
+    def version(self, filename: str) -> Optional[Tuple[int, int]]:
+        if filename in self._changed:
+            return None
+        return self.env.version(filename)
+
+    def directories(self, dirname: str) -> List[str]:
+        return self.env.directories(dirname)
+
+    def remove(self, filename: str) -> None:
+        self._changed.add(filename)
+
+    def replace(self, source: str, filename: str) -> None:
+        self._changed.add(filename)
 
 
 def write(env: Env, filename: str, contents: List[str]) -> None:
@@ -56,3 +147,41 @@ def io_read(env: Env, filename: str) -> IO[Any]:
 
 def io_write(env: Env, filename: str) -> IO[Any]:
     return env.open(filename, "w")
+
+
+def io_append(env: Env, filename: str) -> IO[Any]:
+    return env.open(filename, "a")
+
+
+def make_dirs(env: Env, dirname: str) -> None:
+    env.make_dirs(dirname)
+
+
+def version(env: Env, filename: str) -> Optional[Tuple[int, int]]:
+    """
+    Returns the modified time and size of the file, which change whenever
+    it is written, or None if it is missing.
+    """
+    return env.version(filename)
+
+
+def directories(env: Env, dirname: str) -> List[str]:
+    """
+    Returns the directory and every directory below it, or an empty list
+    if it is missing.
+    """
+    return env.directories(dirname)
+
+
+def remove(env: Env, filename: str) -> None:
+    """
+    Removes the file, if it exists.
+    """
+    env.remove(filename)
+
+
+def replace(env: Env, source: str, filename: str) -> None:
+    """
+    Moves the source file over the file, in one step.
+    """
+    env.replace(source, filename)
@@ -1,34 +1,135 @@
 import os
 import shlex
 import subprocess
-from os import mkdir
-from os.path import isdir
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from genericpath import exists
-
-from gitzen import exit_code, file, logger
+from gitzen import exit_code, logger, trace
+from gitzen.models.commit_object import CommitObject
 from gitzen.models.git_patch import GitPatch
 from gitzen.models.gitzen_error import GitZenError
-
-# trunk-ignore(flake8/E501)
-from gitzen.types import CommitHash, GitBranchName, GitRemoteName, GitRootDir, ZenToken
+from gitzen.models.ref_tip import RefTip
+from gitzen.models.ref_transaction import RefTransaction
+from gitzen.types import (
+    CommitHash,
+    GitBranchName,
+    GitRemoteName,
+    GitRootDir,
+    TreeHash,
+    ZenToken,
+)
+
+# the refs of the patches and of the pr branches of every author
+gitzen_ref_prefixes = ["refs/gitzen/patches/", "refs/heads/gitzen/pr/"]
+# the git commands gitzen runs that can move refs
+ref_writing_commands = [
+    "branch",
+    "cherry-pick",
+    "commit",
+    "fetch",
+    "pull",
+    "push",
+    "rebase",
+    "reset",
+    "switch",
+    "update-ref",
+]
 
 
 class Env:
     def _git(self, args: str) -> Tuple[Optional[int], List[str]]:
         pass
 
+    def _git_stdin(
+        self,
+        args: str,
+        input: str,
+    ) -> Tuple[Optional[int], List[str]]:
+        pass
+
+    def _git_output(
+        self,
+        args: str,
+        input: Optional[str] = None,
+    ) -> Tuple[Optional[int], bytes]:
+        """
+        Returns the exit code and the output of git as it was written,
+        leaving out anything written to stderr.
+        """
+        if input is None:
+            rc, lines = self._git(args)
+        else:
+            rc, lines = self._git_stdin(args, input)
+        return rc, "\n".join(lines).encode()
+
+    def _cat_file(self, ref: str) -> Optional[Tuple[str, str, bytes]]:
+        """
+        Returns the hash, type and contents of the object named by ref,
+        or None if there is no such object.
+        """
+        pass
+
+    def _cat_file_check(self, ref: str) -> Optional[Tuple[str, str, int]]:
+        """
+        Returns the hash, type and size of the object named by ref,
+        or None if there is no such object.
+        """
+        pass
+
+    def close(self) -> None:
+        pass
+
     def write_patch(self, patch: GitPatch) -> None:
         pass
 
+    def _git_dir(self) -> str:
+        rc, lines = self._git("rev-parse --absolute-git-dir")
+        if rc or len(lines) == 0:
+            raise GitZenError(
+                rc or exit_code.GIT_ERROR,
+                "Unable to find the git dir",
+            )
+        return lines[0]
+
+    def _ref_tips(self, prefixes: List[str]) -> Dict[str, RefTip]:
+        fields = ["%(refname)", "%(objectname)", "%(tree)", "%(parent)"]
+        rc, lines = self._git(
+            f"for-each-ref --format={'%00'.join(fields)} {' '.join(prefixes)}"
+        )
+        if rc:
+            raise GitZenError(rc, "Unable to list refs")
+        tips: Dict[str, RefTip] = {}
+        for line in lines:
+            ref, hash, tree, parents = line.split("\0")
+            tips[ref] = RefTip(
+                CommitHash(hash),
+                TreeHash(tree),
+                [CommitHash(parent) for parent in parents.split()],
+            )
+        return tips
+
+    def refs_changed(self) -> None:
+        pass
+
 
 class RealEnv(Env):
     logger_env: logger.Env
+    # long-lived `git cat-file` processes, keyed by mode (batch/batch-check)
+    _cat_files: Dict[str, "subprocess.Popen[bytes]"]
+    _cat_files_cwd: Optional[str]
+    # the git dir of each working directory, which doesn't change while
+    # we run
+    _git_dirs: Dict[str, str]
+    # the last listing of the refs under each set of prefixes, in each
+    # working directory, until a ref may have moved
+    _ref_snapshots: Dict[Tuple[str, str], Dict[str, RefTip]]
 
     def __init__(self, logger_env: logger.Env) -> None:
         super().__init__()
         self.logger_env = logger_env
+        self._cat_files = {}
+        self._cat_files_cwd = None
+        self._git_dirs = {}
+        self._ref_snapshots = {}
 
     def _log(self, message: str) -> None:
         logger.log(self.logger_env, "git", message)
@@ -39,11 +140,73 @@ class RealEnv(Env):
     def _git(self, args: str) -> Tuple[Optional[int], List[str]]:
         git_command = f"git {args}"
         self._log(f"{git_command}")
-        result: subprocess.CompletedProcess[bytes] = subprocess.run(
-            shlex.split(git_command),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-        )
+        self._moving_refs(args)
+        with span(args) as traced:
+            result: subprocess.CompletedProcess[bytes] = subprocess.run(
+                shlex.split(git_command),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            traced.set("exit_code", result.returncode)
+            traced.set("bytes_out", len(result.stdout or b""))
+        return self._result(result)
+
+    def _git_stdin(
+        self,
+        args: str,
+        input: str,
+    ) -> Tuple[Optional[int], List[str]]:
+        git_command = f"git {args}"
+        self._log(f"{git_command}")
+        [self._log(f"> {line}") for line in input.splitlines()]
+        self._moving_refs(args)
+        with span(args) as traced:
+            stdin = input.encode()
+            result: subprocess.CompletedProcess[bytes] = subprocess.run(
+                shlex.split(git_command),
+                input=stdin,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            traced.set("exit_code", result.returncode)
+            traced.set("bytes_in", len(stdin))
+            traced.set("bytes_out", len(result.stdout or b""))
+        return self._result(result)
+
+    def _git_output(
+        self,
+        args: str,
+        input: Optional[str] = None,
+    ) -> Tuple[Optional[int], bytes]:
+        git_command = f"git {args}"
+        self._log(f"{git_command}")
+        self._moving_refs(args)
+        with span(args) as traced:
+            stdin = None if input is None else input.encode()
+            result: subprocess.CompletedProcess[bytes] = subprocess.run(
+                shlex.split(git_command),
+                input=stdin,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            traced.set("exit_code", result.returncode)
+            if stdin is not None:
+                traced.set("bytes_in", len(stdin))
+            traced.set("bytes_out", len(result.stdout or b""))
+        code = None if result.returncode == 0 else result.returncode
+        if code:
+            self._log(f"< {code}")
+        stderr = (result.stderr or b"").decode(errors="replace")
+        [self._log(f"! {line}") for line in stderr.splitlines()]
+        stdout = result.stdout or b""
+        self._log(f"| {len(stdout)} bytes")
+        self._log("\\------------------")
+        return code, stdout
+
+    def _result(
+        self,
+        result: "subprocess.CompletedProcess[bytes]",
+    ) -> Tuple[Optional[int], List[str]]:
         code = None if result.returncode == 0 else result.returncode
         if code:
             self._log(f"< {code}")
@@ -57,23 +220,104 @@ class RealEnv(Env):
             self._log("\\------------------")
             return code, []
 
-
-def gitzen_refs(root_dir: GitRootDir) -> str:
-    return f"{root_dir.value}/.git/refs/gitzen"
-
-
-def gitzen_patches(root_dir: GitRootDir) -> str:
-    return f"{gitzen_refs(root_dir)}/patches"
-
-
-def gitzen_patch_file(zen_token: ZenToken, root_dir: GitRootDir) -> str:
-    return f"{gitzen_patches(root_dir)}/{zen_token.value}"
+    def _git_dir(self) -> str:
+        cwd = os.getcwd()
+        if cwd not in self._git_dirs:
+            self._git_dirs[cwd] = super()._git_dir()
+        return self._git_dirs[cwd]
+
+    def _ref_tips(self, prefixes: List[str]) -> Dict[str, RefTip]:
+        key = (os.getcwd(), " ".join(prefixes))
+        if key not in self._ref_snapshots:
+            self._ref_snapshots[key] = super()._ref_tips(prefixes)
+        return dict(self._ref_snapshots[key])
+
+    def refs_changed(self) -> None:
+        self._ref_snapshots = {}
+
+    def _moving_refs(self, args: str) -> None:
+        if args.split(" ", 1)[0] in ref_writing_commands:
+            self.refs_changed()
+
+    def _cat_file_process(self, mode: str) -> "subprocess.Popen[bytes]":
+        cwd = os.getcwd()
+        if self._cat_files_cwd != cwd:
+            # the processes are bound to the repo they were started in
+            self.close()
+            self._cat_files_cwd = cwd
+        process = self._cat_files.get(mode)
+        if process is None or process.poll() is not None:
+            self._log(f"git cat-file --{mode} (started)")
+            process = subprocess.Popen(
+                ["git", "cat-file", f"--{mode}"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+            self._cat_files[mode] = process
+        return process
+
+    def _cat_file_header(
+        self,
+        mode: str,
+        ref: str,
+    ) -> Tuple["subprocess.Popen[bytes]", Optional[Tuple[str, str, int]]]:
+        process = self._cat_file_process(mode)
+        stdin = process.stdin
+        stdout = process.stdout
+        assert stdin is not None and stdout is not None
+        stdin.write(f"{ref}\n".encode())
+        stdin.flush()
+        header = stdout.readline().decode().rstrip("\n")
+        self._log(f"cat-file {ref}")
+        self._log(f"| {header}")
+        fields = header.split(" ")
+        if len(fields) != 3:
+            # "<ref> missing" or "<ref> ambiguous"
+            return process, None
+        hash, type, size = fields
+        return process, (hash, type, int(size))
+
+    def _cat_file(self, ref: str) -> Optional[Tuple[str, str, bytes]]:
+        with span(f"cat-file --batch {ref}") as traced:
+            process, header = self._cat_file_header("batch", ref)
+            if header is None:
+                return None
+            hash, type, size = header
+            stdout = process.stdout
+            assert stdout is not None
+            contents = stdout.read(size)
+            stdout.read(1)  # trailing newline
+            traced.set("bytes_out", size)
+        return hash, type, contents
+
+    def _cat_file_check(self, ref: str) -> Optional[Tuple[str, str, int]]:
+        with span(f"cat-file --batch-check {ref}"):
+            return self._cat_file_header("batch-check", ref)[1]
+
+    def close(self) -> None:
+        for process in self._cat_files.values():
+            if process.stdin is not None:
+                process.stdin.close()
+            process.wait()
+        self._cat_files = {}
+
+
+def span(args: str) -> trace.Span:
+    return trace.span(f"git {args.split(' ', 1)[0]}", "git", args=args)
+
+
+def branch_ref(branch: GitBranchName) -> str:
+    return f"refs/heads/{branch.value}"
 
 
 def gitzen_patch_ref(zen_token: ZenToken) -> GitBranchName:
     return GitBranchName(f"gitzen/patches/{zen_token.value}")
 
 
+def gitzen_patch_full_ref(zen_token: ZenToken) -> str:
+    return f"refs/{gitzen_patch_ref(zen_token).value}"
+
+
 # will exit the program if called from outside a git repo
 def root_dir(
     git_env: Env,
@@ -84,39 +328,134 @@ def root_dir(
     return GitRootDir(output[0])
 
 
-def outdated_patch(
-    file_env: file.Env,
-    patch: GitPatch,
-    root_dir: GitRootDir,
-) -> bool:
-    filename = gitzen_patch_file(patch.zen_token, root_dir)
-    if os.path.exists(filename):
-        hashes = file.read(file_env, filename)
-        hash = CommitHash(hashes[0])
-        return hash != patch.hash
-    return True
-
-
 def write_patch(
-    file_env: file.Env,
+    git_env: Env,
     patch: GitPatch,
-    root_dir: GitRootDir,
 ) -> None:
-    patches_dir = gitzen_patches(root_dir)
-    if not isdir(patches_dir):
-        mkdir(gitzen_refs(root_dir))
-        mkdir(patches_dir)
-    file.write(
-        file_env,
-        gitzen_patch_file(patch.zen_token, root_dir),
-        [patch.hash.value],
-    )
+    transaction = RefTransaction()
+    transaction.update(gitzen_patch_full_ref(patch.zen_token), patch.hash)
+    update_refs(git_env, transaction)
+
+
+def delete_patch(git_env: Env, zen_token: ZenToken) -> None:
+    hash = ref_hash(git_env, gitzen_patch_ref(zen_token))
+    if hash is not None:
+        transaction = RefTransaction()
+        transaction.delete(gitzen_patch_full_ref(zen_token), hash)
+        update_refs(git_env, transaction)
+
+
+def update_refs(
+    git_env: Env,
+    transaction: RefTransaction,
+) -> List[str]:
+    """
+    Applies every change in the transaction atomically, with a single
+    'git update-ref --stdin' process.
+    """
+    if len(transaction) == 0:
+        return []
+    commands = ["start", *transaction.commands, "prepare", "commit", ""]
+    rc, log = git_env._git_stdin("update-ref --stdin", "\n".join(commands))
+    if rc:
+        raise GitZenError(rc, "Unable to update refs")
+    return log
+
+
+def close(git_env: Env) -> None:
+    git_env.close()
+
+
+def object_type(git_env: Env, ref: GitBranchName) -> Optional[str]:
+    found = git_env._cat_file_check(ref.value)
+    if found is None:
+        return None
+    return found[1]
+
+
+def ref_hash(git_env: Env, ref: GitBranchName) -> Optional[CommitHash]:
+    """
+    Returns the hash of the commit that ref points to, or None.
+    """
+    found = git_env._cat_file_check(f"{ref.value}^{{commit}}")
+    if found is None:
+        return None
+    return CommitHash(found[0])
 
 
-def delete_patch(zen_token: ZenToken, root_dir: GitRootDir) -> None:
-    patch_file = gitzen_patch_file(zen_token, root_dir)
-    if exists(patch_file):
-        os.remove(patch_file)
+def head_hash(git_env: Env) -> CommitHash:
+    hash = ref_hash(git_env, GitBranchName("HEAD"))
+    if hash is None:
+        raise GitZenError(exit_code.GIT_ERROR, "Unable to resolve HEAD")
+    return hash
+
+
+def tree_hash(git_env: Env, ref: GitBranchName) -> Optional[TreeHash]:
+    """
+    Returns the hash of the tree of the commit that ref points to, or None.
+    """
+    found = git_env._cat_file_check(f"{ref.value}^{{tree}}")
+    if found is None:
+        return None
+    return TreeHash(found[0])
+
+
+def ref_tips(git_env: Env, prefixes: List[str]) -> Dict[str, RefTip]:
+    """
+    Returns the commit each ref under the prefixes points to, keyed by the
+    full ref name, listed by a single for-each-ref. The listing is kept
+    until gitzen runs a git command that can move a ref, or is told the
+    refs have changed.
+    """
+    return git_env._ref_tips(prefixes)
+
+
+def refs_changed(git_env: Env) -> None:
+    """
+    Drops the listing of the refs, as something else has moved them.
+    """
+    git_env.refs_changed()
+
+
+def tree_hashes(
+    git_env: Env,
+    hashes: List[CommitHash],
+) -> Dict[CommitHash, TreeHash]:
+    """
+    Returns the hash of the tree of each commit, read with a single log.
+    """
+    if len(hashes) == 0:
+        return {}
+    records = log_records(git_env, "--no-walk=unsorted", ["%H", "%T"], hashes)
+    return {CommitHash(hash): TreeHash(tree) for hash, tree in records}
+
+
+def read_commit(git_env: Env, ref: GitBranchName) -> Optional[CommitObject]:
+    found = git_env._cat_file(f"{ref.value}^{{commit}}")
+    if found is None:
+        return None
+    hash, _, contents = found
+    return parse_commit_object(CommitHash(hash), contents.decode())
+
+
+def parse_commit_object(hash: CommitHash, contents: str) -> CommitObject:
+    headers, _, message = contents.partition("\n\n")
+    tree = TreeHash("")
+    parents: List[CommitHash] = []
+    author = ""
+    committer = ""
+    for header in headers.splitlines():
+        # continuation lines (e.g. gpgsig) start with a space
+        key, _, value = header.partition(" ")
+        if key == "tree":
+            tree = TreeHash(value)
+        elif key == "parent":
+            parents.append(CommitHash(value))
+        elif key == "author":
+            author = value
+        elif key == "committer":
+            committer = value
+    return CommitObject(hash, tree, parents, author, committer, message)
 
 
 def branch(git_env: Env) -> Tuple[Optional[int], List[str]]:
@@ -180,6 +519,27 @@ def cherry_pick_continue(
     return git_env._git("cherry-pick --continue")[1]
 
 
+def commit_tree(
+    git_env: Env,
+    tree: TreeHash,
+    parents: List[CommitHash],
+    message: List[str],
+) -> CommitHash:
+    """
+    Creates a commit object for the tree, without touching the worktree,
+    index or any refs. Returns the hash of the new commit.
+    """
+    parent_args = "".join(f"-p {parent.value} " for parent in parents)
+    text = shlex.quote("\n".join(message))
+    rc, log = git_env._git(f"commit-tree {parent_args}-m {text} {tree.value}")
+    if rc or len(log) == 0:
+        raise GitZenError(
+            rc or exit_code.GIT_ERROR,
+            f"Unable to create commit for tree {tree.value}",
+        )
+    return CommitHash(log[-1])
+
+
 def config_set(
     git_env: Env,
     key: str,
@@ -254,6 +614,40 @@ def log(
     return git_env._git(f"log --no-color {args}")[1]
 
 
+def log_records(
+    git_env: Env,
+    revision_range: str,
+    fields: List[str],
+    hashes: Optional[List[CommitHash]] = None,
+) -> List[List[str]]:
+    """
+    Returns the fields of each commit in the range, newest first, where
+    fields are git log format placeholders, e.g. "%H".
+    Any hashes are passed to git on stdin, so there can be any number.
+    With -z, fields and commits are both separated by NUL, so the fields
+    may contain newlines. The output is split as git wrote it, as any
+    line ending or stderr mixed in would move the fields.
+    """
+    format = "%x00".join(fields)
+    args = f"log -z --format={format} {revision_range}"
+    if hashes is None:
+        rc, output = git_env._git_output(args)
+    else:
+        rc, output = git_env._git_output(
+            f"{args} --stdin",
+            "\n".join(hash.value for hash in hashes),
+        )
+    if rc:
+        raise GitZenError(rc, f"Unable to read log for {revision_range}")
+    values = output.decode().split("\0")
+    size = len(fields)
+    records = []
+    for start in range(0, len(values) - size + 1, size):
+        end = start + size
+        records.append(values[start:end])
+    return records
+
+
 def status(
     git_env: Env,
 ) -> List[str]:
@@ -319,6 +713,55 @@ def push_force_with_lease(
     return log
 
 
+def push_atomic(
+    git_env: Env,
+    remote: GitRemoteName,
+    branches: List[Tuple[GitBranchName, Optional[CommitHash]]],
+) -> List[str]:
+    """
+    Pushes all the branches in a single atomic push. Each branch is paired
+    with the hash it is expected to have on the remote, or None if it
+    is expected to not exist there yet.
+    """
+    if len(branches) == 0:
+        return []
+    leases = " ".join(
+        f"--force-with-lease={branch.value}:"
+        + ("" if expected is None else expected.value)
+        for branch, expected in branches
+    )
+    refspecs = " ".join(
+        f"{branch.value}:{branch.value}" for branch, _ in branches
+    )
+    rc, log = git_env._git(
+        f"push --atomic {leases} {remote.value} {refspecs}",
+    )
+    if rc:
+        names = ", ".join(branch.value for branch, _ in branches)
+        raise GitZenError(
+            rc,
+            (
+                f"Unable to push changes to remote {remote.value} "
+                f"from local branches {names}"
+            ),
+        )
+    return log
+
+
+def remote_branch_hash(
+    git_env: Env,
+    remote: GitRemoteName,
+    branch: GitBranchName,
+) -> Optional[CommitHash]:
+    """
+    Returns the hash of the remote tracking branch, as of the last fetch.
+    """
+    return ref_hash(
+        git_env,
+        GitBranchName(f"refs/remotes/{remote.value}/{branch.value}"),
+    )
+
+
 def rebase(
     git_env: Env,
     target: GitBranchName,
@@ -367,6 +810,25 @@ def restore_staged_worktree(
     return log
 
 
+def rev_list(
+    git_env: Env,
+    revision_range: str,
+) -> List[CommitHash]:
+    """
+    Returns the hashes of the commits in the range, newest first.
+    """
+    rc, lines = git_env._git(f"rev-list {revision_range}")
+    if rc:
+        raise GitZenError(rc, f"Unable to list commits for {revision_range}")
+    return [CommitHash(line) for line in lines]
+
+
+def git_dir(
+    git_env: Env,
+) -> str:
+    return git_env._git_dir()
+
+
 def rev_parse(
     git_env: Env,
     args: str = "",
@@ -1,16 +1,35 @@
+import http.client
 import json
+import os
+import queue
 import re
 import shlex
 import subprocess
-from typing import Any, Dict, List
+import threading
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-# trunk-ignore(flake8/E501)
-from gitzen import console, exit_code, git, github, logger, patterns, repo, zen_token
+from gitzen import (
+    cache,
+    console,
+    exit_code,
+    file,
+    git,
+    github,
+    logger,
+    patterns,
+    repo,
+    trace,
+    zen_token,
+)
 from gitzen.models.git_commit import GitCommit
 from gitzen.models.github_commit import GithubCommit
 from gitzen.models.github_info import GithubInfo
 from gitzen.models.github_pull_request import PullRequest
 from gitzen.models.gitzen_error import GitZenError
+from gitzen.models.pull_request_snapshot import PullRequestSnapshot
+from gitzen.models.pull_request_update import PullRequestUpdate
 from gitzen.types import (
     CommitBody,
     CommitHash,
@@ -42,6 +61,9 @@ class Env:
     ) -> List[str]:
         pass
 
+    def close(self) -> None:
+        pass
+
 
 class RealEnv(github.Env):
     logger_env: logger.Env
@@ -66,7 +88,11 @@ class RealEnv(github.Env):
             args.append(f"{pair}=" + params[pair])
         args.append("-f")
         args.append(f"query={query}")
-        result = subprocess.run(args, stdout=subprocess.PIPE)
+        with trace.span("gh graphql", "github", params=params) as traced:
+            result = subprocess.run(args, stdout=subprocess.PIPE)
+            traced.set("exit_code", result.returncode)
+            traced.set("bytes_in", len(query))
+            traced.set("bytes_out", len(result.stdout or b""))
         stdout = result.stdout
         if stdout:
             return json.loads(stdout.decode())
@@ -79,11 +105,14 @@ class RealEnv(github.Env):
     ) -> List[str]:
         self._log(args)
         gh_command = shlex.split(f"gh {args}")
-        result = subprocess.run(
-            gh_command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-        )
+        with gh_span(args) as traced:
+            result = subprocess.run(
+                gh_command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            traced.set("exit_code", result.returncode)
+            traced.set("bytes_out", len(result.stdout or b""))
         stdout = result.stdout
         if stdout:
             lines = stdout.decode().splitlines()
@@ -95,143 +124,885 @@ class RealEnv(github.Env):
             return []
 
 
+class HttpEnv(github.Env):
+    """
+    Talks to the Github API directly, rather than running gh for each call.
+
+    Connections are kept alive in a pool and reused between requests, and
+    the auth token is resolved once. The gh commands used by gitzen are
+    translated into the matching API requests.
+
+    GET responses are kept with their ETag, and asked for again
+    conditionally, so unchanged resources don't count against the rate
+    limit. Given a file_env, the ETags are kept between runs.
+    """
+
+    logger_env: logger.Env
+    git_env: git.Env
+    file_env: Optional[file.Env]
+    _api_url: Optional[str]
+    _graphql_url: Optional[str]
+    _token: Optional[str]
+    _host: Optional[str]
+    _repo_owner: Optional[str]
+    _repo_name: Optional[str]
+    _pools: Dict[str, "queue.LifoQueue[http.client.HTTPConnection]"]
+    _lock: threading.Lock
+    _etags: Optional[Dict[str, Tuple[str, Any]]]
+    _etags_changed: bool
+
+    def __init__(
+        self,
+        logger_env: logger.Env,
+        git_env: git.Env,
+        api_url: Optional[str] = None,
+        token: Optional[str] = None,
+        repo_owner: Optional[str] = None,
+        repo_name: Optional[str] = None,
+        file_env: Optional[file.Env] = None,
+    ) -> None:
+        super().__init__()
+        self.logger_env = logger_env
+        self.git_env = git_env
+        self.file_env = file_env
+        self._api_url = api_url
+        self._graphql_url = None if api_url is None else f"{api_url}/graphql"
+        self._token = token
+        self._host = None if api_url is None else "github.com"
+        self._repo_owner = repo_owner
+        self._repo_name = repo_name
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._etags = None
+        self._etags_changed = False
+
+    def _log(self, message: str) -> None:
+        logger.log(self.logger_env, "github", message)
+
+    def _graphql(
+        self,
+        params: Dict[str, str],
+        query: str,
+    ) -> Dict[str, Any]:
+        self._log("POST graphql ...")
+        variables = {
+            name: self._fill_placeholders(value)
+            for name, value in params.items()
+        }
+        with trace.span("graphql", "github", params=params):
+            return self._request(
+                "POST",
+                self._endpoints()[1],
+                {"query": query, "variables": variables},
+            )
+
+    def _gh(
+        self,
+        args: str,
+    ) -> List[str]:
+        self._log(args)
+        command, positional, options = parse_gh_args(shlex.split(args))
+        handlers: Dict[
+            str, Callable[[List[str], Dict[str, Optional[str]]], List[str]]
+        ] = {
+            "pr create": self._pr_create,
+            "pr edit": self._pr_edit,
+            "pr comment": self._pr_comment,
+            "pr close": self._pr_close,
+            "pr merge": self._pr_merge,
+        }
+        if command not in handlers:
+            raise GitZenError(
+                exit_code.GITHUB_ERROR,
+                f"Unsupported gh command: {args}",
+            )
+        with gh_span(args):
+            lines = handlers[command](positional, options)
+        [self._log(f"| {line}") for line in lines]
+        self._log("\\------------------")
+        return lines
+
+    def _pr_create(
+        self,
+        positional: List[str],
+        options: Dict[str, Optional[str]],
+    ) -> List[str]:
+        pr = self._rest(
+            "POST",
+            "pulls",
+            {
+                "head": options["--head"],
+                "base": options["--base"],
+                "title": options["--title"],
+                "body": options["--body"],
+            },
+        )
+        return [pr["html_url"]]
+
+    def _pr_edit(
+        self,
+        positional: List[str],
+        options: Dict[str, Optional[str]],
+    ) -> List[str]:
+        number = self._pr_number(positional[0])
+        changes = {
+            name: options[f"--{name}"]
+            for name in ["base", "title", "body"]
+            if f"--{name}" in options
+        }
+        pr = self._rest("PATCH", f"pulls/{number}", changes)
+        return [pr["html_url"]]
+
+    def _pr_comment(
+        self,
+        positional: List[str],
+        options: Dict[str, Optional[str]],
+    ) -> List[str]:
+        number = self._pr_number(positional[0])
+        comment = self._rest(
+            "POST",
+            f"issues/{number}/comments",
+            {"body": options["--body"]},
+        )
+        return [comment["html_url"]]
+
+    def _pr_close(
+        self,
+        positional: List[str],
+        options: Dict[str, Optional[str]],
+    ) -> List[str]:
+        number = self._pr_number(positional[0])
+        if "--comment" in options:
+            self._rest(
+                "POST",
+                f"issues/{number}/comments",
+                {"body": options["--comment"]},
+            )
+        self._rest("PATCH", f"pulls/{number}", {"state": "closed"})
+        return [f"Closed pull request #{number}"]
+
+    def _pr_merge(
+        self,
+        positional: List[str],
+        options: Dict[str, Optional[str]],
+    ) -> List[str]:
+        number = self._pr_number(positional[0])
+        pr = self._rest("GET", f"pulls/{number}")
+        head_hash = options.get("--match-head-commit")
+        if "--auto" in options:
+            response = self._graphql(
+                {
+                    "pr_id": pr["node_id"],
+                    "head_hash": head_hash or pr["head"]["sha"],
+                },
+                mutation_enable_auto_merge,
+            )
+            if not response.get("errors"):
+                return [f"Pull request #{number} will be automatically merged"]
+            # auto-merge is refused when the pull request can be merged now
+        merge = {"merge_method": "squash"}
+        if head_hash is not None:
+            merge["sha"] = head_hash
+        self._rest("PUT", f"pulls/{number}/merge", merge)
+        if "--delete-branch" in options:
+            self._rest("DELETE", f"git/refs/heads/{pr['head']['ref']}")
+        return [f"Squashed and merged pull request #{number}"]
+
+    def _pr_number(self, pr: str) -> str:
+        """
+        Returns the number of the pull request, given either its number or
+        the name of its head branch.
+        """
+        if pr.isdigit():
+            return pr
+        owner = self._endpoints()[2]
+        query = urllib.parse.urlencode({"head": f"{owner}:{pr}"})
+        prs = self._rest("GET", f"pulls?{query}")
+        if not prs:
+            raise GitZenError(
+                exit_code.GITHUB_ERROR,
+                f"No open Pull Request found for branch {pr}",
+            )
+        return f'{prs[0]["number"]}'
+
+    def _rest(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        api_url, _, owner, name = self._endpoints()
+        return self._request(
+            method,
+            f"{api_url}/repos/{owner}/{name}/{path}",
+            payload,
+        )
+
+    def _fill_placeholders(self, value: str) -> str:
+        """
+        Replaces the {owner} and {repo} placeholders, as gh would.
+        """
+        if "{owner}" not in value and "{repo}" not in value:
+            return value
+        _, _, owner, name = self._endpoints()
+        return value.replace("{owner}", owner).replace("{repo}", name)
+
+    def _endpoints(self) -> Tuple[str, str, str, str]:
+        """
+        Returns the REST and GraphQL URLs and the owner and name of the
+        repository, looking them up from the origin remote on first use.
+        """
+        with self._lock:
+            if self._repo_owner is None or self._repo_name is None:
+                host, owner, name = self._origin_repository()
+                self._host = self._host or host
+                self._repo_owner = self._repo_owner or owner
+                self._repo_name = self._repo_name or name
+            if self._api_url is None or self._graphql_url is None:
+                self._api_url, self._graphql_url = api_urls(f"{self._host}")
+            return (
+                self._api_url,
+                self._graphql_url,
+                self._repo_owner,
+                self._repo_name,
+            )
+
+    def _origin_repository(self) -> Tuple[str, str, str]:
+        for line in git.remote(self.git_env):
+            host, owner, name, found = repo.get_repo_details_from_remote(line)
+            if found:
+                return host, owner, name
+        raise GitZenError(
+            exit_code.GITHUB_ERROR,
+            "Unable to find the Github repository of the origin remote",
+        )
+
+    def _auth_token(self) -> str:
+        with self._lock:
+            if self._token is None:
+                self._token = resolve_token(self._host or "github.com")
+            return self._token
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        body = None if payload is None else json.dumps(payload).encode()
+        headers = {
+            "Authorization": f"bearer {self._auth_token()}",
+            "Accept": "application/vnd.github+json",
+            "User-Agent": "gitzen",
+        }
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        cached = self._cached_response(path) if method == "GET" else None
+        if cached is not None:
+            headers["If-None-Match"] = cached[0]
+        self._log(f"{method} {path}")
+        connection, reused = self._acquire(parts)
+        traced = trace.span(f"{method} {parts.path}", "http", path=path)
+        try:
+            with traced:
+                try:
+                    connection.request(method, path, body, headers)
+                    response = connection.getresponse()
+                except (ConnectionError, http.client.RemoteDisconnected):
+                    if not reused:
+                        raise
+                    # the server closed the idle connection, so open a new
+                    # one
+                    connection.close()
+                    connection = self._connect(parts)
+                    connection.request(method, path, body, headers)
+                    response = connection.getresponse()
+                data = response.read()
+                traced.set("status", response.status)
+                traced.set("bytes_in", len(body or b""))
+                traced.set("bytes_out", len(data))
+        except (OSError, http.client.HTTPException) as error:
+            connection.close()
+            raise GitZenError(
+                exit_code.GITHUB_ERROR,
+                f"Unable to contact Github: {error}",
+            )
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(parts, connection)
+        if response.status == 304 and cached is not None:
+            self._log(f"{method} {path} not modified")
+            return cached[1]
+        if response.status >= 400:
+            raise GitZenError(
+                exit_code.GITHUB_ERROR,
+                f"{method} {path} failed: {response.status} {data.decode()}",
+            )
+        result = json.loads(data) if data else {}
+        etag = response.getheader("ETag")
+        if method == "GET" and etag is not None:
+            self._cache_response(path, etag, result)
+        return result
+
+    def _cached_response(self, path: str) -> Optional[Tuple[str, Any]]:
+        with self._lock:
+            return self._loaded_etags().get(path)
+
+    def _cache_response(self, path: str, etag: str, result: Any) -> None:
+        with self._lock:
+            self._loaded_etags()[path] = (etag, result)
+            self._etags_changed = True
+
+    def _loaded_etags(self) -> Dict[str, Tuple[str, Any]]:
+        if self._etags is None:
+            self._etags = (
+                {}
+                if self.file_env is None
+                else cache.load_etags(self.file_env, self.git_env)
+            )
+        return self._etags
+
+    def _acquire(
+        self,
+        parts: urllib.parse.SplitResult,
+    ) -> Tuple[http.client.HTTPConnection, bool]:
+        """
+        Returns an idle connection from the pool, or a new one, and
+        whether it is being reused.
+        """
+        try:
+            return self._pool(parts).get_nowait(), True
+        except queue.Empty:
+            return self._connect(parts), False
+
+    def _release(
+        self,
+        parts: urllib.parse.SplitResult,
+        connection: http.client.HTTPConnection,
+    ) -> None:
+        self._pool(parts).put(connection)
+
+    def _pool(
+        self,
+        parts: urllib.parse.SplitResult,
+    ) -> "queue.LifoQueue[http.client.HTTPConnection]":
+        key = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = queue.LifoQueue()
+            return self._pools[key]
+
+    def _connect(
+        self,
+        parts: urllib.parse.SplitResult,
+    ) -> http.client.HTTPConnection:
+        if parts.scheme == "http":
+            return http.client.HTTPConnection(parts.netloc, timeout=60)
+        return http.client.HTTPSConnection(parts.netloc, timeout=60)
+
+    def close(self) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+            etags = self._etags if self._etags_changed else None
+            self._etags_changed = False
+        for pool in pools:
+            while not pool.empty():
+                pool.get_nowait().close()
+        if self.file_env is not None and etags is not None:
+            cache.save_etags(self.file_env, self.git_env, etags)
+
+
+def new_env(
+    logger_env: logger.Env,
+    file_env: file.Env,
+    git_env: git.Env,
+    github_client: str,
+) -> Env:
+    """
+    Returns the env for the configured githubClient.
+    """
+    if github_client == "http":
+        return HttpEnv(logger_env, git_env, file_env=file_env)
+    return RealEnv(logger_env)
+
+
+def gh_span(args: str) -> trace.Span:
+    return trace.span(
+        f"gh {' '.join(args.split(' ', 2)[:2])}",
+        "github",
+        args=args,
+    )
+
+
+def parse_gh_args(
+    argv: List[str],
+) -> Tuple[str, List[str], Dict[str, Optional[str]]]:
+    """
+    Splits gh arguments into the command, e.g. 'pr create', its positional
+    arguments and its options.
+    """
+    positional: List[str] = []
+    options: Dict[str, Optional[str]] = {}
+    remaining = argv[2:]
+    while remaining:
+        arg = remaining.pop(0)
+        if not arg.startswith("--"):
+            positional.append(arg)
+        elif arg in gh_flags or not remaining:
+            options[arg] = None
+        else:
+            options[arg] = remaining.pop(0)
+    return " ".join(argv[:2]), positional, options
+
+
+# gh options that take no value
+gh_flags = ["--auto", "--delete-branch", "--squash"]
+
+
+def api_urls(host: str) -> Tuple[str, str]:
+    """
+    Returns the REST and GraphQL URLs for the Github host.
+    """
+    if host == "github.com":
+        return "https://api.github.com", "https://api.github.com/graphql"
+    return f"https://{host}/api/v3", f"https://{host}/api/graphql"
+
+
+def resolve_token(host: str) -> str:
+    """
+    Returns the token from the environment, or else the one gh has stored.
+    """
+    for variable in ["GH_TOKEN", "GITHUB_TOKEN"]:
+        token = os.environ.get(variable)
+        if token:
+            return token
+    try:
+        result = subprocess.run(
+            ["gh", "auth", "token", "--hostname", host],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        token = result.stdout.decode().strip()
+    except OSError:
+        token = ""
+    if not token:
+        raise GitZenError(
+            exit_code.GITHUB_ERROR,
+            "No Github token found. Set GH_TOKEN or run 'gh auth login'.",
+        )
+    return token
+
+
+mutation_enable_auto_merge = """mutation($pr_id: ID!, $head_hash: GitObjectID){
+    enablePullRequestAutoMerge(input: {
+        pullRequestId: $pr_id,
+        mergeMethod: SQUASH,
+        expectedHeadOid: $head_hash
+    }) {
+        clientMutationId
+    }
+}
+"""
+
+# The most pull requests updated in one mutation. Each update counts
+# towards Github's node and complexity limits for a request, and its
+# secondary rate limits for mutations.
+update_chunk_size = 50
+
+# The fields of a pull request, shared by queries and mutations
+pull_request_fields = """fragment PullRequestFields on PullRequest {
+    id
+    number
+    state
+    updatedAt
+    title
+    body
+    baseRefName
+    headRefName
+    mergeable
+    reviewDecision
+    repository {
+        id
+    }
+    commits(first: 100) {
+        pageInfo {
+            hasNextPage
+            endCursor
+        }
+        nodes {
+            commit {
+                oid
+                messageHeadline
+                messageBody
+                statusCheckRollup {
+                    state
+                }
+            }
+        }
+    }
+}
+"""
+
+
 # trunk-ignore(flake8/E501)
 # GraphQL originally from https://github.com/ejoffe/spr/blob/9597afc52354db66d4b419f7ee7a9bd7eacdf70f/github/githubclient/gen/genclient/operations.go#L72
-query_status = """query($repo_owner: String!, $repo_name: String!){
+query_status = """query(
+    $repo_owner: String!,
+    $repo_name: String!,
+    $search_query: String!,
+    $pr_cursor: String
+){
     viewer {
         login
-        repository(name: $repo_name) {
-            pullRequests(first: 100, states: [OPEN]) {
+    }
+    repository(owner: $repo_owner, name: $repo_name) {
+        id
+    }
+    search(query: $search_query, type: ISSUE, first: 100, after: $pr_cursor) {
+        pageInfo {
+            hasNextPage
+            endCursor
+        }
+        nodes {
+            ...PullRequestFields
+        }
+    }
+}
+""" + pull_request_fields
+
+
+# Only our open pull requests from gitzen pr branches are returned.
+# The head qualifier matches branch names with this prefix; the user
+# part of the branch name is covered by 'author:@me', as our login is
+# not known until the query returns.
+# They are sorted oldest first, so the pages keep a stable order. Nothing
+# relies on that order following the stack, as pull requests are created
+# concurrently and matched to commits by zen-token.
+# gh fills in the {owner} and {repo} placeholders.
+pr_search_query = (
+    "repo:{owner}/{repo} is:pr is:open author:@me head:gitzen/pr/"
+    " sort:created-asc"
+)
+
+
+def pr_updated_search_query(synced_at: str) -> str:
+    """
+    Our pull requests updated since the last sync, including any that
+    have been closed or merged, so they can be dropped from the cache.
+    """
+    last = datetime.strptime(synced_at, sync_time_format)
+    since = (last - sync_overlap).strftime(sync_time_format)
+    return (
+        "repo:{owner}/{repo} is:pr author:@me head:gitzen/pr/"
+        f" sort:created-asc updated:>={since}"
+    )
+
+
+query_pr_commits = """query($pr_id: ID!, $commit_cursor: String){
+    node(id: $pr_id) {
+        ... on PullRequest {
+            commits(first: 100, after: $commit_cursor) {
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
                 nodes {
-                    id
-                    number
-                    title
-                    body
-                    baseRefName
-                    headRefName
-                    mergeable
-                    reviewDecision
-                    repository {
-                        id
-                    }
-                    commits(first: 100) {
-                        nodes {
-                            commit {
-                                oid
-                                messageHeadline
-                                messageBody
-                                statusCheckRollup {
-                                    state
-                                }
-                            }
+                    commit {
+                        oid
+                        messageHeadline
+                        messageBody
+                        statusCheckRollup {
+                            state
                         }
                     }
                 }
             }
         }
     }
-    repository(owner: $repo_owner, name: $repo_name) {
-        id
-    }
 }
 """
 
 
-def fetch_info(
+def close(github_env: Env) -> None:
+    github_env.close()
+
+
+@trace.traced
+def sync_info(
     console_env: console.Env,
+    file_env: file.Env,
     git_env: git.Env,
     github_env: Env,
+    full: bool = False,
 ) -> GithubInfo:
-    console.info(console_env, "Contacting Github for existing Pull Requests")
-    data = github_env._graphql(
-        {
-            "repo_owner": "{owner}",
-            "repo_name": "{repo}",
-        },
-        query_status,
-    )["data"]
-    repo_id = GithubRepoId(data["repository"]["id"])
-    viewer = data["viewer"]
-    pr_nodes = viewer["repository"]["pullRequests"]["nodes"]
-    prs: List[PullRequest] = []
-    console.info(console_env, f"Found {len(pr_nodes)} Pull Requests")
-    for pr_node in pr_nodes:
-        pr_repo_id = GithubRepoId(pr_node["repository"]["id"])
-        if repo_id != pr_repo_id:
-            continue
-        base_ref = GitBranchName(pr_node["baseRefName"])
-        head_ref = GitBranchName(pr_node["headRefName"])
-        console.info(console_env, f" - {base_ref.value} <- {head_ref.value}")
-        match = re.search(patterns.remote_pr_branch, head_ref.value)
-        if match is None:
-            console.info(
-                console_env,
-                f"Ignoring Pull Request not created by us: {head_ref.value}",
-            )
-            continue
-        review_node = pr_node["reviewDecision"]
-        review_decision = PullRequestReviewDecision(
-            review_node if review_node is not None else ""
+    """
+    Asks Github for the pull requests updated since the last sync, and
+    merges them into those cached then. All of them are asked for when
+    full is set, or there is no recent sync to build on.
+    Pull requests whose updatedAt hasn't changed are not parsed again.
+    Changes that don't update a pull request, such as its checks
+    finishing, are seen when it is next updated, or at the next full sync.
+    """
+    synced_at = sync_time()
+    cached = None if full else cache.load_pull_requests(file_env, git_env)
+    if cached is None or sync_expired(cached.synced_at, synced_at):
+        console.info(
+            console_env,
+            "Contacting Github for existing Pull Requests",
+        )
+        search_query = pr_search_query
+        entries = []
+    else:
+        console.info(
+            console_env,
+            "Contacting Github for updated Pull Requests",
         )
-        body = PullRequestBody(pr_node["body"])
-        token = zen_token.find_in_body(body)
-        commits = get_commits(pr_node)
-        if token is None:
-            # look in commits
-            for commit in commits:
-                token = zen_token.find_in_body(commit.messageBody)
-                if token is not None:
-                    break
-            if token is None:  # after checking all commits
-                console.info(
-                    console_env,
-                    "Ignoring Pull Request that doesn't have a zen-token",
-                )
-                continue
-        headHash = commits[-1].hash
-        prs.append(
-            PullRequest(
-                PullRequestId(pr_node["id"]),
-                token,
-                PullRequestNumber(f'{pr_node["number"]}'),
-                GithubUsername(viewer["login"]),
-                PullRequestTitle(pr_node["title"]),
-                body,
-                base_ref,
-                head_ref,
-                headHash,
-                PullRequestMergeable(pr_node["mergeable"]),
-                review_decision,
-                pr_repo_id,
-                commits,
+        search_query = pr_updated_search_query(cached.synced_at)
+        entries = cached.entries
+    snapshot = PullRequestSnapshot(
+        synced_at,
+        GithubUsername(""),
+        GithubRepoId(""),
+        entries,
+    )
+    for data in pull_request_pages(github_env, search_query):
+        repo_id = GithubRepoId(data["repository"]["id"])
+        login = GithubUsername(data["viewer"]["login"])
+        pr_nodes = data["search"]["nodes"]
+        console.info(console_env, f"Found {len(pr_nodes)} Pull Requests")
+        for pr_node in pr_nodes:
+            sync_pull_request(
+                console_env,
+                github_env,
+                pr_node,
+                repo_id,
+                login,
+                cached,
+                snapshot,
             )
+        snapshot = PullRequestSnapshot(
+            synced_at,
+            login,
+            repo_id,
+            snapshot.entries,
         )
+    cache.save_pull_requests(file_env, git_env, snapshot)
+    prs = snapshot.pull_requests
     console.info(console_env, f"Kept {len(prs)} Pull Requests")
     return GithubInfo(
-        GithubUsername(viewer["login"]),
-        repo_id,
+        snapshot.login,
+        snapshot.repo_id,
         repo.get_local_branch_name(console_env, git_env),
         prs,
     )
 
 
-def get_commits(pr_node) -> List[GithubCommit]:
-    commits = []
-    for commit_node_item in pr_node["commits"]["nodes"]:
-        commit_node = commit_node_item["commit"]
-        title = CommitTitle(commit_node["messageHeadline"])
-        body = CommitBody(commit_node["messageBody"])
-        token = zen_token.find_in_body(body)
-        commits.append(
-            GithubCommit(
-                zen_token=token,
-                hash=CommitHash(commit_node["oid"]),
-                headline=title,
-                body=body,
-                wip=CommitWipStatus(title.value.startswith("WIP ")),
-            )
+def sync_pull_request(
+    console_env: console.Env,
+    github_env: Env,
+    pr_node: Dict[str, Any],
+    repo_id: GithubRepoId,
+    login: GithubUsername,
+    cached: Optional[PullRequestSnapshot],
+    snapshot: PullRequestSnapshot,
+) -> None:
+    id = PullRequestId(pr_node["id"])
+    updated_at = pr_node.get("updatedAt", "")
+    if pr_node.get("state", "OPEN") != "OPEN":
+        snapshot.remove(id)
+        return
+    if cached is not None and cached.updated_at(id) == updated_at:
+        unchanged = cached.get(id)
+        if unchanged is not None and updated_at != "":
+            snapshot.put(updated_at, unchanged)
+            return
+    pr = pull_request_from_node(
+        console_env,
+        github_env,
+        pr_node,
+        repo_id,
+        login,
+    )
+    if pr is None:
+        snapshot.remove(id)
+    else:
+        snapshot.put(updated_at, pr)
+
+
+# Times are as Github's search expects them, e.g. 2022-09-03T19:12:34Z
+sync_time_format = "%Y-%m-%dT%H:%M:%SZ"
+# Allows for our clock being ahead of Github's
+sync_overlap = timedelta(minutes=5)
+# Catches any changes the incremental syncs have missed
+full_sync_interval = timedelta(days=1)
+
+
+def sync_time() -> str:
+    """
+    Returns the time to record for a sync starting now.
+    """
+    return datetime.now(timezone.utc).strftime(sync_time_format)
+
+
+def sync_age(synced_at: str) -> Optional[timedelta]:
+    """
+    Returns how long ago the sync was, or None if the time is unreadable.
+    """
+    try:
+        last = datetime.strptime(synced_at, sync_time_format)
+    except ValueError:
+        return None
+    return datetime.now(timezone.utc) - last.replace(tzinfo=timezone.utc)
+
+
+def sync_expired(synced_at: str, now: str) -> bool:
+    try:
+        last = datetime.strptime(synced_at, sync_time_format)
+    except ValueError:
+        return True
+    return datetime.strptime(now, sync_time_format) - last > full_sync_interval
+
+
+def pull_request_pages(
+    github_env: Env,
+    search_query: str = pr_search_query,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields each page of pull requests as it arrives, following the
+    pagination cursor until the last page.
+    """
+    params = status_params(search_query=search_query)
+    while True:
+        data = github_env._graphql(params, query_status)["data"]
+        yield data
+        cursor = next_cursor(data["search"])
+        if cursor is None:
+            return
+        params = status_params(cursor, search_query)
+
+
+def status_params(
+    pr_cursor: Optional[str] = None,
+    search_query: str = pr_search_query,
+) -> Dict[str, str]:
+    params = {
+        "repo_owner": "{owner}",
+        "repo_name": "{repo}",
+        "search_query": search_query,
+    }
+    if pr_cursor is not None:
+        params["pr_cursor"] = pr_cursor
+    return params
+
+
+def next_cursor(connection: Dict[str, Any]) -> Optional[str]:
+    """
+    Returns the cursor for the next page of a connection, or None if this
+    is the last page.
+    """
+    page_info = connection.get("pageInfo")
+    if page_info is None or not page_info["hasNextPage"]:
+        return None
+    return page_info["endCursor"]
+
+
+def pull_request_from_node(
+    console_env: console.Env,
+    github_env: Env,
+    pr_node: Dict[str, Any],
+    repo_id: GithubRepoId,
+    login: GithubUsername,
+) -> Optional[PullRequest]:
+    """
+    Returns None if the pull request is not one of ours.
+    """
+    pr_repo_id = GithubRepoId(pr_node["repository"]["id"])
+    if repo_id != pr_repo_id:
+        return None
+    base_ref = GitBranchName(pr_node["baseRefName"])
+    head_ref = GitBranchName(pr_node["headRefName"])
+    console.info(console_env, f" - {base_ref.value} <- {head_ref.value}")
+    match = re.search(patterns.remote_pr_branch, head_ref.value)
+    if match is None:
+        console.info(
+            console_env,
+            f"Ignoring Pull Request not created by us: {head_ref.value}",
         )
-    return commits
+        return None
+    review_node = pr_node["reviewDecision"]
+    review_decision = PullRequestReviewDecision(
+        review_node if review_node is not None else ""
+    )
+    body = PullRequestBody(pr_node["body"])
+    token = zen_token.find_in_body(body)
+    commits = get_commits(github_env, pr_node)
+    if token is None:
+        # look in commits
+        for commit in commits:
+            token = zen_token.find_in_body(commit.messageBody)
+            if token is not None:
+                break
+        if token is None:  # after checking all commits
+            console.info(
+                console_env,
+                "Ignoring Pull Request that doesn't have a zen-token",
+            )
+            return None
+    headHash = commits[-1].hash
+    return PullRequest(
+        PullRequestId(pr_node["id"]),
+        token,
+        PullRequestNumber(f'{pr_node["number"]}'),
+        login,
+        PullRequestTitle(pr_node["title"]),
+        body,
+        base_ref,
+        head_ref,
+        headHash,
+        PullRequestMergeable(pr_node["mergeable"]),
+        review_decision,
+        pr_repo_id,
+        commits,
+    )
+
+
+def get_commits(github_env: Env, pr_node) -> List[GithubCommit]:
+    """
+    Returns all the commits of the pull request, fetching any further
+    pages after the first page included in pr_node.
+    """
+    commits = []
+    connection = pr_node["commits"]
+    while True:
+        for commit_node_item in connection["nodes"]:
+            commits.append(github_commit_from_node(commit_node_item["commit"]))
+        cursor = next_cursor(connection)
+        if cursor is None:
+            return commits
+        connection = github_env._graphql(
+            {
+                "pr_id": pr_node["id"],
+                "commit_cursor": cursor,
+            },
+            query_pr_commits,
+        )["data"]["node"]["commits"]
+
+
+def github_commit_from_node(commit_node: Dict[str, Any]) -> GithubCommit:
+    title = CommitTitle(commit_node["messageHeadline"])
+    body = CommitBody(commit_node["messageBody"])
+    token = zen_token.find_in_body(body)
+    return GithubCommit(
+        zen_token=token,
+        hash=CommitHash(commit_node["oid"]),
+        headline=title,
+        body=body,
+        wip=CommitWipStatus(title.value.startswith("WIP ")),
+    )
 
 
 def add_comment(
@@ -297,12 +1068,7 @@ def update_pull_request(
     base: GitBranchName,
     commit: GitCommit,
 ) -> None:
-    if zen_token.find_in_body(commit.messageBody):
-        body = commit.messageBody
-    else:
-        body = CommitBody(
-            f"{commit.messageBody.value}\n\nzen-token:{commit.zen_token.value}"
-        )
+    body = pull_request_body(commit)
     github_env._gh(
         f"pr edit {pr_branch.value} "
         f"--base {base.value} "
@@ -313,6 +1079,97 @@ def update_pull_request(
     )
 
 
+def pull_request_body(commit: GitCommit) -> CommitBody:
+    """
+    Returns the commit body, adding the zen-token if it is missing.
+    """
+    if zen_token.find_in_body(commit.messageBody):
+        return commit.messageBody
+    return CommitBody(
+        f"{commit.messageBody.value}\n\nzen-token:{commit.zen_token.value}"
+    )
+
+
+def update_pull_requests(
+    github_env: Env,
+    updates: List[PullRequestUpdate],
+) -> List[PullRequest]:
+    """
+    Updates the base, title and body of the pull requests, up to
+    update_chunk_size in each request, returning the updated pull requests.
+    Only the number and head of each are read back.
+    """
+    prs = []
+    for start in range(0, len(updates), update_chunk_size):
+        end = start + update_chunk_size
+        chunk = updates[start:end]
+        response = github_env._graphql(
+            {},
+            update_pull_requests_mutation(chunk),
+        )
+        if response.get("errors"):
+            messages = [error["message"] for error in response["errors"]]
+            raise GitZenError(
+                exit_code.GITHUB_ERROR,
+                "Unable to update Pull Requests: " + "; ".join(messages),
+            )
+        data = response["data"]
+        for alias, update in zip(update_aliases(chunk), chunk):
+            prs.append(
+                updated_pull_request(update, data[alias]["pullRequest"])
+            )
+    return prs
+
+
+def updated_pull_request(
+    update: PullRequestUpdate,
+    pr_node: Dict[str, Any],
+) -> PullRequest:
+    pr = update.pull_request
+    return PullRequest(
+        pr.id,
+        pr.zen_token,
+        PullRequestNumber(f'{pr_node["number"]}'),
+        pr.author,
+        PullRequestTitle(update.commit.messageHeadline.value),
+        PullRequestBody(pull_request_body(update.commit).value),
+        update.base,
+        pr.headRefName,
+        CommitHash(pr_node["headRefOid"]),
+        pr.mergeable,
+        pr.reviewDecision,
+        pr.repoId,
+        pr.commits,
+    )
+
+
+def update_aliases(updates: List[PullRequestUpdate]) -> List[str]:
+    return [f"u{index}" for index in range(1, len(updates) + 1)]
+
+
+def update_pull_requests_mutation(updates: List[PullRequestUpdate]) -> str:
+    """
+    Returns a mutation with an aliased updatePullRequest for each update.
+
+    The values are written into the document as literals, as JSON strings
+    are also valid GraphQL strings.
+    """
+    mutations = [f"""    {alias}: updatePullRequest(input: {{
+        pullRequestId: {json.dumps(update.pull_request.id.value)}
+        baseRefName: {json.dumps(update.base.value)}
+        title: {json.dumps(update.commit.messageHeadline.value)}
+        body: {json.dumps(pull_request_body(update.commit).value)}
+    }}) {{
+        pullRequest {{
+            id
+            number
+            headRefOid
+        }}
+    }}
+""" for alias, update in zip(update_aliases(updates), updates)]
+    return "mutation {\n" + "".join(mutations) + "}\n"
+
+
 def merge_squash(
     github_env: Env,
     pull_request: PullRequest,
@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+from typing import IO, Any, Callable, Optional
+
+from gitzen import cache, file, git
+from gitzen.models.push_journal import PushJournal
+from gitzen.types import CommitHash
+
+# Bump when the layout of the journal changes, so older journals are ignored
+journal_version = 1
+
+# pull requests are created on several threads, each recording its step
+_lock = threading.Lock()
+
+
+def journal_file(git_env: git.Env) -> str:
+    return f"{cache.cache_dir(git_env)}/push_journal.jsonl"
+
+
+def start(file_env: file.Env, git_env: git.Env, journal: PushJournal) -> None:
+    """
+    Writes the steps of the push before any of them are run, replacing the
+    journal of any earlier push.
+    """
+    file.make_dirs(file_env, cache.cache_dir(git_env))
+    with file.io_write(file_env, journal_file(git_env)) as f:
+        append(
+            f,
+            {
+                "version": journal_version,
+                "commits": [hash.value for hash in journal.commits],
+                "steps": journal.steps,
+            },
+        )
+        for step in journal.done:
+            append(f, {"done": step})
+
+
+def record(file_env: file.Env, git_env: git.Env, step: str) -> None:
+    recorder(file_env, git_env)(step)
+
+
+def recorder(file_env: file.Env, git_env: git.Env) -> Callable[[str], None]:
+    """
+    Returns a function that records that a step has completed. Each step
+    is appended as a line and flushed to disk, so a crash loses at most
+    the step it was running. The journal file is looked up once, rather
+    than for every step.
+    """
+    filename = journal_file(git_env)
+
+    def record_step(step: str) -> None:
+        with _lock, file.io_append(file_env, filename) as f:
+            append(f, {"done": step})
+
+    return record_step
+
+
+def append(f: IO[Any], entry: Any) -> None:
+    f.write(json.dumps(entry) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def load(file_env: file.Env, git_env: git.Env) -> Optional[PushJournal]:
+    """
+    Returns the journal of an unfinished push, or None if there isn't one.
+    A step whose line was only partly written is taken as not done.
+    """
+    try:
+        with file.io_read(file_env, journal_file(git_env)) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    try:
+        header = json.loads(lines[0])
+        if header["version"] != journal_version:
+            return None
+        journal = PushJournal(
+            [CommitHash(hash) for hash in header["commits"]],
+            list(header["steps"]),
+            [],
+        )
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+    for line in lines[1:]:
+        try:
+            journal.record(json.loads(line)["done"])
+        except (KeyError, TypeError, ValueError):
+            break
+    return journal
+
+
+def finish(file_env: file.Env, git_env: git.Env) -> None:
+    file.remove(file_env, journal_file(git_env))
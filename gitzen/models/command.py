@@ -0,0 +1,60 @@
+import importlib
+from typing import TYPE_CHECKING, Callable, List
+
+if TYPE_CHECKING:
+    from gitzen.models.command_context import CommandContext
+
+
+class Command:
+    """
+    A subcommand of git-zen, and what it needs set up to run. Its module
+    is only imported when it is run.
+    """
+
+    _name: str
+    _module: str
+    _needs: int
+
+    def __init__(self, name: str, module: str, needs: int) -> None:
+        self._name = name
+        self._module = module
+        self._needs = needs
+
+    def __eq__(self, __o: object) -> bool:
+        return (
+            isinstance(__o, Command)
+            and self._name == __o._name
+            and self._module == __o._module
+            and self._needs == __o._needs
+        )
+
+    def __repr__(self) -> str:
+        return (
+            "Command("
+            f"name={self._name}, "
+            f"module={self._module}, "
+            f"needs={self._needs}"
+            ")"
+        )
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def module(self) -> str:
+        """
+        The module holding the command's run_command function.
+        """
+        return self._module
+
+    @property
+    def needs(self) -> int:
+        """
+        How much needs setting up before the command runs, one of the
+        levels in gitzen.commands.registry.
+        """
+        return self._needs
+
+    def load(self) -> Callable[["CommandContext", List[str]], None]:
+        return importlib.import_module(self._module).run_command
@@ -0,0 +1,90 @@
+from typing import TYPE_CHECKING, List, Optional
+
+from gitzen import console, file
+from gitzen.types import GitRootDir
+
+if TYPE_CHECKING:
+    # only imported when a command needs them
+    from gitzen import config, git, github
+
+
+class CommandContext:
+    """
+    What a command is run with. Only what the command declared it needs
+    is set up, the rest is None.
+    """
+
+    _log_sections: List[str]
+    _console_env: console.Env
+    _file_env: file.Env
+    _git_env: Optional["git.Env"]
+    _root_dir: Optional[GitRootDir]
+    _cfg: Optional["config.Config"]
+    _github_env: Optional["github.Env"]
+
+    def __init__(
+        self,
+        log_sections: List[str],
+        console_env: console.Env,
+        file_env: file.Env,
+        git_env: Optional["git.Env"] = None,
+        root_dir: Optional[GitRootDir] = None,
+        cfg: Optional["config.Config"] = None,
+        github_env: Optional["github.Env"] = None,
+    ) -> None:
+        self._log_sections = log_sections
+        self._console_env = console_env
+        self._file_env = file_env
+        self._git_env = git_env
+        self._root_dir = root_dir
+        self._cfg = cfg
+        self._github_env = github_env
+
+    def __repr__(self) -> str:
+        return (
+            "CommandContext("
+            f"log_sections={self._log_sections}, "
+            f"git_env={self._git_env is not None}, "
+            f"root_dir={self._root_dir}, "
+            f"cfg={self._cfg is not None}, "
+            f"github_env={self._github_env is not None}"
+            ")"
+        )
+
+    @property
+    def log_sections(self) -> List[str]:
+        return self._log_sections
+
+    @property
+    def console_env(self) -> console.Env:
+        return self._console_env
+
+    @property
+    def file_env(self) -> file.Env:
+        return self._file_env
+
+    @property
+    def git_env(self) -> "git.Env":
+        assert self._git_env is not None, "command needs the repo"
+        return self._git_env
+
+    @property
+    def root_dir(self) -> GitRootDir:
+        assert self._root_dir is not None, "command needs the repo"
+        return self._root_dir
+
+    @property
+    def cfg(self) -> "config.Config":
+        assert self._cfg is not None, "command needs the config"
+        return self._cfg
+
+    @property
+    def github_env(self) -> "github.Env":
+        assert self._github_env is not None, "command needs Github"
+        return self._github_env
+
+    def close(self) -> None:
+        if self._git_env is not None:
+            self._git_env.close()
+        if self._github_env is not None:
+            self._github_env.close()
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from typing import List, Optional
+
+from gitzen.models.git_commit import GitCommit
+from gitzen.types import CommitHash
+
+
+class CommitCache:
+    """
+    Parsed commits by hash, evicting the least recently used when full.
+    """
+
+    _max_size: int
+    _commits: "OrderedDict[CommitHash, GitCommit]"
+    _changed: bool
+
+    def __init__(
+        self,
+        max_size: int,
+        commits: Optional[List[GitCommit]] = None,
+    ) -> None:
+        self._max_size = max_size
+        self._commits = OrderedDict()
+        self._changed = False
+        for commit in commits or []:
+            self._commits[commit.hash] = commit
+        self._evict()
+
+    def __len__(self) -> int:
+        return len(self._commits)
+
+    def __repr__(self) -> str:
+        return (
+            "CommitCache("
+            f"max_size={self._max_size}, "
+            f"commits={list(self._commits)}"
+            ")"
+        )
+
+    @property
+    def commits(self) -> List[GitCommit]:
+        """
+        The commits, least recently used first.
+        """
+        return list(self._commits.values())
+
+    @property
+    def changed(self) -> bool:
+        """
+        Whether any commit has been added since the cache was created.
+        """
+        return self._changed
+
+    def get(self, hash: CommitHash) -> Optional[GitCommit]:
+        commit = self._commits.get(hash)
+        if commit is not None:
+            self._commits.move_to_end(hash)
+        return commit
+
+    def put(self, commit: GitCommit) -> None:
+        self._commits[commit.hash] = commit
+        self._commits.move_to_end(commit.hash)
+        self._changed = True
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._commits) > self._max_size:
+            self._commits.popitem(last=False)
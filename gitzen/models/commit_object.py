@@ -0,0 +1,57 @@
+from typing import List
+
+from gitzen.types import CommitHash, TreeHash
+
+
+class CommitObject:
+    """
+    A commit as stored in the git object database.
+    """
+
+    hash: CommitHash
+    tree: TreeHash
+    parents: List[CommitHash]
+    author: str
+    committer: str
+    message: str
+
+    def __init__(
+        self,
+        hash: CommitHash,
+        tree: TreeHash,
+        parents: List[CommitHash],
+        author: str,
+        committer: str,
+        message: str,
+    ) -> None:
+        self.hash = hash
+        self.tree = tree
+        self.parents = parents
+        self.author = author
+        self.committer = committer
+        self.message = message
+
+    def __eq__(self, __o: object) -> bool:
+        return (
+            isinstance(__o, CommitObject)
+            and self.hash == __o.hash
+            and self.tree == __o.tree
+            and self.parents == __o.parents
+            and self.author == __o.author
+            and self.committer == __o.committer
+            and self.message == __o.message
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"CommitObject(hash={self.hash}, "
+            f"tree={self.tree}, "
+            f"parents={self.parents}, "
+            f"author={self.author}, "
+            f"committer={self.committer}, "
+            f"message={repr(self.message)})"
+        )
+
+    @property
+    def headline(self) -> str:
+        return self.message.split("\n", 1)[0]
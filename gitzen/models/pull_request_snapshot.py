@@ -0,0 +1,87 @@
+from typing import Dict, List, Optional, Tuple
+
+from gitzen.models.github_pull_request import PullRequest
+from gitzen.types import GithubRepoId, GithubUsername, PullRequestId
+
+
+class PullRequestSnapshot:
+    """
+    Our open pull requests as of the last sync with Github, each with the
+    updatedAt Github gave it then.
+    """
+
+    _synced_at: str
+    _login: GithubUsername
+    _repo_id: GithubRepoId
+    _entries: Dict[PullRequestId, Tuple[str, PullRequest]]
+
+    def __init__(
+        self,
+        synced_at: str,
+        login: GithubUsername,
+        repo_id: GithubRepoId,
+        entries: Optional[List[Tuple[str, PullRequest]]] = None,
+    ) -> None:
+        self._synced_at = synced_at
+        self._login = login
+        self._repo_id = repo_id
+        self._entries = {}
+        for updated_at, pull_request in entries or []:
+            self.put(updated_at, pull_request)
+
+    def __eq__(self, __o: object) -> bool:
+        return (
+            isinstance(__o, PullRequestSnapshot)
+            and self._synced_at == __o._synced_at
+            and self._login == __o._login
+            and self._repo_id == __o._repo_id
+            and self._entries == __o._entries
+        )
+
+    def __repr__(self) -> str:
+        return (
+            "PullRequestSnapshot("
+            f"synced_at={self.synced_at}, "
+            f"login={self.login}, "
+            f"repo_id={self.repo_id}, "
+            f"entries={self.entries}"
+            ")"
+        )
+
+    @property
+    def synced_at(self) -> str:
+        return self._synced_at
+
+    @property
+    def login(self) -> GithubUsername:
+        return self._login
+
+    @property
+    def repo_id(self) -> GithubRepoId:
+        return self._repo_id
+
+    @property
+    def entries(self) -> List[Tuple[str, PullRequest]]:
+        return list(self._entries.values())
+
+    @property
+    def pull_requests(self) -> List[PullRequest]:
+        """
+        The pull requests, oldest first.
+        """
+        pull_requests = [entry[1] for entry in self._entries.values()]
+        return sorted(pull_requests, key=lambda pr: int(pr.number.value))
+
+    def updated_at(self, id: PullRequestId) -> Optional[str]:
+        entry = self._entries.get(id)
+        return None if entry is None else entry[0]
+
+    def get(self, id: PullRequestId) -> Optional[PullRequest]:
+        entry = self._entries.get(id)
+        return None if entry is None else entry[1]
+
+    def put(self, updated_at: str, pull_request: PullRequest) -> None:
+        self._entries[pull_request.id] = (updated_at, pull_request)
+
+    def remove(self, id: PullRequestId) -> None:
+        self._entries.pop(id, None)
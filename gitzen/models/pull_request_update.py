@@ -0,0 +1,48 @@
+from gitzen.models.git_commit import GitCommit
+from gitzen.models.github_pull_request import PullRequest
+from gitzen.types import GitBranchName
+
+
+class PullRequestUpdate:
+    _pull_request: PullRequest
+    _base: GitBranchName
+    _commit: GitCommit
+
+    def __init__(
+        self,
+        pull_request: PullRequest,
+        base: GitBranchName,
+        commit: GitCommit,
+    ) -> None:
+        self._pull_request = pull_request
+        self._base = base
+        self._commit = commit
+
+    def __eq__(self, __o: object) -> bool:
+        return (
+            isinstance(__o, PullRequestUpdate)
+            and self._pull_request == __o._pull_request
+            and self._base == __o._base
+            and self._commit == __o._commit
+        )
+
+    def __repr__(self) -> str:
+        return (
+            "PullRequestUpdate("
+            f"pull_request={self.pull_request}, \n"
+            f"base={self.base}, \n"
+            f"commit={self.commit}"
+            ")"
+        )
+
+    @property
+    def pull_request(self) -> PullRequest:
+        return self._pull_request
+
+    @property
+    def base(self) -> GitBranchName:
+        return self._base
+
+    @property
+    def commit(self) -> GitCommit:
+        return self._commit
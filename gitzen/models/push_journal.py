@@ -0,0 +1,62 @@
+from typing import List
+
+from gitzen.types import CommitHash
+
+
+class PushJournal:
+    """
+    The steps of a push, and those that have completed, so an interrupted
+    push can be resumed. The commits are the stack the push was planned
+    for.
+    """
+
+    _commits: List[CommitHash]
+    _steps: List[str]
+    _done: List[str]
+
+    def __init__(
+        self,
+        commits: List[CommitHash],
+        steps: List[str],
+        done: List[str],
+    ) -> None:
+        self._commits = list(commits)
+        self._steps = list(steps)
+        self._done = list(done)
+
+    def __eq__(self, __o: object) -> bool:
+        return (
+            isinstance(__o, PushJournal)
+            and self._commits == __o._commits
+            and self._steps == __o._steps
+            and self._done == __o._done
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"PushJournal(commits={self.commits}, "
+            f"steps={self.steps}, "
+            f"done={self.done})"
+        )
+
+    @property
+    def commits(self) -> List[CommitHash]:
+        return list(self._commits)
+
+    @property
+    def steps(self) -> List[str]:
+        return list(self._steps)
+
+    @property
+    def done(self) -> List[str]:
+        """
+        The steps that have completed, in the order they completed.
+        """
+        return list(self._done)
+
+    @property
+    def pending(self) -> List[str]:
+        return [step for step in self._steps if step not in self._done]
+
+    def record(self, step: str) -> None:
+        self._done.append(step)
@@ -0,0 +1,96 @@
+from typing import List, Optional
+
+from gitzen.models.commit_branches import CommitBranches
+from gitzen.models.github_info import GithubInfo
+from gitzen.models.github_pull_request import PullRequest
+from gitzen.models.ref_transaction import RefTransaction
+from gitzen.types import CommitHash
+
+
+class PushPlan:
+    """
+    Everything a push will change, worked out before changing any of it.
+
+    The pr branch for each commit in the stack is rebuilt where its head
+    hash is None, otherwise the branch is kept at that hash.
+    """
+
+    _status: GithubInfo
+    _ref_changes: RefTransaction
+    _closed: List[PullRequest]
+    _commit_stack: List[CommitBranches]
+    _tip_hashes: List[Optional[CommitHash]]
+    _head_hashes: List[Optional[CommitHash]]
+
+    def __init__(
+        self,
+        status: GithubInfo,
+        ref_changes: RefTransaction,
+        closed: List[PullRequest],
+        commit_stack: List[CommitBranches],
+        tip_hashes: List[Optional[CommitHash]],
+        head_hashes: List[Optional[CommitHash]],
+    ) -> None:
+        self._status = status
+        self._ref_changes = ref_changes
+        self._closed = closed
+        self._commit_stack = commit_stack
+        self._tip_hashes = tip_hashes
+        self._head_hashes = head_hashes
+
+    def __eq__(self, __o: object) -> bool:
+        return (
+            isinstance(__o, PushPlan)
+            and self._status == __o._status
+            and self._ref_changes == __o._ref_changes
+            and self._closed == __o._closed
+            and self._commit_stack == __o._commit_stack
+            and self._tip_hashes == __o._tip_hashes
+            and self._head_hashes == __o._head_hashes
+        )
+
+    def __repr__(self) -> str:
+        return (
+            "PushPlan("
+            f"status={self.status}, \n"
+            f"ref_changes={self.ref_changes}, \n"
+            f"closed={self.closed}, \n"
+            f"commit_stack={self.commit_stack}, \n"
+            f"tip_hashes={self.tip_hashes}, \n"
+            f"head_hashes={self.head_hashes}"
+            ")"
+        )
+
+    @property
+    def status(self) -> GithubInfo:
+        return self._status
+
+    @property
+    def ref_changes(self) -> RefTransaction:
+        """
+        The patch refs to update, and the refs of closed pull requests to
+        delete.
+        """
+        return self._ref_changes
+
+    @property
+    def closed(self) -> List[PullRequest]:
+        """
+        The pull requests to close, as their commits have gone away.
+        """
+        return self._closed
+
+    @property
+    def commit_stack(self) -> List[CommitBranches]:
+        return self._commit_stack
+
+    @property
+    def tip_hashes(self) -> List[Optional[CommitHash]]:
+        """
+        The current hash of each pr branch, or None where it doesn't exist.
+        """
+        return self._tip_hashes
+
+    @property
+    def head_hashes(self) -> List[Optional[CommitHash]]:
+        return self._head_hashes
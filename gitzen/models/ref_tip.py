@@ -0,0 +1,38 @@
+from typing import List
+
+from gitzen.types import CommitHash, TreeHash
+
+
+class RefTip:
+    """
+    The commit a ref points to, as listed by for-each-ref.
+    """
+
+    hash: CommitHash
+    tree: TreeHash
+    parents: List[CommitHash]
+
+    def __init__(
+        self,
+        hash: CommitHash,
+        tree: TreeHash,
+        parents: List[CommitHash],
+    ) -> None:
+        self.hash = hash
+        self.tree = tree
+        self.parents = parents
+
+    def __eq__(self, __o: object) -> bool:
+        return (
+            isinstance(__o, RefTip)
+            and self.hash == __o.hash
+            and self.tree == __o.tree
+            and self.parents == __o.parents
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"RefTip(hash={self.hash}, "
+            f"tree={self.tree}, "
+            f"parents={self.parents})"
+        )
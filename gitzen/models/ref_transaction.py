@@ -0,0 +1,56 @@
+from typing import List, Optional
+
+from gitzen.types import CommitHash
+
+
+class RefTransaction:
+    """
+    A batch of ref changes to be applied atomically, in a single
+    'git update-ref --stdin' process.
+    """
+
+    _commands: List[str]
+
+    def __init__(self, commands: Optional[List[str]] = None) -> None:
+        self._commands = [] if commands is None else list(commands)
+
+    def __eq__(self, __o: object) -> bool:
+        return (
+            isinstance(__o, RefTransaction) and self._commands == __o._commands
+        )
+
+    def __repr__(self) -> str:
+        return f"RefTransaction(commands={self.commands})"
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    @property
+    def commands(self) -> List[str]:
+        """
+        The update-ref commands, in the order they were added.
+        """
+        return list(self._commands)
+
+    def add(self, command: str) -> None:
+        self._commands.append(command)
+
+    def create(self, ref: str, new_hash: CommitHash) -> None:
+        self.add(f"create {ref} {new_hash.value}")
+
+    def update(
+        self,
+        ref: str,
+        new_hash: CommitHash,
+        old_hash: Optional[CommitHash] = None,
+    ) -> None:
+        if old_hash is None:
+            self.add(f"update {ref} {new_hash.value}")
+        else:
+            self.add(f"update {ref} {new_hash.value} {old_hash.value}")
+
+    def delete(self, ref: str, old_hash: Optional[CommitHash] = None) -> None:
+        if old_hash is None:
+            self.add(f"delete {ref}")
+        else:
+            self.add(f"delete {ref} {old_hash.value}")
@@ -0,0 +1,167 @@
+import cProfile
+import sys
+import threading
+import time
+from types import FrameType
+from typing import Dict, List, Optional
+
+from gitzen import trace
+
+# The span categories spent blocked outside Python: on a git or gh
+# process, or a request to Github
+blocking_categories = ["git", "github", "http"]
+# The frames a thread waits in, with nothing to run
+idle_frames = [
+    ("threading", "wait"),
+    ("threading", "_wait_for_tstate_lock"),
+    ("queue", "get"),
+    ("concurrent.futures.thread", "_worker"),
+]
+# Seconds between samples of the stacks of every thread
+interval = 0.001
+
+
+class Profiler:
+    """
+    Profiles a command two ways. cProfile records every Python call on the
+    thread that started it, for pstats. A sampler records the stack of
+    every thread each interval, for collapsed stacks ready for flame
+    graphs. A stack sampled within a git, gh or Github call ends with the
+    call, e.g. `[git rev-parse]`, and its time is counted under the call's
+    category rather than as Python.
+    """
+
+    # the seconds sampled on each collapsed stack
+    stacks: Dict[str, float]
+    # the seconds sampled in Python, and blocked in each category
+    times: Dict[str, float]
+    _profile: cProfile.Profile
+    _traced: bool
+    _stopping: threading.Event
+    _sampler: Optional[threading.Thread]
+
+    def __init__(self) -> None:
+        self.stacks = {}
+        self.times = {}
+        self._profile = cProfile.Profile()
+        self._traced = False
+        self._stopping = threading.Event()
+        self._sampler = None
+
+    def __repr__(self) -> str:
+        return f"Profiler(times={self.times})"
+
+    def start(self) -> None:
+        # the open spans tell what a thread is blocked on
+        self._traced = not trace.tracing()
+        if self._traced:
+            trace.start()
+        self._sampler = threading.Thread(
+            target=self._sample,
+            name="gitzen-profiler",
+            daemon=True,
+        )
+        self._sampler.start()
+        self._profile.enable()
+
+    def stop(self) -> None:
+        self._profile.disable()
+        self._stopping.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        if self._traced:
+            trace.stop()
+
+    def dump_stats(self, filename: str) -> None:
+        self._profile.dump_stats(filename)
+
+    def collapsed(self) -> List[str]:
+        """
+        Returns a line for each stack sampled, its frames separated by
+        semicolons, followed by the microseconds sampled on it.
+        """
+        return [
+            f"{stack} {round(seconds * 1_000_000)}"
+            for stack, seconds in sorted(self.stacks.items())
+            if round(seconds * 1_000_000) > 0
+        ]
+
+    def _sample(self) -> None:
+        sampler_id = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stopping.wait(interval):
+            now = time.perf_counter()
+            names = {
+                thread.ident: thread.name for thread in threading.enumerate()
+            }
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != sampler_id:
+                    self._record(
+                        names.get(thread_id, f"{thread_id}"),
+                        thread_id,
+                        frame,
+                        now - last,
+                    )
+            last = now
+
+    def _record(
+        self,
+        thread_name: str,
+        thread_id: int,
+        frame: FrameType,
+        seconds: float,
+    ) -> None:
+        frames = []
+        current: Optional[FrameType] = frame
+        while current is not None:
+            # leave out the wrappers of traced functions
+            if current.f_globals.get("__name__") != trace.__name__:
+                frames.append(frame_name(current))
+            current = current.f_back
+        frames.append(thread_name)
+        frames.reverse()
+        blocking = [
+            span
+            for span in trace.open_spans(thread_id)
+            if span.category in blocking_categories
+        ]
+        if len(blocking) > 0:
+            frames.append(f"[{blocking[-1].name}]")
+            category: Optional[str] = blocking[-1].category
+        elif is_idle(frame):
+            category = None
+        else:
+            category = "python"
+        stack = ";".join(name.replace(";", ":") for name in frames)
+        self.stacks[stack] = self.stacks.get(stack, 0) + seconds
+        if category is not None:
+            self.times[category] = self.times.get(category, 0) + seconds
+
+
+def frame_name(frame: FrameType) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+
+def is_idle(frame: FrameType) -> bool:
+    module = frame.f_globals.get("__name__")
+    return (module, frame.f_code.co_name) in idle_frames
+
+
+def start() -> Profiler:
+    profiler = Profiler()
+    profiler.start()
+    return profiler
+
+
+def summary(profiler: Profiler) -> str:
+    """
+    Describes where the threads spent their time, e.g. "0.42s in Python,
+    1.30s blocked on git".
+    """
+    python = profiler.times.get("python", 0)
+    blocked = [
+        f"{profiler.times[category]:.2f}s blocked on {category}"
+        for category in blocking_categories
+        if category in profiler.times
+    ]
+    return ", ".join([f"{python:.2f}s in Python"] + blocked)
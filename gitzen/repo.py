@@ -1,7 +1,7 @@
 import re
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
-from gitzen import console, exit_code, git, repo_commit_stack
+from gitzen import console, exit_code, file, git, repo_commit_stack
 from gitzen.console import info
 from gitzen.models.git_commit import GitCommit
 from gitzen.types import GitBranchName, GitRemoteName
@@ -55,10 +55,12 @@ def get_commit_stack(
     git_env: git.Env,
     remote: GitRemoteName,
     remote_branch: GitBranchName,
+    file_env: Optional[file.Env] = None,
 ) -> List[GitCommit]:
     return repo_commit_stack.get_commit_stack(
         console_env,
         git_env,
         remote,
         remote_branch,
+        file_env,
     )
@@ -1,7 +1,7 @@
-import re
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from gitzen import console, exit_code, git, patterns, zen_token
+from gitzen import cache, console, exit_code, file, git, zen_token
+from gitzen.models.commit_cache import CommitCache
 from gitzen.models.git_commit import GitCommit
 from gitzen.models.gitzen_error import GitZenError
 from gitzen.types import (
@@ -11,112 +11,123 @@ from gitzen.types import (
     CommitWipStatus,
     GitBranchName,
     GitRemoteName,
-    ZenToken,
 )
 
+# hash, subject, body and zen-token trailer values
+commit_fields = [
+    "%H",
+    "%s",
+    "%b",
+    "%(trailers:key=zen-token,valueonly)",
+]
+
 
 def get_commit_stack(
     console_env: console.Env,
     git_env: git.Env,
     remote: GitRemoteName,
     remote_branch: GitBranchName,
+    file_env: Optional[file.Env] = None,
 ) -> List[GitCommit]:
-    log = git.log(git_env, f"{remote.value}/{remote_branch.value}..HEAD")
-    return parse_log_for_commits(console_env, log)
+    """
+    When file_env is given, commits parsed on earlier runs are read from
+    the commit cache, and only the new commits are read from the log.
+    """
+    revision_range = f"{remote.value}/{remote_branch.value}..HEAD"
+    if file_env is None:
+        records = git.log_records(git_env, revision_range, commit_fields)
+        return parse_log_records(console_env, records)
+    commit_cache = cache.load_commits(file_env, git_env)
+    commits = get_cached_commit_stack(
+        console_env,
+        git_env,
+        revision_range,
+        commit_cache,
+    )
+    if commit_cache.changed:
+        cache.save_commits(file_env, git_env, commit_cache)
+    return commits
 
 
-def parse_log_for_commits(
+def get_cached_commit_stack(
     console_env: console.Env,
-    log: List[str],
+    git_env: git.Env,
+    revision_range: str,
+    commit_cache: CommitCache,
 ) -> List[GitCommit]:
-    if len(log) == 0:
-        return []
+    """
+    The commits are kept as they are found, as a stack larger than the
+    cache would evict some of them before they are returned.
+    """
+    hashes = git.rev_list(git_env, revision_range)
+    found: Dict[CommitHash, GitCommit] = {}
+    for hash in hashes:
+        cached = commit_cache.get(hash)
+        if cached is not None:
+            found[hash] = cached
+    missing = [hash for hash in hashes if hash not in found]
     console.log(
         console_env,
         "parse-commit",
-        f"Scanning {len(log)} log lines for commit...",
+        f"Found {len(hashes) - len(missing)} of {len(hashes)} in cache",
     )
-    token: Optional[ZenToken] = None
-    hash: Optional[CommitHash] = None
-    headline: Optional[CommitTitle] = None
-    body: str = ""
-    line_number = -1
-    subject_index = 0
-    for line in log:
-        line_number += 1
-        commit_matches = re.search(patterns.commit_log_hash, line)
-        if commit_matches:
-            console.log(
-                console_env,
-                "parse-commit",
-                f"Found commit hash: {commit_matches.group(1)}",
+    if len(missing) > 0:
+        records = git.log_records(
+            git_env,
+            "--no-walk=unsorted",
+            commit_fields,
+            missing,
+        )
+        for commit in parse_log_records(console_env, records):
+            commit_cache.put(commit)
+            found[commit.hash] = commit
+    commits: List[GitCommit] = []
+    for hash in reversed(hashes):
+        commit = found.get(hash)
+        if commit is None:
+            raise GitZenError(
+                exit_code.GIT_ERROR,
+                f"Unable to read commit {hash.value}",
             )
-            if token and hash and headline:
-                commit = GitCommit(
-                    zen_token=token,
-                    hash=hash,
-                    headline=headline,
-                    body=CommitBody(body.strip()),
-                    wip=CommitWipStatus(headline.value.startswith("WIP ")),
-                )
-                console.log(
-                    console_env,
-                    "parse-commit",
-                    f"Completed commit: {commit}",
-                )
-                commits = parse_log_for_commits(
-                    console_env,
-                    log[line_number:],
-                )
-                commits.append(commit)
-                return commits
-            if line_number > 2:
-                raise GitZenError(
-                    exit_code.ZEN_TOKENS_MISSING,
-                    (
-                        "zen-token not found in commit body. "
-                        "Is the Git Zen pre-commit hook installed? "
-                        "Run 'git zen init' to install the pre-commit hook, "
-                        "then run 'git rebase @{upstream} --force-rebase' "
-                        "to add the zen tokens."
-                    ),
-                )
-            hash = CommitHash(commit_matches.group(1))
-            subject_index = line_number + 4
-            continue
+        commits.append(commit)
+    return commits
+
+
+def parse_log_records(
+    console_env: console.Env,
+    records: List[List[str]],
+) -> List[GitCommit]:
+    """
+    Returns the commits, oldest first, from the log records, which are
+    newest first.
+    The zen-token is read from the trailers, or else from anywhere in the
+    body, as it isn't a trailer when the body continues after it.
+    """
+    commits: List[GitCommit] = []
+    for hash, subject, body, trailers in reversed(records):
+        commit_body = CommitBody(body.strip())
+        token = zen_token.find_in_trailers(trailers)
         if token is None:
-            token = zen_token.find_in_line(line[4:])
-            if token:
-                console.log(
-                    console_env,
-                    "parse-commit",
-                    f"Found zen-token: {token.value}",
-                )
-        if hash:
-            if line_number == subject_index:
-                headline = CommitTitle(line.strip())
-                console.log(
-                    console_env,
-                    "parse-commit",
-                    f"Found commit title: {headline.value}",
-                )
-            elif line_number == (subject_index + 1) and line != "\n":
-                body += line.strip() + "\n"
-            elif line_number > (subject_index + 1):
-                body += line.strip() + "\n"
-    commits = []
-    if token and hash and headline and body:
+            token = zen_token.find_in_body(commit_body)
+        if token is None:
+            raise GitZenError(
+                exit_code.ZEN_TOKENS_MISSING,
+                (
+                    "zen-token not found in commit body. "
+                    "Is the Git Zen pre-commit hook installed? "
+                    "Run 'git zen init' to install the pre-commit hook, "
+                    "then run 'git rebase @{upstream} --force-rebase' "
+                    "to add the zen tokens."
+                ),
+            )
+        headline = CommitTitle(subject)
         commit = GitCommit(
             zen_token=token,
-            hash=hash,
+            hash=CommitHash(hash),
             headline=headline,
-            body=CommitBody(body.strip()),
+            body=commit_body,
             wip=CommitWipStatus(headline.value.startswith("WIP ")),
         )
-        console.log(
-            console_env,
-            "parse-commit",
-            f"Completed final commit: {commit}",
-        )
+        console.log(console_env, "parse-commit", f"Found commit: {commit}")
         commits.append(commit)
     return commits
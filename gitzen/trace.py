@@ -0,0 +1,125 @@
+import os
+import time
+from _thread import get_ident
+from typing import Any, Callable, Dict, List, Optional, TypeVar, cast
+
+# The spans ended since tracing started, as Chrome trace events, or None
+# when not tracing
+_events: Optional[List[Dict[str, Any]]] = None
+_started_ns = 0
+# The spans open on each thread while tracing, innermost last
+_open: Dict[int, List["Span"]] = {}
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Span:
+    """
+    Times the block it wraps, recording it as a Chrome trace event when
+    tracing. Spans on the same thread nest by time.
+    """
+
+    name: str
+    category: str
+    args: Dict[str, Any]
+    _start_ns: int
+
+    def __init__(self, name: str, category: str, args: Dict[str, Any]) -> None:
+        self.name = name
+        self.category = category
+        self.args = args
+        self._start_ns = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"Span(name={self.name}, "
+            f"category={self.category}, "
+            f"args={self.args})"
+        )
+
+    def __enter__(self) -> "Span":
+        self._start_ns = time.perf_counter_ns()
+        if _events is not None:
+            _open.setdefault(get_ident(), []).append(self)
+        return self
+
+    def __exit__(self, type: Any, value: Any, traceback: Any) -> None:
+        events = _events
+        if events is None:
+            return
+        spans = _open.get(get_ident())
+        if spans and spans[-1] is self:
+            spans.pop()
+        end_ns = time.perf_counter_ns()
+        if isinstance(value, SystemExit):
+            self.args["exit_code"] = value.code or 0
+        elif value is not None:
+            self.args["error"] = f"{type.__name__}: {value}"
+        events.append(
+            {
+                "name": self.name,
+                "cat": self.category,
+                "ph": "X",
+                "ts": (self._start_ns - _started_ns) / 1000,
+                "dur": (end_ns - self._start_ns) / 1000,
+                "pid": os.getpid(),
+                "tid": get_ident(),
+                "args": self.args,
+            }
+        )
+
+    def set(self, key: str, value: Any) -> None:
+        self.args[key] = value
+
+
+def start() -> None:
+    """
+    Starts recording spans, dropping any recorded before.
+    """
+    global _events, _started_ns
+    _events = []
+    _started_ns = time.perf_counter_ns()
+    _open.clear()
+
+
+def stop() -> None:
+    global _events
+    _events = None
+    _open.clear()
+
+
+def tracing() -> bool:
+    return _events is not None
+
+
+def open_spans(thread_id: int) -> List[Span]:
+    """
+    Returns the spans open on the thread, innermost last.
+    """
+    return list(_open.get(thread_id, []))
+
+
+def span(name: str, category: str = "gitzen", **args: Any) -> Span:
+    return Span(name, category, args)
+
+
+def traced(function: F) -> F:
+    """
+    Wraps each call of the function in a span named after it.
+    """
+
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with Span(function.__name__, "gitzen", {}):
+            return function(*args, **kwargs)
+
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    return cast(F, wrapper)
+
+
+def chrome_trace() -> Dict[str, Any]:
+    """
+    Returns the spans recorded so far, in the Chrome trace event format,
+    to be written as JSON.
+    """
+    return {"traceEvents": list(_events or []), "displayTimeUnit": "ms"}
@@ -52,6 +52,11 @@ class CommitHash(StrWrapper):
         super().__init__(CommitHash, value)
 
 
+class TreeHash(StrWrapper):
+    def __init__(self, value: str) -> None:
+        super().__init__(TreeHash, value)
+
+
 class CommitTitle(StrWrapper):
     def __init__(self, value: str) -> None:
         super().__init__(CommitTitle, value)
@@ -20,3 +20,13 @@ def find_in_body(
         if token is not None:
             return token
     return None
+
+
+def find_in_trailers(values: str) -> Optional[ZenToken]:
+    """
+    Returns the first zen-token from the trailer values, one per line.
+    """
+    for value in values.splitlines():
+        if re.fullmatch(patterns.zen_token, value.strip()):
+            return ZenToken(value.strip())
+    return None
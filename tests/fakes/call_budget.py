@@ -0,0 +1,100 @@
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from gitzen import trace
+
+# The most calls allowed: a total, or a count for each command, e.g.
+# {"rev-parse": 1, "push": 1}, where a command not listed is not allowed
+Budget = Union[int, Dict[str, int]]
+# A command, e.g. "rev-parse" or "gh pr create", and its arguments
+Call = Tuple[str, str]
+
+
+@contextmanager
+def call_budget(
+    git: Optional[Budget] = None,
+    github: Optional[Budget] = None,
+) -> Iterator[None]:
+    """
+    Fails when the block starts more git processes, or makes more Github
+    calls, than budgeted, listing the calls over budget. The calls are
+    read from the trace spans of the Envs, so it applies to real and fake
+    Envs alike. Reads from the long-lived cat-file processes are not
+    counted, as they start no process.
+    """
+    trace.start()
+    try:
+        yield
+    finally:
+        events = trace.chrome_trace()["traceEvents"]
+        trace.stop()
+    failures = [
+        failure
+        for failure in [
+            over_budget("git", git, git_calls(events)),
+            over_budget("github", github, github_calls(events)),
+        ]
+        if failure is not None
+    ]
+    assert failures == [], "\n".join(failures)
+
+
+def git_calls(events: List[Dict[str, Any]]) -> List[Call]:
+    calls = []
+    for event in events:
+        if event["cat"] != "git":
+            continue
+        args = event["args"]["args"]
+        if not args.startswith("cat-file --batch"):
+            calls.append((args.split(" ", 1)[0], args))
+    return calls
+
+
+def github_calls(events: List[Dict[str, Any]]) -> List[Call]:
+    return [
+        (event["name"], f"{event['args']}")
+        for event in events
+        if event["cat"] == "github"
+    ]
+
+
+def over_budget(
+    kind: str,
+    budget: Optional[Budget],
+    calls: List[Call],
+) -> Optional[str]:
+    """
+    Describes the calls over budget as a diff, with a + line for each
+    command called more often than budgeted, followed by its calls.
+    Returns None when within budget.
+    """
+    if budget is None:
+        return None
+    made = Counter(command for command, _ in calls)
+    if isinstance(budget, int):
+        if len(calls) <= budget:
+            return None
+        lines = [f"{kind}: {len(calls)} calls, over the budget of {budget}"]
+        over = list(made)
+    else:
+        over = [
+            command
+            for command in made
+            if made[command] > budget.get(command, 0)
+        ]
+        if len(over) == 0:
+            return None
+        lines = [f"{kind}: calls over budget"]
+    for command in over:
+        if isinstance(budget, int):
+            lines.append(f"+ {command}: {made[command]} made")
+        else:
+            lines.append(
+                f"+ {command}: {made[command]} made, "
+                f"{budget.get(command, 0)} budgeted"
+            )
+        lines.extend(
+            f"    {args[:120]}" for called, args in calls if called == command
+        )
+    return "\n".join(lines)
@@ -20,6 +20,10 @@ class FakeGitEnv(git.Env):
             self.request_counters[args] = 0
 
     def _git(self, args: str) -> Tuple[Optional[int], List[str]]:
+        with git.span(args):
+            return self._response(args)
+
+    def _response(self, args: str) -> Tuple[Optional[int], List[str]]:
         logger.log(self.logger_env, "FakeGit", args)
         self.requests.append(args)
         if args in self.responses:
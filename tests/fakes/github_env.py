@@ -1,7 +1,9 @@
+import json
 import re
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from gitzen import github
+from benchmarks.latency import LatencyModel
+from gitzen import cache, file, git, github, trace
 
 
 class MuteFakeGithubEnv(github.Env):
@@ -12,8 +14,9 @@ class MuteFakeGithubEnv(github.Env):
         self.requests = []
 
     def _gh(self, args: str) -> List[str]:
-        self.requests.append(args)
-        return []
+        with github.gh_span(args):
+            self.requests.append(args)
+            return []
 
 
 class FakeGithubEnv(github.Env):
@@ -23,12 +26,16 @@ class FakeGithubEnv(github.Env):
     gql_request_counters: Dict[str, int] = {}
     # prs closed: a list of PR#
     closed_with_comment: Dict[int, str] = {}
+    # charged to each request answered, when modelling a remote Github
+    latency: Optional[LatencyModel]
 
     def __init__(
         self,
         gh_responses: Dict[str, List[List[str]]],
         gql_responses: Dict[str, List[Any]],
+        latency: Optional[LatencyModel] = None,
     ) -> None:
+        self.latency = latency
         self.gh_responses = gh_responses
         for args in gh_responses:
             self.gh_request_counters[args] = 0
@@ -39,6 +46,13 @@ class FakeGithubEnv(github.Env):
     def _gh(
         self,
         args: str,
+    ) -> List[str]:
+        with github.gh_span(args):
+            return self._gh_response(args)
+
+    def _gh_response(
+        self,
+        args: str,
     ) -> List[str]:
         print(f"FakeGithub> {args}")
         close_with_comment_matches = re.search(
@@ -58,6 +72,7 @@ class FakeGithubEnv(github.Env):
                 response = self.gh_responses[args][counter]
                 self.gh_request_counters[args] += 1
                 print(f"FakeGithub> {response}")
+                self.charge(len(args) + len("\n".join(response)))
                 return response
             print(f"FakeGithub> no more responses for these args: {args}")
         else:
@@ -68,6 +83,14 @@ class FakeGithubEnv(github.Env):
         self,
         params: Dict[str, str],
         query: str,
+    ) -> Dict[str, Any]:
+        with trace.span("graphql", "github", params=params):
+            return self._graphql_response(params, query)
+
+    def _graphql_response(
+        self,
+        params: Dict[str, str],
+        query: str,
     ) -> Dict[str, Any]:
         args = repr(params)
         print(f"FakeGithub> {args}")
@@ -77,15 +100,47 @@ class FakeGithubEnv(github.Env):
                 response = self.gql_responses[args][counter]
                 self.gql_request_counters[args] += 1
                 print(f"FakeGithub> {response}")
+                self.charge(len(args) + len(query) + len(json.dumps(response)))
                 return response
             print(f"no more responses for these args: {args}")
         else:
             print(f"no response for these args: {args}")
         exit(1)
 
+    def charge(self, bytes: int) -> None:
+        if self.latency is not None:
+            self.latency.charge(bytes=bytes)
+
+    def given_gql_response(
+        self,
+        params: Dict[str, str],
+        response: Any,
+    ) -> None:
+        args = repr(params)
+        self.gql_responses[args] = [response]
+        self.gql_request_counters[args] = 0
+
     def __repr__(self) -> str:
         return (
             "FakeGithubEnv("
             f"closed_with_comment: {repr(self.closed_with_comment)}"
             ")"
         )
+
+
+def given_incremental_sync(
+    github_env: FakeGithubEnv,
+    file_env: file.Env,
+    git_env: git.Env,
+    response: Any,
+) -> None:
+    """
+    Responds to the search for pull requests updated since the last sync.
+    """
+    snapshot = cache.load_pull_requests(file_env, git_env)
+    assert snapshot is not None
+    search_query = github.pr_updated_search_query(snapshot.synced_at)
+    github_env.given_gql_response(
+        github.status_params(search_query=search_query),
+        response,
+    )
@@ -46,7 +46,7 @@ def given_repo(
         [
             "#!/usr/bin/env bash",
             "echo running git zen hook",
-            f"{project_root}/git-zen hook $1",
+            f"{project_root}/git-zen-hook $1",
             "",
         ],
     )
@@ -92,3 +92,17 @@ def show_status(
 def given_file(file_env: file.Env, filename: str, lines: List[str]) -> None:
     with file.io_write(file_env, filename) as f:
         f.write("\n".join(lines))
+
+
+def given_remote(
+    git_env: git.Env,
+    dir: str,
+    remote: GitRemoteName = GitRemoteName("origin"),
+) -> GitRootDir:
+    """
+    Creates a bare repo in dir, added as the remote of the repo in the
+    current directory.
+    """
+    git.init_bare(git_env, dir)
+    git.remote_add(git_env, remote, GitRootDir(dir))
+    return GitRootDir(dir)
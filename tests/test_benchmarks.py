@@ -0,0 +1,35 @@
+from pathlib import PosixPath
+
+from benchmarks import stack, suite
+
+
+def test_regressions_allow_for_tolerance() -> None:
+    # given
+    baseline = {
+        "push/10": {"wall_time": 1.0, "git_calls": 20, "peak_memory": 10},
+    }
+    results = {
+        "push/10": {"wall_time": 1.7, "git_calls": 21, "peak_memory": 20},
+        "push/100": {"wall_time": 9.0, "git_calls": 99, "peak_memory": 99},
+    }
+    # when
+    found = suite.regressions(results, baseline)
+    # then
+    assert found == ["push/10 git_calls: 21 is over 20 (baseline 20)"]
+
+
+def test_commands_run_on_synthetic_stack(tmp_path: PosixPath) -> None:
+    # given
+    template = stack.generate(10, f"{tmp_path}/10")
+    # when
+    results = {
+        name: suite.measure(name, template, f"{tmp_path}/{name}")
+        for name in suite.commands
+    }
+    # then
+    assert {name: results[name]["github_calls"] for name in results} == {
+        "status": 1,
+        "push": 2,
+        "merge": 4,
+    }
+    assert results["push"]["git_calls"] < results["merge"]["git_calls"]
@@ -0,0 +1,92 @@
+import os
+from pathlib import PosixPath
+
+import pytest
+
+from benchmarks import stack
+from benchmarks.github_env import SyntheticGithubEnv
+from gitzen import config, console, file, git, logger
+from gitzen.commands import push
+from gitzen.types import GitRootDir
+
+from .fakes.call_budget import call_budget
+from .fakes.repo_files import given_repo
+
+
+def test_calls_within_budget_pass(
+    tmp_path: PosixPath,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # given
+    monkeypatch.chdir(tmp_path)
+    logger_env = logger.RealEnv()
+    git_env = git.RealEnv(logger_env)
+    given_repo(file.RealEnv(logger_env), git_env, tmp_path)
+    # when
+    with call_budget(git={"status": 1}, github=0):
+        git.status(git_env)
+    # then nothing is raised
+
+
+def test_calls_over_budget_are_listed(
+    tmp_path: PosixPath,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # given
+    monkeypatch.chdir(tmp_path)
+    logger_env = logger.RealEnv()
+    git_env = git.RealEnv(logger_env)
+    given_repo(file.RealEnv(logger_env), git_env, tmp_path)
+    # when
+    with pytest.raises(AssertionError) as error:
+        with call_budget(git={"status": 1}):
+            git.status(git_env)
+            git.status(git_env)
+            git.rev_parse(git_env, "HEAD")
+    # then
+    assert str(error.value).splitlines() == [
+        "git: calls over budget",
+        "+ status: 2 made, 1 budgeted",
+        "    status",
+        "    status",
+        "+ rev-parse: 1 made, 0 budgeted",
+        "    rev-parse HEAD",
+    ]
+
+
+def test_push_of_one_changed_commit_is_within_budget(
+    tmp_path: PosixPath,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # given a stack of 20 pushed commits, with the top one amended
+    synthetic = stack.generate(20, f"{tmp_path}/stack")
+    monkeypatch.chdir(synthetic.repo_dir)
+    logger_env = logger.Env()
+    git_env = git.RealEnv(logger_env)
+    # when
+    with call_budget(
+        git={
+            "branch": 2,
+            "commit-tree": 1,
+            "fetch": 1,
+            "for-each-ref": 1,
+            "log": 2,
+            "push": 1,
+            "rebase": 1,
+            "rev-list": 1,
+            "rev-parse": 1,
+            "update-ref": 1,
+        },
+        github=2,
+    ):
+        with pytest.raises(SystemExit) as exit:
+            push.push(
+                console.Env(),
+                file.RealEnv(logger_env),
+                git_env,
+                SyntheticGithubEnv(synthetic),
+                config.default_config(GitRootDir(os.getcwd())),
+            )
+    git.close(git_env)
+    # then
+    assert exit.value.code == 0
@@ -0,0 +1,49 @@
+import pytest
+
+from benchmarks import checks
+from gitzen.commands import registry
+
+# Modules that commands that don't talk to Github mustn't import
+github_modules = ["gitzen.github", "gitzen.config", "http.client", "yaml"]
+
+
+def test_every_command_has_an_import_budget() -> None:
+    # then
+    assert sorted(checks.import_budgets) == sorted(registry.commands)
+
+
+@pytest.mark.parametrize("command", sorted(registry.commands))
+def test_command_loads_run_command(command: str) -> None:
+    # when
+    run_command = registry.commands[command].load()
+    # then
+    assert run_command.__module__ == registry.commands[command].module
+
+
+@pytest.mark.parametrize("command", sorted(registry.commands))
+def test_command_imports_its_module(command: str) -> None:
+    # when
+    modules, _ = checks.imports(command)
+    # then
+    assert registry.commands[command].module in modules
+
+
+@pytest.mark.parametrize("command", ["init", "hook"])
+def test_local_commands_do_not_import_github(command: str) -> None:
+    # when
+    modules, _ = checks.imports(command)
+    # then
+    assert [name for name in modules if name in github_modules] == []
+
+
+def test_cli_imports_no_commands() -> None:
+    # when
+    modules, _ = checks.imports("hook")
+    # then
+    commands = [
+        name for name in modules if name.startswith("gitzen.commands.")
+    ]
+    assert sorted(commands) == [
+        "gitzen.commands.hook",
+        "gitzen.commands.registry",
+    ]
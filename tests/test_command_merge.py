@@ -0,0 +1,82 @@
+from pathlib import PosixPath
+
+import pytest
+
+from benchmarks import stack
+from benchmarks.github_env import SyntheticGithubEnv
+from gitzen import config, console, exit_code, file, git, logger
+from gitzen.commands import merge
+from gitzen.types import GitRootDir
+
+
+def renumbered(github_env: SyntheticGithubEnv) -> SyntheticGithubEnv:
+    """
+    Numbers the pull requests from the top of the stack down, as when they
+    were created concurrently.
+    """
+    prs = list(github_env.pull_requests.values())
+    github_env.pull_requests = {}
+    for number, pr in enumerate(reversed(prs), start=1):
+        github_env.pull_requests[number] = {
+            **pr,
+            "id": f"PR_{number}",
+            "number": number,
+        }
+    return github_env
+
+
+def run_merge(
+    synthetic: stack.SyntheticStack,
+    github_env: SyntheticGithubEnv,
+) -> None:
+    logger_env = logger.Env()
+    git_env = git.RealEnv(logger_env)
+    try:
+        merge.merge(
+            console.Env(),
+            file.RealEnv(logger_env),
+            git_env,
+            github_env,
+            config.default_config(GitRootDir(synthetic.repo_dir)),
+        )
+    finally:
+        git.close(git_env)
+
+
+def test_merges_pr_of_bottom_commit_numbered_out_of_order(
+    tmp_path: PosixPath,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # given
+    synthetic = stack.generate(3, f"{tmp_path}/stack")
+    monkeypatch.chdir(synthetic.repo_dir)
+    github_env = renumbered(SyntheticGithubEnv(synthetic))
+    # when
+    with pytest.raises(SystemExit) as exit:
+        run_merge(synthetic, github_env)
+    # then
+    assert exit.value.code == 0
+    merged = [
+        pr["headRefName"]
+        for pr in github_env.pull_requests.values()
+        if pr["state"] == "MERGED"
+    ]
+    assert merged == [synthetic.pr_branch(0)]
+
+
+def test_pr_behind_local_commit_is_not_merged(
+    tmp_path: PosixPath,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # given a single commit, amended since it was pushed
+    synthetic = stack.generate(1, f"{tmp_path}/stack")
+    monkeypatch.chdir(synthetic.repo_dir)
+    github_env = SyntheticGithubEnv(synthetic)
+    # when
+    with pytest.raises(SystemExit) as exit:
+        run_merge(synthetic, github_env)
+    # then
+    assert exit.value.code == exit_code.LOCAL_COMMIT_REMOTE_PR_DIFFERENT_HASH
+    assert [pr["state"] for pr in github_env.pull_requests.values()] == [
+        "OPEN"
+    ]
@@ -1,127 +1,158 @@
 from pathlib import PosixPath
+from typing import Any, Dict, List, Tuple
 
-from genericpath import exists
-
-from gitzen import console, file, git, logger
+from gitzen import config, console, file, git, github, logger, repo
 from gitzen.commands import push
 from gitzen.models.git_patch import GitPatch
-from gitzen.models.github_pull_request import PullRequest
+from gitzen.models.push_plan import PushPlan
+from gitzen.types import GitBranchName, ZenToken
 
 from . import object_mother as om
 from .fakes.github_env import FakeGithubEnv
 from .fakes.repo_files import given_repo
 
 
-# trunk-ignore(flake8/E501)
-def test_clean_up_deleted_commits_closes_with_comment(tmp_path: PosixPath) -> None:
-    # given
+def pr_node(
+    number: str,
+    login: str,
+    repo_id: str,
+    token: ZenToken,
+) -> Dict[str, Any]:
+    return {
+        "id": f"PR_{number}",
+        "number": number,
+        "state": "OPEN",
+        "updatedAt": "2024-01-01T00:00:00Z",
+        "title": f"pr {number}",
+        "repository": {"id": repo_id},
+        "baseRefName": "master",
+        "headRefName": f"gitzen/pr/{login}/{token.value}",
+        "reviewDecision": None,
+        "body": "",
+        "mergeable": "MERGEABLE",
+        "commits": {
+            "pageInfo": {"hasNextPage": False, "endCursor": ""},
+            "nodes": [
+                {
+                    "commit": {
+                        "oid": om.gen_commit_hash().value,
+                        "messageHeadline": f"pr {number}",
+                        "messageBody": f"zen-token:{token.value}",
+                    }
+                }
+            ],
+        },
+    }
+
+
+def given_pull_requests(
+    nodes: List[Dict[str, Any]],
+    login: str,
+    repo_id: str,
+) -> FakeGithubEnv:
+    return FakeGithubEnv(
+        gh_responses={
+            (
+                f"pr close {node['number']} "
+                "--comment 'Closing pull request: commit has gone away'"
+            ): [[]]
+            for node in nodes
+        },
+        gql_responses={
+            repr(github.status_params()): [
+                {
+                    "data": {
+                        "repository": {"id": repo_id},
+                        "viewer": {"login": login},
+                        "search": {
+                            "pageInfo": {
+                                "hasNextPage": False,
+                                "endCursor": "",
+                            },
+                            "nodes": nodes,
+                        },
+                    }
+                }
+            ]
+        },
+    )
+
+
+def given_plan(
+    tmp_path: PosixPath,
+    deleted_token: ZenToken,
+) -> Tuple[console.Env, git.Env, FakeGithubEnv, PushPlan]:
+    """
+    Plans a push with two pull requests: one for the first commit, and one
+    for a commit that has gone away, whose patch ref is left.
+    """
     logger_env = logger.RealEnv()
     console_env = console.RealEnv()
     file_env = file.RealEnv(logger_env)
     git_env = git.RealEnv(logger_env)
     root_dir = given_repo(file_env, git_env, tmp_path)
-    pr_to_close: PullRequest = om.gen_pr(token=None)
-    zen_token = om.gen_zen_token()
-    pr_to_keep = om.gen_pr(zen_token)
-    prs = [pr_to_close, pr_to_keep]
-    git_commits = [om.gen_commit(zen_token)]
-    close_args = (
-        f"pr close {pr_to_close.number.value} "
-        "--comment 'Closing pull request: commit has gone away'"
-    )
-    github_env = FakeGithubEnv(
-        gh_responses={close_args: [[]]},
-        gql_responses={},
-    )
-    # when
-    push.clean_up_deleted_commits(
+    cfg = config.default_config(root_dir)
+    commits = repo.get_commit_stack(
         console_env,
         git_env,
-        github_env,
-        prs,
-        git_commits,
-        root_dir,
+        cfg.remote,
+        GitBranchName("master"),
+    )
+    git.write_patch(git_env, GitPatch(deleted_token, git.head_hash(git_env)))
+    login = om.gen_gh_username().value
+    repo_id = om.gen_gh_repo_id().value
+    github_env = given_pull_requests(
+        [
+            pr_node("11", login, repo_id, deleted_token),
+            pr_node("12", login, repo_id, commits[0].zen_token),
+        ],
+        login,
+        repo_id,
     )
+    plan = push.plan_push(console_env, file_env, git_env, github_env, cfg)
+    return console_env, git_env, github_env, plan
+
+
+def test_pull_requests_of_deleted_commits_are_closed_with_comment(
+    tmp_path: PosixPath,
+) -> None:
+    # given
+    console_env, _, github_env, plan = given_plan(
+        tmp_path,
+        om.gen_zen_token(),
+    )
+    # when
+    push.close_pull_requests(console_env, github_env, plan.closed)
     # then
-    assert pr_to_close.number.value in github_env.closed_with_comment
+    assert [pr.number.value for pr in plan.closed] == ["11"]
     assert (
-        github_env.closed_with_comment[pr_to_close.number.value]
+        github_env.closed_with_comment["11"]
         == "Closing pull request: commit has gone away"
     )
 
 
-# trunk-ignore(flake8/E501)
-def test_clean_up_deleted_commits_returns_remaining_prs(tmp_path: PosixPath) -> None:
+def test_pull_requests_of_remaining_commits_are_kept(
+    tmp_path: PosixPath,
+) -> None:
     # given
-    logger_env = logger.RealEnv()
-    console_env = console.RealEnv()
-    file_env = file.RealEnv(logger_env)
-    git_env = git.RealEnv(logger_env)
-    root_dir = given_repo(file_env, git_env, tmp_path)
-    pr_to_close: PullRequest = om.gen_pr(token=None)
-    zen_token = om.gen_zen_token()
-    pr_to_keep = om.gen_pr(zen_token)
-    prs = [pr_to_close, pr_to_keep]
-    git_commits = [om.gen_commit(zen_token)]
-    close_args = (
-        f"pr close {pr_to_close.number.value} "
-        "--comment 'Closing pull request: commit has gone away'"
-    )
-    github_env = FakeGithubEnv(
-        gh_responses={close_args: [[]]},
-        gql_responses={},
-    )
+    deleted_token = om.gen_zen_token()
     # when
-    result = push.clean_up_deleted_commits(
-        console_env,
-        git_env,
-        github_env,
-        prs,
-        git_commits,
-        root_dir,
-    )
+    _, _, _, plan = given_plan(tmp_path, deleted_token)
     # then
-    assert len(result) == 1
-    assert result[0].git_commit.zen_token == zen_token
-    result_pr = result[0].pull_request
-    assert result_pr == pr_to_keep
+    kept = [cb.pull_request for cb in plan.commit_stack]
+    assert kept[0] is not None
+    assert kept[0].number.value == "12"
+    assert kept[0].zen_token == plan.commit_stack[0].git_commit.zen_token
+    assert kept[1] is None
 
 
-def test_clean_up_deleted_commits_deletes_patches(tmp_path: PosixPath) -> None:
+def test_patches_of_deleted_commits_are_deleted(tmp_path: PosixPath) -> None:
     # given
-    logger_env = logger.RealEnv()
-    console_env = console.RealEnv()
-    file_env = file.RealEnv(logger_env)
-    git_env = git.RealEnv(logger_env)
-    root_dir = given_repo(file_env, git_env, tmp_path)
-    deleted_zen_token = om.gen_zen_token()
-    pr_to_close: PullRequest = om.gen_pr(deleted_zen_token)
-    deleted_commit = pr_to_close.commits[0]
-    zen_token = om.gen_zen_token()
-    pr_to_keep = om.gen_pr(zen_token)
-    prs = [pr_to_close, pr_to_keep]
-    git_commits = [om.gen_commit(zen_token)]
-    patch = GitPatch(deleted_zen_token, deleted_commit.hash)
-    git.write_patch(file_env, patch, root_dir)
-    patch_file = f"{git.gitzen_patches(root_dir)}/{patch.zen_token.value}"
-    assert exists(patch_file)
-    assert file.read(file_env, patch_file) == [deleted_commit.hash.value]
-    close_args = (
-        f"pr close {pr_to_close.number.value} "
-        "--comment 'Closing pull request: commit has gone away'"
-    )
-    github_env = FakeGithubEnv(
-        gh_responses={close_args: [[]]},
-        gql_responses={},
-    )
+    deleted_token = om.gen_zen_token()
+    console_env, git_env, _, plan = given_plan(tmp_path, deleted_token)
+    patch_ref = git.gitzen_patch_ref(deleted_token)
+    assert git.ref_hash(git_env, patch_ref) is not None
     # when
-    push.clean_up_deleted_commits(
-        console_env,
-        git_env,
-        github_env,
-        prs,
-        git_commits,
-        root_dir,
-    )
+    push.build_planned_branches(console_env, git_env, plan)
     # then
-    assert not exists(patch_file)
+    assert git.ref_hash(git_env, patch_ref) is None
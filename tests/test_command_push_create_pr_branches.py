@@ -1,14 +1,14 @@
 import re
 from pathlib import PosixPath
 
-from gitzen import config, console, file, git, logger, repo
-from gitzen.commands.push import prepare_pr_branches, update_pr_branches
+from gitzen import config, console, file, git, github, logger, repo
+from gitzen.commands.push import build_planned_branches, plan_push
 from gitzen.patterns import short_hash
 from gitzen.types import GitBranchName
 
 from . import object_mother as om
-from .fakes.github_env import FakeGithubEnv
-from .fakes.repo_files import given_repo
+from .fakes.github_env import FakeGithubEnv, given_incremental_sync
+from .fakes.repo_files import given_file, given_repo
 
 
 def test_when_no_branch_then_create(tmp_path: PosixPath) -> None:
@@ -27,31 +27,19 @@ def test_when_no_branch_then_create(tmp_path: PosixPath) -> None:
     github_env = FakeGithubEnv(
         gh_responses={},
         gql_responses={
-            repr({"repo_owner": "{owner}", "repo_name": "{repo}"}): [
+            repr(github.status_params()): [
                 {
                     "data": {
                         "repository": {"id": repo_id.value},
-                        "viewer": {
-                            "login": login.value,
-                            "repository": {
-                                "pullRequests": {
-                                    "nodes": [],
-                                },
-                            },
-                        },
+                        "viewer": {"login": login.value},
+                        "search": {"nodes": []},
                     }
                 },
                 {
                     "data": {
                         "repository": {"id": repo_id.value},
-                        "viewer": {
-                            "login": login.value,
-                            "repository": {
-                                "pullRequests": {
-                                    "nodes": [],
-                                },
-                            },
-                        },
+                        "viewer": {"login": login.value},
+                        "search": {"nodes": []},
                     }
                 },
             ]
@@ -67,15 +55,9 @@ def test_when_no_branch_then_create(tmp_path: PosixPath) -> None:
     assert len(commits) == 2
     token1 = commits[0].zen_token
     token2 = commits[1].zen_token
-    _, stack, _ = prepare_pr_branches(
-        console_env,
-        file_env,
-        git_env,
-        github_env,
-        cfg,
-    )
+    plan = plan_push(console_env, file_env, git_env, github_env, cfg)
     # when
-    update_pr_branches(console_env, git_env, stack)
+    build_planned_branches(console_env, git_env, plan)
     # then
     assert (
         git.branch_exists(
@@ -110,31 +92,19 @@ def test_when_branch_and_change_then_update(tmp_path: PosixPath) -> None:
     github_env = FakeGithubEnv(
         gh_responses={},
         gql_responses={
-            repr({"repo_owner": "{owner}", "repo_name": "{repo}"}): [
+            repr(github.status_params()): [
                 {
                     "data": {
                         "repository": {"id": repo_id.value},
-                        "viewer": {
-                            "login": login.value,
-                            "repository": {
-                                "pullRequests": {
-                                    "nodes": [],
-                                },
-                            },
-                        },
+                        "viewer": {"login": login.value},
+                        "search": {"nodes": []},
                     }
                 },
                 {
                     "data": {
                         "repository": {"id": repo_id.value},
-                        "viewer": {
-                            "login": login.value,
-                            "repository": {
-                                "pullRequests": {
-                                    "nodes": [],
-                                },
-                            },
-                        },
+                        "viewer": {"login": login.value},
+                        "search": {"nodes": []},
                     }
                 },
             ]
@@ -144,7 +114,8 @@ def test_when_branch_and_change_then_update(tmp_path: PosixPath) -> None:
     cfg = config.default_config(root_dir)
 
     console.info(console_env, "prepare initial pr branches")
-    prepare_pr_branches(console_env, file_env, git_env, github_env, cfg)
+    plan = plan_push(console_env, file_env, git_env, github_env, cfg)
+    build_planned_branches(console_env, git_env, plan)
 
     console.info(console_env, "Add new-file")
     file.write(file_env, "new-file", ["contents"])
@@ -162,32 +133,40 @@ def test_when_branch_and_change_then_update(tmp_path: PosixPath) -> None:
             break
     assert hash_match
     assert expected_hash is not None
-    # when
-    console.info(console_env, "prepare new pr branches")
-    status, stack, _ = prepare_pr_branches(
-        console_env,
+    given_incremental_sync(
+        github_env,
         file_env,
         git_env,
-        github_env,
-        cfg,
+        {
+            "data": {
+                "repository": {"id": repo_id.value},
+                "viewer": {"login": login.value},
+                "search": {"nodes": []},
+            }
+        },
     )
+    # when
+    console.info(console_env, "prepare new pr branches")
+    plan = plan_push(console_env, file_env, git_env, github_env, cfg)
+    build_planned_branches(console_env, git_env, plan)
     # then
     console.info(console_env, "Review status")
     log = git.log_graph(git_env)
-    assert len(log) == 7
+    # the updated pr branch commit merges in its base
+    assert len(log) == 9
     if "HEAD" in log[0]:
         patch_beta = 0
         patch_alpha = 1
         pull_beta = 2
-        pull_alpha = 4
+        pull_alpha = 6
     else:
         pull_beta = 0
-        pull_alpha = 2
-        patch_beta = 3
-        patch_alpha = 4
-    author = status.username.value
-    token_alpha = stack[0].git_commit.zen_token
-    token_beta = stack[1].git_commit.zen_token
+        pull_alpha = 4
+        patch_beta = 5
+        patch_alpha = 6
+    author = plan.status.username.value
+    token_alpha = plan.commit_stack[0].git_commit.zen_token
+    token_beta = plan.commit_stack[1].git_commit.zen_token
     ref_patch_alpha = f"refs/gitzen/patches/{token_alpha.value}"
     ref_patch_beta = f"refs/gitzen/patches/{token_beta.value}"
     pr_alpha = f"gitzen/pr/{author}/{token_alpha.value}"
@@ -202,7 +181,7 @@ def test_when_branch_and_change_then_update(tmp_path: PosixPath) -> None:
         log[patch_alpha],
     ), "Patch Alpha"
     assert re.search(
-        rf"\* {short_hash} \({pr_beta}\) Add BETA.md",
+        rf"\*\s+{short_hash} \({pr_beta}\) Add BETA.md",
         log[pull_beta],
     ), "PR Beta"
     assert re.search(
@@ -224,72 +203,73 @@ def test_when_branch_and_no_change_then_ignore(tmp_path: PosixPath) -> None:
     cfg = config.default_config(root_dir)
     repo_id = om.gen_gh_repo_id()
     login = om.gen_gh_username()
+    status_response = {
+        "data": {
+            "repository": {"id": repo_id.value},
+            "viewer": {"login": login.value},
+            "search": {"nodes": []},
+        }
+    }
     github_env = FakeGithubEnv(
         gh_responses={},
-        gql_responses={
-            repr({"repo_owner": "{owner}", "repo_name": "{repo}"}): [
-                {
-                    "data": {
-                        "repository": {"id": repo_id.value},
-                        "viewer": {
-                            "login": login.value,
-                            "repository": {
-                                "pullRequests": {
-                                    "nodes": [],
-                                },
-                            },
-                        },
-                    }
-                },
-                {
-                    "data": {
-                        "repository": {"id": repo_id.value},
-                        "viewer": {
-                            "login": login.value,
-                            "repository": {
-                                "pullRequests": {
-                                    "nodes": [],
-                                },
-                            },
-                        },
-                    }
-                },
-            ]
-        },
+        gql_responses={repr(github.status_params()): [status_response]},
     )
     console_env = console.RealEnv()
-    commits = repo.get_commit_stack(
-        console.RealEnv(),
+    built = build_planned_branches(
+        console_env,
         git_env,
-        cfg.remote,
-        GitBranchName("master"),
+        plan_push(console_env, file_env, git_env, github_env, cfg),
     )
-    assert len(commits) == 2
-    token1 = commits[0].zen_token
-    token2 = commits[1].zen_token
-    _, stack, _ = prepare_pr_branches(
+    given_incremental_sync(github_env, file_env, git_env, status_response)
+    plan = plan_push(console_env, file_env, git_env, github_env, cfg)
+    # when
+    hashes = build_planned_branches(console_env, git_env, plan)
+    # then
+    assert plan.head_hashes == built
+    assert hashes == built
+
+
+def test_update_does_not_touch_worktree(tmp_path: PosixPath) -> None:
+    """
+    The pr branches are built with plumbing commands, so the checked out
+    branch is never changed, and unchanged commits keep their pr branch
+    commit.
+    """
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    root_dir = given_repo(file_env, git_env, tmp_path)
+    cfg = config.default_config(root_dir)
+    login = om.gen_gh_username()
+    status_response = {
+        "data": {
+            "repository": {"id": om.gen_gh_repo_id().value},
+            "viewer": {"login": login.value},
+            "search": {"nodes": []},
+        }
+    }
+    github_env = FakeGithubEnv(
+        gh_responses={},
+        gql_responses={repr(github.status_params()): [status_response]},
+    )
+    console_env = console.RealEnv()
+    given_file(file_env, "untracked", ["untracked"])
+    first_hashes = build_planned_branches(
         console_env,
-        file_env,
         git_env,
-        github_env,
-        cfg,
+        plan_push(console_env, file_env, git_env, github_env, cfg),
     )
+    given_incremental_sync(github_env, file_env, git_env, status_response)
     # when
-    update_pr_branches(console_env, git_env, stack)
+    second_hashes = build_planned_branches(
+        console_env,
+        git_env,
+        plan_push(console_env, file_env, git_env, github_env, cfg),
+    )
     # then
-    assert (
-        git.branch_exists(
-            git_env,
-            GitBranchName(f"gitzen/pr/{login.value}/{token1.value}"),
-        )
-        is True
-    ), "first branch"
-    assert (
-        git.branch_exists(
-            git_env,
-            GitBranchName(
-                f"gitzen/pr/{login.value}/{token2.value}",
-            ),
-        )
-        is True
-    ), "second branch"
+    assert repo.get_local_branch_name(console_env, git_env) == GitBranchName(
+        "master"
+    )
+    assert file.read(file_env, "untracked") == ["untracked"]
+    assert second_hashes == first_hashes
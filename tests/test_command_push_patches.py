@@ -1,11 +1,9 @@
 from pathlib import PosixPath
-from typing import List
 
-from gitzen import config, file, git, logger
+from gitzen import config, file, git, logger, repo
 from gitzen.commands.push import update_patches
-from gitzen.models.git_commit import GitCommit
+from gitzen.models.ref_transaction import RefTransaction
 
-from . import object_mother as om
 from .fakes.console_env import FakeConsoleEnv
 from .fakes.repo_files import given_repo
 
@@ -16,16 +14,44 @@ def test_update_patches_creates_patches(tmp_path: PosixPath) -> None:
     file_env = file.RealEnv(logger_env)
     git_env = git.RealEnv(logger_env)
     root_dir = given_repo(file_env, git_env, tmp_path)
-    commits: List[GitCommit] = [
-        om.gen_commit(token=None),
-        om.gen_commit(token=None),
-    ]
     console_env = FakeConsoleEnv()
     cfg = config.load(console_env, file_env, root_dir)
+    commits = repo.get_commit_stack(
+        console_env,
+        git_env,
+        cfg.remote,
+        cfg.default_branch,
+    )
+    transaction = RefTransaction()
     # when
-    update_patches(console_env, file_env, cfg.root_dir, commits)
+    update_patches(console_env, git_env, commits, transaction)
+    git.update_refs(git_env, transaction)
     # then
-    commit1_patch_file = git.gitzen_patch_file(commits[0].zen_token, root_dir)
-    commit2_patch_file = git.gitzen_patch_file(commits[1].zen_token, root_dir)
-    assert file.read(file_env, commit1_patch_file) == [commits[0].hash.value]
-    assert file.read(file_env, commit2_patch_file) == [commits[1].hash.value]
+    commit1_patch_ref = git.gitzen_patch_ref(commits[0].zen_token)
+    commit2_patch_ref = git.gitzen_patch_ref(commits[1].zen_token)
+    assert git.ref_hash(git_env, commit1_patch_ref) == commits[0].hash
+    assert git.ref_hash(git_env, commit2_patch_ref) == commits[1].hash
+
+
+def test_update_patches_skips_current_patches(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    root_dir = given_repo(file_env, git_env, tmp_path)
+    console_env = FakeConsoleEnv()
+    cfg = config.load(console_env, file_env, root_dir)
+    commits = repo.get_commit_stack(
+        console_env,
+        git_env,
+        cfg.remote,
+        cfg.default_branch,
+    )
+    first = RefTransaction()
+    update_patches(console_env, git_env, commits, first)
+    git.update_refs(git_env, first)
+    transaction = RefTransaction()
+    # when
+    update_patches(console_env, git_env, commits, transaction)
+    # then
+    assert len(transaction) == 0
@@ -0,0 +1,359 @@
+import json
+import os
+from pathlib import PosixPath
+from typing import List, Optional, Tuple
+
+import pytest
+
+from benchmarks import stack
+from benchmarks.github_env import SyntheticGithubEnv
+from gitzen import (
+    cache,
+    config,
+    exit_code,
+    file,
+    git,
+    github,
+    journal,
+    logger,
+    repo,
+)
+from gitzen.commands import push
+from gitzen.models.git_commit import GitCommit
+from gitzen.models.gitzen_error import GitZenError
+from gitzen.types import GitBranchName, GitRootDir
+
+from . import object_mother as om
+from .fakes.console_env import FakeConsoleEnv
+from .fakes.github_env import FakeGithubEnv, given_incremental_sync
+from .fakes.repo_files import given_file, given_repo
+
+
+class CountingGitEnv(git.RealEnv):
+    """
+    Counts the git commands run and the objects read.
+    """
+
+    calls: int
+
+    def __init__(self, logger_env: logger.Env) -> None:
+        super().__init__(logger_env)
+        self.calls = 0
+
+    def _git(self, args: str) -> Tuple[Optional[int], List[str]]:
+        self.calls += 1
+        return super()._git(args)
+
+    def _git_stdin(
+        self,
+        args: str,
+        input: str,
+    ) -> Tuple[Optional[int], List[str]]:
+        self.calls += 1
+        return super()._git_stdin(args, input)
+
+    def _git_output(
+        self,
+        args: str,
+        input: Optional[str] = None,
+    ) -> Tuple[Optional[int], bytes]:
+        self.calls += 1
+        return super()._git_output(args, input)
+
+    def _cat_file(self, ref: str) -> Optional[Tuple[str, str, bytes]]:
+        self.calls += 1
+        return super()._cat_file(ref)
+
+    def _cat_file_check(self, ref: str) -> Optional[Tuple[str, str, int]]:
+        self.calls += 1
+        return super()._cat_file_check(ref)
+
+
+def given_stack(git_env: git.Env, cfg: config.Config) -> List[GitCommit]:
+    return repo.get_commit_stack(
+        FakeConsoleEnv(),
+        git_env,
+        cfg.remote,
+        cfg.default_branch,
+    )
+
+
+def status_response(login: str) -> dict:
+    return {
+        "data": {
+            "repository": {"id": om.gen_gh_repo_id().value},
+            "viewer": {"login": login},
+            "search": {"nodes": []},
+        }
+    }
+
+
+def test_dry_run_prints_plan_without_changes(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    root_dir = given_repo(file_env, git_env, tmp_path)
+    cfg = config.default_config(root_dir)
+    login = om.gen_gh_username().value
+    github_env = FakeGithubEnv(
+        gh_responses={},
+        gql_responses={repr(github.status_params()): [status_response(login)]},
+    )
+    console_env = FakeConsoleEnv()
+    log = git.log_graph(git_env)
+    # when
+    with pytest.raises(SystemExit) as system_exit:
+        push.push(console_env, file_env, git_env, github_env, cfg, True)
+    # then
+    assert system_exit.value.code == 0
+    plan = json.loads(console_env.std_out[-1])
+    assert [operation["op"] for operation in plan["operations"]] == [
+        "update-ref",
+        "update-ref",
+        "create-branch",
+        "create-branch",
+        "push",
+        "create-pr",
+        "create-pr",
+    ]
+    assert plan["cost"] == {
+        "commits": 2,
+        "refs": 4,
+        "pushes": 1,
+        "github_requests": 2,
+    }
+    assert git.log_graph(git_env) == log
+    for operation in plan["operations"][2:4]:
+        branch = GitBranchName(operation["branch"])
+        assert git.branch_exists(git_env, branch) is False
+    assert os.path.exists(cache.pull_requests_file(git_env)) is False
+    assert os.path.exists(cache.commits_file(git_env)) is False
+
+
+def test_plan_keeps_built_pr_branches(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    root_dir = given_repo(file_env, git_env, tmp_path)
+    cfg = config.default_config(root_dir)
+    login = om.gen_gh_username().value
+    github_env = FakeGithubEnv(
+        gh_responses={},
+        gql_responses={repr(github.status_params()): [status_response(login)]},
+    )
+    console_env = FakeConsoleEnv()
+    built = push.plan_push(console_env, file_env, git_env, github_env, cfg)
+    hashes = push.build_planned_branches(console_env, git_env, built)
+    stack = built.commit_stack
+    given_incremental_sync(
+        github_env,
+        file_env,
+        git_env,
+        status_response(login),
+    )
+    # when
+    plan = push.plan_push(
+        console_env,
+        file_env,
+        git_env,
+        github_env,
+        cfg,
+        rebase=False,
+    )
+    # then
+    assert plan.commit_stack == stack
+    assert plan.tip_hashes == hashes
+    assert plan.head_hashes == hashes
+    assert push.plan_operations(plan, cfg) == [
+        {
+            "op": "push",
+            "remote": "origin",
+            "branches": [cb.head.value for cb in stack],
+        },
+        {
+            "op": "create-pr",
+            "head": stack[0].head.value,
+            "base": "master",
+            "title": stack[0].git_commit.messageHeadline.value,
+        },
+        {
+            "op": "create-pr",
+            "head": stack[1].head.value,
+            "base": stack[0].head.value,
+            "title": stack[1].git_commit.messageHeadline.value,
+        },
+    ]
+
+
+def calls_to_plan_top_change(tmp_path: PosixPath, extra_commits: int) -> int:
+    """
+    Counts the git calls to plan a push after amending the top commit of a
+    stack that has already been pushed.
+    """
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = CountingGitEnv(logger_env)
+    root_dir = given_repo(file_env, git_env, tmp_path)
+    for index in range(extra_commits):
+        file.write(file_env, f"file-{index}", [f"{index}"])
+        git.add(git_env, [f"file-{index}"])
+        git.commit(git_env, [f"Add file-{index}"])
+    cfg = config.default_config(root_dir)
+    login = om.gen_gh_username().value
+    github_env = FakeGithubEnv(
+        gh_responses={},
+        gql_responses={repr(github.status_params()): [status_response(login)]},
+    )
+    console_env = FakeConsoleEnv()
+    push.build_planned_branches(
+        console_env,
+        git_env,
+        push.plan_push(console_env, file_env, git_env, github_env, cfg),
+    )
+    file.write(file_env, "top", ["top"])
+    git.add(git_env, ["top"])
+    git.commit_amend_noedit(git_env)
+    given_incremental_sync(
+        github_env,
+        file_env,
+        git_env,
+        status_response(login),
+    )
+    git_env.calls = 0
+    plan = push.plan_push(
+        console_env,
+        file_env,
+        git_env,
+        github_env,
+        cfg,
+        rebase=False,
+    )
+    assert plan.head_hashes[-1] is None
+    assert None not in plan.head_hashes[:-1]
+    return git_env.calls
+
+
+def test_plan_calls_do_not_grow_with_unchanged_stack(
+    tmp_path: PosixPath,
+) -> None:
+    # given
+    small = calls_to_plan_top_change(tmp_path / "small", 0)
+    # when
+    large = calls_to_plan_top_change(tmp_path / "large", 8)
+    # then
+    assert large == small
+
+
+def test_dry_run_counts_a_request_per_chunk_of_updates(
+    tmp_path: PosixPath,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # given a stack of 60 pushed commits, all of them amended since
+    synthetic = stack.generate(60, f"{tmp_path}/stack")
+    monkeypatch.chdir(synthetic.repo_dir)
+    amend = "git add . && git commit --quiet --amend --no-edit"
+    given_file(file.RealEnv(logger.Env()), "amended.txt", ["amended"])
+    stack.run(["git", "rebase", "--quiet", "--exec", amend, "origin/master"])
+    logger_env = logger.Env()
+    git_env = git.RealEnv(logger_env)
+    console_env = FakeConsoleEnv()
+    # when
+    with pytest.raises(SystemExit) as system_exit:
+        push.push(
+            console_env,
+            file.RealEnv(logger_env),
+            git_env,
+            SyntheticGithubEnv(synthetic),
+            config.default_config(GitRootDir(os.getcwd())),
+            dry_run=True,
+        )
+    git.close(git_env)
+    # then
+    assert system_exit.value.code == 0
+    plan = json.loads(console_env.std_out[-1])
+    kinds = [operation["op"] for operation in plan["operations"]]
+    assert kinds.count("update-pr") == 60
+    assert plan["cost"]["github_requests"] == 2
+
+
+class FlakyGithubEnv(FakeGithubEnv):
+    """
+    Fails to create the pull request for the failing branch.
+    """
+
+    failing: Optional[str]
+    requests: List[str]
+
+    def __init__(self, login: str) -> None:
+        super().__init__(
+            gh_responses={},
+            gql_responses={
+                repr(github.status_params()): [status_response(login)]
+            },
+        )
+        self.failing = None
+        self.requests = []
+
+    def _gh(self, args: str) -> List[str]:
+        if self.failing is not None and f"--head {self.failing} " in args:
+            raise GitZenError(exit_code.GITHUB_ERROR, "rate limited")
+        self.requests.append(args)
+        return []
+
+
+def test_resume_runs_only_unfinished_steps(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    root_dir = given_repo(file_env, git_env, tmp_path)
+    cfg = config.default_config(root_dir)
+    login = om.gen_gh_username().value
+    github_env = FlakyGithubEnv(login)
+    console_env = FakeConsoleEnv()
+    tokens = [commit.zen_token.value for commit in given_stack(git_env, cfg)]
+    heads = [f"gitzen/pr/{login}/{token}" for token in tokens]
+    github_env.failing = heads[1]
+    with pytest.raises(SystemExit) as interrupted:
+        push.push(console_env, file_env, git_env, github_env, cfg)
+    assert interrupted.value.code == exit_code.GITHUB_ERROR
+    unfinished = journal.load(file_env, git_env)
+    assert unfinished is not None
+    assert unfinished.pending == [f"create-pr {heads[1]}"]
+    github_env.failing = None
+    github_env.requests = []
+    given_incremental_sync(
+        github_env,
+        file_env,
+        git_env,
+        status_response(login),
+    )
+    # when
+    with pytest.raises(SystemExit) as resumed:
+        push.push(console_env, file_env, git_env, github_env, cfg, resume=True)
+    # then
+    assert resumed.value.code == 0
+    assert len(github_env.requests) == 1
+    assert github_env.requests[0].startswith(
+        f"pr create --head {heads[1]} --base {heads[0]} "
+    )
+    assert journal.load(file_env, git_env) is None
+
+
+def test_resume_without_journal_does_nothing(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    root_dir = given_repo(file_env, git_env, tmp_path)
+    cfg = config.default_config(root_dir)
+    github_env = FakeGithubEnv(gh_responses={}, gql_responses={})
+    console_env = FakeConsoleEnv()
+    # when
+    with pytest.raises(SystemExit) as resumed:
+        push.push(console_env, file_env, git_env, github_env, cfg, resume=True)
+    # then
+    assert resumed.value.code == 0
+    assert console_env.std_out == ["No interrupted push to resume"]
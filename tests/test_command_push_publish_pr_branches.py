@@ -1,13 +1,17 @@
 import re
 from pathlib import PosixPath
 
-from gitzen import config, console, file, git, logger, repo
-from gitzen.commands.push import prepare_pr_branches, publish_pr_branches
+from gitzen import config, console, file, git, github, logger, repo
+from gitzen.commands.push import (
+    build_planned_branches,
+    plan_push,
+    publish_pr_branches,
+)
 from gitzen.patterns import short_hash
 from gitzen.types import GitBranchName
 
 from . import object_mother as om
-from .fakes.github_env import FakeGithubEnv
+from .fakes.github_env import FakeGithubEnv, given_incremental_sync
 from .fakes.repo_files import given_repo
 
 
@@ -33,32 +37,27 @@ def test_when_remote_exists_and_is_uptodate_then_do_nothing(
     github_env = FakeGithubEnv(
         {},
         {
-            repr({"repo_owner": "{owner}", "repo_name": "{repo}"}): [
+            repr(github.status_params()): [
                 {
                     "data": {
                         "repository": {"id": repo_id.value},
-                        "viewer": {
-                            "login": author.value,
-                            "repository": {
-                                "pullRequests": {
-                                    "nodes": [],
-                                },
-                            },
-                        },
+                        "viewer": {"login": author.value},
+                        "search": {"nodes": []},
                     }
                 },
             ]
         },
     )
-    _, stack, pr_head_hashes = prepare_pr_branches(
+    plan = plan_push(console_env, file_env, git_env, github_env, cfg)
+    pr_head_hashes = build_planned_branches(console_env, git_env, plan)
+    # when
+    publish_pr_branches(
         console_env,
-        file_env,
         git_env,
-        github_env,
+        plan.commit_stack,
+        pr_head_hashes,
         cfg,
     )
-    # when
-    publish_pr_branches(console_env, git_env, stack, pr_head_hashes, cfg)
     # then
     token_alpha = commits[0].zen_token
     token_beta = commits[1].zen_token
@@ -98,3 +97,55 @@ def test_when_remote_exists_and_is_uptodate_then_do_nothing(
         rf"\* {short_hash} \(origin/{pr_alpha}, {pr_alpha}\) Add ALPHA.md",
         log[pull_alpha],
     ), "PR Alpha"
+
+
+def test_when_remote_exists_and_is_outdated_then_update(
+    tmp_path: PosixPath,
+) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    root_dir = given_repo(file_env, git_env, tmp_path)
+    cfg = config.default_config(root_dir)
+    console_env = console.RealEnv()
+    repo_id = om.gen_gh_repo_id()
+    author = om.gen_gh_username()
+    status_response = {
+        "data": {
+            "repository": {"id": repo_id.value},
+            "viewer": {"login": author.value},
+            "search": {"nodes": []},
+        }
+    }
+    github_env = FakeGithubEnv(
+        {},
+        {repr(github.status_params()): [status_response]},
+    )
+    plan = plan_push(console_env, file_env, git_env, github_env, cfg)
+    pr_head_hashes = build_planned_branches(console_env, git_env, plan)
+    publish_pr_branches(
+        console_env,
+        git_env,
+        plan.commit_stack,
+        pr_head_hashes,
+        cfg,
+    )
+    file.write(file_env, "new-file", ["contents"])
+    git.add(git_env, ["new-file"])
+    git.commit_amend_noedit(git_env)
+    given_incremental_sync(github_env, file_env, git_env, status_response)
+    plan = plan_push(console_env, file_env, git_env, github_env, cfg)
+    pr_head_hashes = build_planned_branches(console_env, git_env, plan)
+    # when
+    publish_pr_branches(
+        console_env,
+        git_env,
+        plan.commit_stack,
+        pr_head_hashes,
+        cfg,
+    )
+    # then
+    for cb, pr_head_hash in zip(plan.commit_stack, pr_head_hashes):
+        remote_hash = git.remote_branch_hash(git_env, cfg.remote, cb.head)
+        assert remote_hash == pr_head_hash
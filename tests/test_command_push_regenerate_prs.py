@@ -0,0 +1,105 @@
+import threading
+from typing import Callable, List
+
+import pytest
+
+from gitzen import exit_code
+from gitzen.commands.push import run_in_dependency_order
+from gitzen.models.gitzen_error import GitZenError
+from gitzen.types import GitBranchName
+
+
+class Recorder:
+    """
+    Records the order tasks finish in and the most that ran at once.
+    """
+
+    finished: List[str]
+    running: int
+    most_running: int
+    lock: threading.Lock
+    started: threading.Barrier
+
+    def __init__(self, parties: int = 1) -> None:
+        self.finished = []
+        self.running = 0
+        self.most_running = 0
+        self.lock = threading.Lock()
+        self.started = threading.Barrier(parties, timeout=5)
+
+    def task(self, name: str, wait: bool = False) -> Callable[[], None]:
+        def run() -> None:
+            with self.lock:
+                self.running += 1
+                self.most_running = max(self.most_running, self.running)
+            if wait:
+                self.started.wait()
+            with self.lock:
+                self.running -= 1
+                self.finished.append(name)
+
+        return run
+
+
+def test_independent_tasks_run_concurrently() -> None:
+    # given
+    recorder = Recorder(parties=3)
+    tasks = {
+        GitBranchName(name): (None, recorder.task(name, wait=True))
+        for name in ["a", "b", "c"]
+    }
+    # when
+    run_in_dependency_order(tasks, 3)
+    # then
+    assert sorted(recorder.finished) == ["a", "b", "c"]
+    assert recorder.most_running == 3
+
+
+def test_concurrency_is_limited() -> None:
+    # given
+    recorder = Recorder()
+    tasks = {
+        GitBranchName(f"{name}"): (None, recorder.task(f"{name}"))
+        for name in range(10)
+    }
+    # when
+    run_in_dependency_order(tasks, 2)
+    # then
+    assert len(recorder.finished) == 10
+    assert recorder.most_running <= 2
+
+
+def test_dependent_task_waits_for_its_dependency() -> None:
+    # given
+    recorder = Recorder()
+    a, b, c = GitBranchName("a"), GitBranchName("b"), GitBranchName("c")
+    tasks = {
+        c: (b, recorder.task("c")),
+        b: (a, recorder.task("b")),
+        a: (None, recorder.task("a")),
+    }
+    # when
+    run_in_dependency_order(tasks, 4)
+    # then
+    assert recorder.finished == ["a", "b", "c"]
+
+
+def test_dependents_of_failed_task_are_not_run() -> None:
+    # given
+    recorder = Recorder()
+    a, b, c = GitBranchName("a"), GitBranchName("b"), GitBranchName("c")
+
+    def fail() -> None:
+        raise GitZenError(exit_code.GITHUB_ERROR, "failed")
+
+    tasks = {
+        a: (None, fail),
+        b: (a, recorder.task("b")),
+        c: (None, recorder.task("c")),
+    }
+    # then
+    with pytest.raises(GitZenError) as error:
+        # when
+        run_in_dependency_order(tasks, 4)
+    assert error.value.message == "failed"
+    assert recorder.finished == ["c"]
@@ -1,6 +1,11 @@
-from gitzen import logger
+from datetime import timedelta
+from pathlib import PosixPath
+from typing import List
+
+from gitzen import cache, config, file, github, logger
 from gitzen.commands import status
-from gitzen.types import GitBranchName
+from gitzen.models.pull_request_snapshot import PullRequestSnapshot
+from gitzen.types import GitBranchName, GitRootDir
 
 from . import object_mother as om
 from .fakes.console_env import FakeConsoleEnv
@@ -8,9 +13,10 @@ from .fakes.git_env import FakeGitEnv
 from .fakes.github_env import FakeGithubEnv
 
 
-def test_command_status_fetches_info_with_pr() -> None:
+def test_command_status_fetches_info_with_pr(tmp_path: PosixPath) -> None:
     # given
     logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
     console_env = FakeConsoleEnv()
     branch_name = om.gen_git_branch_name()
     other_branch_name = om.gen_git_branch_name()
@@ -22,7 +28,8 @@ def test_command_status_fetches_info_with_pr() -> None:
                     f"* {branch_name.value}",
                     f"  {other_branch_name.value}",
                 ]
-            ]
+            ],
+            "rev-parse --absolute-git-dir": [[f"{tmp_path}"]] * 2,
         },
     )
     repo_id = om.gen_gh_repo_id()
@@ -52,25 +59,19 @@ def test_command_status_fetches_info_with_pr() -> None:
     github_env = FakeGithubEnv(
         gh_responses={},
         gql_responses={
-            repr({"repo_owner": "{owner}", "repo_name": "{repo}"}): [
+            repr(github.status_params()): [
                 {
                     "data": {
                         "repository": {"id": repo_id.value},
-                        "viewer": {
-                            "login": login.value,
-                            "repository": {
-                                "pullRequests": {
-                                    "nodes": [pull_request],
-                                },
-                            },
-                        },
+                        "viewer": {"login": login.value},
+                        "search": {"nodes": [pull_request]},
                     }
                 }
             ]
         },
     )
     # when
-    status.status(console_env, git_env, github_env)
+    status.status(console_env, file_env, git_env, github_env)
     # then
     stdout = list(
         filter(lambda line: not line.startswith("Fake"), console_env.std_out),
@@ -84,9 +85,10 @@ def test_command_status_fetches_info_with_pr() -> None:
     ]
 
 
-def test_command_status_fetches_info_with_no_pr() -> None:
+def test_command_status_fetches_info_with_no_pr(tmp_path: PosixPath) -> None:
     # given
     logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
     console_env = FakeConsoleEnv()
     branch_name = om.gen_git_branch_name()
     other_branch_name = om.gen_git_branch_name()
@@ -98,7 +100,8 @@ def test_command_status_fetches_info_with_no_pr() -> None:
                     f"* {branch_name.value}",
                     f"  {other_branch_name.value}",
                 ]
-            ]
+            ],
+            "rev-parse --absolute-git-dir": [[f"{tmp_path}"]] * 2,
         },
     )
     repo_id = om.gen_gh_repo_id()
@@ -128,25 +131,19 @@ def test_command_status_fetches_info_with_no_pr() -> None:
     github_env = FakeGithubEnv(
         gh_responses={},
         gql_responses={
-            repr({"repo_owner": "{owner}", "repo_name": "{repo}"}): [
+            repr(github.status_params()): [
                 {
                     "data": {
                         "repository": {"id": repo_id.value},
-                        "viewer": {
-                            "login": login.value,
-                            "repository": {
-                                "pullRequests": {
-                                    "nodes": [pull_request],
-                                },
-                            },
-                        },
+                        "viewer": {"login": login.value},
+                        "search": {"nodes": [pull_request]},
                     }
                 }
             ]
         },
     )
     # when
-    status.status(console_env, git_env, github_env)
+    status.status(console_env, file_env, git_env, github_env)
     # then
     stdout = list(
         filter(lambda line: not line.startswith("Fake"), console_env.std_out),
@@ -159,3 +156,70 @@ def test_command_status_fetches_info_with_no_pr() -> None:
         "Kept 0 Pull Requests",
         "Stack is empty - no Pull Requests found",
     ]
+
+
+def given_cached_status(
+    tmp_path: PosixPath,
+    synced_at: str,
+) -> List[str]:
+    """
+    Runs a cached status, with one Pull Request synced at the time given,
+    returning what it shows and then whether it refreshed.
+    """
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    console_env = FakeConsoleEnv()
+    git_env = FakeGitEnv(
+        logger_env,
+        {"rev-parse --absolute-git-dir": [[f"{tmp_path}"]] * 3},
+    )
+    pr = om.gen_pr(token=None)
+    cache.save_pull_requests(
+        file_env,
+        git_env,
+        PullRequestSnapshot(
+            synced_at,
+            pr.author,
+            pr.repoId,
+            [("2022-09-01T10:00:00Z", pr)],
+        ),
+    )
+    refreshes: List[str] = []
+    status.status(
+        console_env,
+        file_env,
+        git_env,
+        FakeGithubEnv(gh_responses={}, gql_responses={}),
+        config.default_config(GitRootDir(f"{tmp_path}")),
+        cached=True,
+        refresh=lambda: refreshes.append("refresh"),
+    )
+    stdout = [
+        line for line in console_env.std_out if not line.startswith("Fake")
+    ]
+    return stdout + refreshes
+
+
+def test_cached_status_shows_last_sync(tmp_path: PosixPath) -> None:
+    # when
+    result = given_cached_status(tmp_path, github.sync_time())
+    # then
+    assert result[0] == "Pull Requests as of just now"
+    assert result[1].startswith("PR-")
+    assert len(result) == 2
+
+
+def test_cached_status_refreshes_when_stale(tmp_path: PosixPath) -> None:
+    # when
+    result = given_cached_status(tmp_path, "2022-09-01T10:00:00Z")
+    # then
+    assert result[0].endswith(" days ago")
+    assert result[2] == "refresh"
+
+
+def test_describe_age() -> None:
+    # then
+    assert status.describe_age(timedelta(seconds=59)) == "just now"
+    assert status.describe_age(timedelta(minutes=1)) == "1 minute ago"
+    assert status.describe_age(timedelta(hours=5)) == "5 hours ago"
+    assert status.describe_age(None) == "an unknown time"
@@ -0,0 +1,247 @@
+import os
+from pathlib import PosixPath
+from typing import IO, Any, List, Optional, Tuple
+
+from gitzen import cache, file, git, logger, repo, repo_commit_stack
+from gitzen.models.commit_cache import CommitCache
+from gitzen.types import GitBranchName, GitRemoteName
+
+from . import object_mother as om
+from .fakes.console_env import FakeConsoleEnv
+from .fakes.repo_files import given_file, given_repo
+
+
+class RecordingGitEnv(git.RealEnv):
+    """
+    Records the git commands it runs.
+    """
+
+    commands: List[str]
+
+    def __init__(self, logger_env: logger.Env) -> None:
+        super().__init__(logger_env)
+        self.commands = []
+
+    def _git(self, args: str) -> Tuple[Optional[int], List[str]]:
+        self.commands.append(args)
+        return super()._git(args)
+
+    def _git_stdin(
+        self,
+        args: str,
+        input: str,
+    ) -> Tuple[Optional[int], List[str]]:
+        self.commands.append(f"{args} < {' '.join(input.splitlines())}")
+        return super()._git_stdin(args, input)
+
+    def _git_output(
+        self,
+        args: str,
+        input: Optional[str] = None,
+    ) -> Tuple[Optional[int], bytes]:
+        if input is None:
+            self.commands.append(args)
+        else:
+            self.commands.append(f"{args} < {' '.join(input.splitlines())}")
+        return super()._git_output(args, input)
+
+
+class RecordingFileEnv(file.RealEnv):
+    """
+    Records the files it opens.
+    """
+
+    opened: List[str]
+
+    def __init__(self, logger_env: logger.Env) -> None:
+        super().__init__(logger_env)
+        self.opened = []
+
+    def open(self, filename: str, mode: str) -> IO[Any]:
+        self.opened.append(f"{filename} [{mode}]")
+        return super().open(filename, mode)
+
+
+class ReplacingFileEnv(file.RealEnv):
+    """
+    Records what each file held just before it was replaced.
+    """
+
+    replaced: List[Tuple[str, List[str]]]
+
+    def __init__(self, logger_env: logger.Env) -> None:
+        super().__init__(logger_env)
+        self.replaced = []
+
+    def replace(self, source: str, filename: str) -> None:
+        if self.version(filename) is not None:
+            self.replaced.append((filename, self.read(filename)))
+        super().replace(source, filename)
+
+
+def log_commands(git_env: RecordingGitEnv) -> List[str]:
+    return [command for command in git_env.commands if command[:4] == "log "]
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    # given
+    commit_1 = om.gen_commit(token=None)
+    commit_2 = om.gen_commit(token=None)
+    commit_3 = om.gen_commit(token=None)
+    commit_cache = CommitCache(2, [commit_1, commit_2])
+    commit_cache.get(commit_1.hash)
+    # when
+    commit_cache.put(commit_3)
+    # then
+    assert commit_cache.commits == [commit_1, commit_3]
+    assert commit_cache.get(commit_2.hash) is None
+
+
+def test_second_read_parses_no_commits(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = RecordingGitEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    console_env = FakeConsoleEnv()
+    origin, master = GitRemoteName("origin"), GitBranchName("master")
+    first = repo.get_commit_stack(
+        console_env,
+        git_env,
+        origin,
+        master,
+        file_env,
+    )
+    git_env.commands = []
+    # when
+    second = repo.get_commit_stack(
+        console_env,
+        git_env,
+        origin,
+        master,
+        file_env,
+    )
+    # then
+    assert second == first
+    assert len(first) == 2
+    assert log_commands(git_env) == []
+    assert len(cache.load_commits(file_env, git_env)) == 2
+
+
+def test_only_new_commits_are_parsed(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = RecordingGitEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    console_env = FakeConsoleEnv()
+    origin, master = GitRemoteName("origin"), GitBranchName("master")
+    repo.get_commit_stack(console_env, git_env, origin, master, file_env)
+    file.write(file_env, "GAMMA.md", ["gamma"])
+    git.add(git_env, ["GAMMA.md"])
+    git.commit(git_env, ["Add GAMMA.md"])
+    head = git.head_hash(git_env)
+    git_env.commands = []
+    # when
+    result = repo.get_commit_stack(
+        console_env,
+        git_env,
+        origin,
+        master,
+        file_env,
+    )
+    # then
+    assert [commit.messageHeadline.value for commit in result] == [
+        "Add ALPHA.md",
+        "Add BETA.md",
+        "Add GAMMA.md",
+    ]
+    format = "%x00".join(repo_commit_stack.commit_fields)
+    assert log_commands(git_env) == [
+        f"log -z --format={format} --no-walk=unsorted --stdin < {head.value}"
+    ]
+
+
+def test_stack_larger_than_cache_is_read(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    commit_cache = CommitCache(1, [])
+    # when
+    result = repo_commit_stack.get_cached_commit_stack(
+        FakeConsoleEnv(),
+        git_env,
+        "origin/master..HEAD",
+        commit_cache,
+    )
+    # then
+    assert [commit.messageHeadline.value for commit in result] == [
+        "Add ALPHA.md",
+        "Add BETA.md",
+    ]
+    assert len(commit_cache.commits) == 1
+
+
+def test_unreadable_cache_is_ignored(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    file.make_dirs(file_env, cache.cache_dir(git_env))
+    given_file(file_env, cache.commits_file(git_env), ["{not json"])
+    # when
+    result = repo.get_commit_stack(
+        FakeConsoleEnv(),
+        git_env,
+        GitRemoteName("origin"),
+        GitBranchName("master"),
+        file_env,
+    )
+    # then
+    assert len(result) == 2
+    assert len(cache.load_commits(file_env, git_env)) == 2
+
+
+def test_unchanged_cache_file_is_not_read_again(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = RecordingFileEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    commit_cache = CommitCache(2, [om.gen_commit(token=None)])
+    cache.save_commits(file_env, git_env, commit_cache)
+    file_env.opened = []
+    # when
+    first = cache.load_commits(file_env, git_env)
+    given_file(file_env, cache.commits_file(git_env), ["{not json"])
+    second = cache.load_commits(file_env, git_env)
+    # then
+    assert first.commits == commit_cache.commits
+    assert second.commits == []
+    assert file_env.opened == [
+        f"{cache.commits_file(git_env)} [w]",
+        f"{cache.commits_file(git_env)} [r]",
+    ]
+
+
+def test_cache_file_is_whole_while_it_is_written(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = ReplacingFileEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    cache.save_commits(
+        file_env, git_env, CommitCache(2, [om.gen_commit(token=None)])
+    )
+    old = file.read(file_env, cache.commits_file(git_env))
+    # when
+    cache.save_commits(
+        file_env, git_env, CommitCache(2, [om.gen_commit(token=None)])
+    )
+    # then
+    assert file_env.replaced[-1] == (cache.commits_file(git_env), old)
+    assert file.read(file_env, cache.commits_file(git_env)) != old
+    assert os.listdir(cache.cache_dir(git_env)) == ["commits.json"]
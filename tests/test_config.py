@@ -36,6 +36,9 @@ def test_load_when_file_is_found(tmp_path: PosixPath) -> None:
             "remoteBranches:",
             "  - rbn",
             "remote: other",
+            "githubClient: http",
+            "prConcurrency: 8",
+            "statusTtl: 60",
         ],
     )
     console_env = console.RealEnv()
@@ -47,6 +50,9 @@ def test_load_when_file_is_found(tmp_path: PosixPath) -> None:
         GitBranchName("drb"),
         [GitBranchName("rbn")],
         GitRemoteName("other"),
+        github_client="http",
+        pr_concurrency=8,
+        status_ttl=60,
     )
 
 
@@ -0,0 +1,193 @@
+import os
+import socket
+import subprocess
+import threading
+import time
+from pathlib import PosixPath
+from typing import Iterator, List, Tuple
+
+import pytest
+
+from gitzen import (
+    config,
+    console,
+    daemon,
+    daemon_client,
+    exit_code,
+    file,
+    git,
+    github,
+    logger,
+)
+from gitzen.models.command_context import CommandContext
+from gitzen.models.gitzen_error import GitZenError
+
+from .fakes.repo_files import given_file, given_repo
+
+
+def run(console_env: console.Env, args: List[str]) -> None:
+    console.info(console_env, f"running {' '.join(args)}")
+    if args[0] == "merge":
+        raise GitZenError(exit_code.GITHUB_ERROR, "merge failed")
+    if args[0] == "push":
+        exit(0)
+
+
+def given_daemon(tmp_path: PosixPath) -> Tuple[str, threading.Thread]:
+    """
+    Starts a daemon, returning once it accepts connections.
+    """
+    os.makedirs(f"{tmp_path}/.git/gitzen")
+    path = daemon_client.socket_path(f"{tmp_path}/.git")
+    thread = threading.Thread(target=daemon.serve, args=(path, run))
+    thread.start()
+    while True:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            try:
+                client.connect(path)
+                return path, thread
+            except OSError:
+                time.sleep(0.01)
+
+
+@pytest.fixture
+def serving(tmp_path: PosixPath) -> Iterator[str]:
+    _, thread = given_daemon(tmp_path)
+    yield f"{tmp_path}"
+    daemon_client.stop(f"{tmp_path}")
+    thread.join(timeout=5)
+
+
+def test_forward_runs_command_in_daemon(
+    serving: str,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    # given
+    os.makedirs(f"{serving}/sub/dir")
+    # when
+    result = daemon_client.forward(
+        f"{serving}/sub/dir",
+        ["status", "--cached"],
+    )
+    # then
+    assert result == 0
+    assert capsys.readouterr().out == "running status --cached\n"
+
+
+def test_forward_returns_exit_code_of_error(
+    serving: str,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    # when
+    merge = daemon_client.forward(serving, ["merge"])
+    push = daemon_client.forward(serving, ["push"])
+    # then
+    assert merge == exit_code.GITHUB_ERROR
+    assert push == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "running merge",
+        "ERROR: merge failed",
+        "running push",
+    ]
+
+
+def test_forward_skips_commands_run_locally(serving: str) -> None:
+    # then
+    assert daemon_client.forward(serving, ["init"]) is None
+    assert daemon_client.forward(serving, ["status", "--log", "all"]) is None
+    assert daemon_client.forward(serving, ["push", "--profile", "p"]) is None
+
+
+def test_forward_without_daemon_runs_nothing(tmp_path: PosixPath) -> None:
+    # given
+    os.makedirs(f"{tmp_path}/.git/gitzen")
+    # then
+    assert daemon_client.forward(f"{tmp_path}", ["status"]) is None
+
+
+def test_forward_ignores_socket_left_behind(tmp_path: PosixPath) -> None:
+    # given
+    os.makedirs(f"{tmp_path}/.git/gitzen")
+    with open(daemon_client.socket_path(f"{tmp_path}/.git"), "w"):
+        pass
+    # then
+    assert daemon_client.forward(f"{tmp_path}", ["status"]) is None
+
+
+def test_stop_removes_socket(tmp_path: PosixPath) -> None:
+    # given
+    path, thread = given_daemon(tmp_path)
+    # when
+    stopped = daemon_client.stop(f"{tmp_path}")
+    thread.join(timeout=5)
+    # then
+    assert stopped is True
+    assert not thread.is_alive()
+    assert not os.path.exists(path)
+
+
+def test_daemon_keeps_envs_until_config_changes(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    root_dir = given_repo(file_env, git_env, tmp_path)
+    github_envs: List[github.Env] = []
+    used: List[github.Env] = []
+
+    def new_github_env(git_env: git.Env, cfg: config.Config) -> github.Env:
+        github_envs.append(github.Env())
+        return github_envs[-1]
+
+    warm = daemon.Daemon(
+        [],
+        file_env,
+        git_env,
+        root_dir,
+        lambda: git.RealEnv(logger_env),
+        new_github_env,
+        lambda context, args: used.append(context.github_env),
+    )
+    warm.run(console.Env(), ["status"])
+    warm.run(console.Env(), ["status"])
+    # when
+    given_file(
+        file_env,
+        config.config_file(root_dir),
+        ["defaultBranch: master", "remoteBranches: []", "remote: origin"],
+    )
+    warm.run(console.Env(), ["status"])
+    warm.close()
+    # then
+    assert len(github_envs) == 2
+    assert used == [github_envs[0], github_envs[0], github_envs[1]]
+
+
+def test_daemon_lists_refs_again_once_they_change(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    root_dir = given_repo(file_env, git_env, tmp_path)
+    listed: List[List[str]] = []
+
+    def list_refs(context: CommandContext, args: List[str]) -> None:
+        refs = git.ref_tips(context.git_env, git.gitzen_ref_prefixes)
+        listed.append(list(refs))
+
+    warm = daemon.Daemon(
+        [],
+        file_env,
+        git_env,
+        root_dir,
+        lambda: git.RealEnv(logger_env),
+        lambda git_env, cfg: github.Env(),
+        list_refs,
+    )
+    warm.run(console.Env(), ["status"])
+    # when
+    subprocess.run(["git", "branch", "gitzen/pr/me/token", "HEAD"])
+    warm.run(console.Env(), ["status"])
+    warm.close()
+    # then
+    assert listed == [[], ["refs/heads/gitzen/pr/me/token"]]
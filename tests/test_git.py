@@ -1,12 +1,25 @@
+import subprocess
+from pathlib import PosixPath
 from subprocess import PIPE, STDOUT, CompletedProcess
 from unittest import mock
 
+import pytest
 from faker import Faker
 
-from gitzen import git, logger
-from gitzen.types import GitBranchName, GitRemoteName, GitRootDir
+from gitzen import file, git, logger
+from gitzen.models.gitzen_error import GitZenError
+from gitzen.models.ref_tip import RefTip
+from gitzen.models.ref_transaction import RefTransaction
+from gitzen.types import (
+    CommitHash,
+    GitBranchName,
+    GitRemoteName,
+    GitRootDir,
+    TreeHash,
+)
 
 from . import object_mother as om
+from .fakes.repo_files import given_repo
 
 
 @mock.patch("subprocess.run")
@@ -182,6 +195,113 @@ def test_log(mock_subproc_run) -> None:
     )
 
 
+@mock.patch("subprocess.run")
+def test_log_records(mock_subproc_run) -> None:
+    # given
+    output = "hash-1\0line 1\nline 2\0hash-2\0single line\0"
+    mock_subproc_run.return_value = CompletedProcess(
+        "",
+        0,
+        stdout=output.encode(),
+        stderr=b"warning: a warning\n",
+    )
+    # when
+    result = git.log_records(
+        git.RealEnv(logger.RealEnv()),
+        "master..HEAD",
+        ["%H", "%b"],
+    )
+    # then
+    mock_subproc_run.assert_called_with(
+        ["git", "log", "-z", "--format=%H%x00%b", "master..HEAD"],
+        input=None,
+        stdout=PIPE,
+        stderr=PIPE,
+    )
+    assert result == [
+        ["hash-1", "line 1\nline 2"],
+        ["hash-2", "single line"],
+    ]
+
+
+def test_log_records_keep_body_as_written(
+    tmp_path: PosixPath,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # given
+    monkeypatch.chdir(tmp_path)
+    logger_env = logger.RealEnv()
+    git_env = git.RealEnv(logger_env)
+    given_repo(file.RealEnv(logger_env), git_env, tmp_path)
+    body = "carriage\rreturn\nform\x0cfeed"
+    message = f"{tmp_path}/message"
+    with open(message, "w", newline="") as f:
+        f.write(f"Title\n\n{body}")
+    subprocess.run(
+        [
+            "git",
+            "commit",
+            "--allow-empty",
+            "--no-verify",
+            "--cleanup=verbatim",
+            "-F",
+            message,
+        ],
+        check=True,
+    )
+    # when
+    result = git.log_records(git_env, "HEAD~1..HEAD", ["%s", "%b", "%H"])
+    # then
+    assert len(result) == 1
+    subject, written, hash = result[0]
+    assert subject == "Title"
+    assert written.rstrip("\n") == body
+    assert hash == git.head_hash(git_env).value
+
+
+@mock.patch("subprocess.run")
+def test_ref_tips(mock_subproc_run) -> None:
+    # given
+    output = (
+        "refs/gitzen/patches/a\0hash-a\0tree-a\0parent-a\n"
+        "refs/heads/gitzen/pr/b\0hash-b\0tree-b\0parent-1 parent-2\n"
+    )
+    mock_subproc_run.return_value = CompletedProcess(
+        "",
+        0,
+        stdout=output.encode(),
+    )
+    # when
+    result = git.ref_tips(
+        git.RealEnv(logger.RealEnv()),
+        git.gitzen_ref_prefixes,
+    )
+    # then
+    mock_subproc_run.assert_called_with(
+        [
+            "git",
+            "for-each-ref",
+            "--format=%(refname)%00%(objectname)%00%(tree)%00%(parent)",
+            "refs/gitzen/patches/",
+            "refs/heads/gitzen/pr/",
+        ],
+        stdout=PIPE,
+        stderr=STDOUT,
+    )
+    assert result == {
+        "refs/gitzen/patches/a": RefTip(
+            CommitHash("hash-a"),
+            TreeHash("tree-a"),
+            [CommitHash("parent-a")],
+        ),
+        "refs/heads/gitzen/pr/b": RefTip(
+            CommitHash("hash-b"),
+            TreeHash("tree-b"),
+            [CommitHash("parent-1"), CommitHash("parent-2")],
+        ),
+    }
+
+
 @mock.patch("subprocess.run")
 def test_push(mock_subproc_run) -> None:
     """
@@ -336,3 +456,172 @@ def test_root_dir_returns_path(mock_subproc_run) -> None:
     result = git.root_dir(git.RealEnv(logger.RealEnv()))
     # then
     assert result == GitRootDir("test-root-dir")
+
+
+@mock.patch("subprocess.run")
+def test_commit_tree(mock_subproc_run) -> None:
+    """
+    Test that the correct command is invoked
+    """
+    # given
+    tree = TreeHash(om.hex(40))
+    parent = om.gen_commit_hash()
+    mock_subproc_run.return_value = CompletedProcess(
+        "", 0, stdout=om.hex(40).encode()
+    )
+    # when
+    git.commit_tree(
+        git.RealEnv(logger.RealEnv()),
+        tree,
+        [parent],
+        ["title", "", "it's a body"],
+    )
+    # then
+    mock_subproc_run.assert_called_with(
+        [
+            "git",
+            "commit-tree",
+            "-p",
+            parent.value,
+            "-m",
+            "title\n\nit's a body",
+            tree.value,
+        ],
+        stdout=PIPE,
+        stderr=STDOUT,
+    )
+
+
+@mock.patch("subprocess.run")
+def test_update_refs(mock_subproc_run) -> None:
+    """
+    Test that all the changes are sent to a single update-ref process
+    """
+    # given
+    new_hash = om.gen_commit_hash()
+    old_hash = om.gen_commit_hash()
+    transaction = RefTransaction()
+    transaction.create("refs/heads/new", new_hash)
+    transaction.update("refs/heads/changed", new_hash, old_hash)
+    transaction.delete("refs/heads/gone", old_hash)
+    mock_subproc_run.return_value = CompletedProcess("", 0)
+    # when
+    git.update_refs(git.RealEnv(logger.RealEnv()), transaction)
+    # then
+    mock_subproc_run.assert_called_once_with(
+        ["git", "update-ref", "--stdin"],
+        input=(
+            "start\n"
+            f"create refs/heads/new {new_hash.value}\n"
+            f"update refs/heads/changed {new_hash.value} {old_hash.value}\n"
+            f"delete refs/heads/gone {old_hash.value}\n"
+            "prepare\n"
+            "commit\n"
+        ).encode(),
+        stdout=PIPE,
+        stderr=STDOUT,
+    )
+
+
+@mock.patch("subprocess.run")
+def test_update_refs_when_empty(mock_subproc_run) -> None:
+    # when
+    git.update_refs(git.RealEnv(logger.RealEnv()), RefTransaction())
+    # then
+    mock_subproc_run.assert_not_called()
+
+
+@mock.patch("subprocess.run")
+def test_push_atomic(mock_subproc_run) -> None:
+    """
+    Test that all the branches are pushed with a single command
+    """
+    # given
+    remote = om.gen_remote_name()
+    new_branch = om.gen_git_branch_name()
+    existing_branch = om.gen_git_branch_name()
+    expected = om.gen_commit_hash()
+    mock_subproc_run.return_value = CompletedProcess("", 0)
+    # when
+    git.push_atomic(
+        git.RealEnv(logger.RealEnv()),
+        remote,
+        [(new_branch, None), (existing_branch, expected)],
+    )
+    # then
+    mock_subproc_run.assert_called_once_with(
+        [
+            "git",
+            "push",
+            "--atomic",
+            f"--force-with-lease={new_branch.value}:",
+            f"--force-with-lease={existing_branch.value}:{expected.value}",
+            remote.value,
+            f"{new_branch.value}:{new_branch.value}",
+            f"{existing_branch.value}:{existing_branch.value}",
+        ],
+        stdout=PIPE,
+        stderr=STDOUT,
+    )
+
+
+@mock.patch("subprocess.run")
+def test_git_dir_is_read_once(mock_subproc_run) -> None:
+    # given
+    mock_subproc_run.return_value = CompletedProcess(
+        "", 0, stdout=b"/repo/.git\n"
+    )
+    git_env = git.RealEnv(logger.RealEnv())
+    # when
+    first = git.git_dir(git_env)
+    second = git.git_dir(git_env)
+    # then
+    assert first == second == "/repo/.git"
+    mock_subproc_run.assert_called_once_with(
+        ["git", "rev-parse", "--absolute-git-dir"],
+        stdout=PIPE,
+        stderr=STDOUT,
+    )
+
+
+@mock.patch("subprocess.run")
+def test_git_dir_outside_repo_is_an_error(mock_subproc_run) -> None:
+    # given
+    mock_subproc_run.return_value = CompletedProcess(
+        "", 128, stdout=b"fatal: not a git repository\n"
+    )
+    git_env = git.RealEnv(logger.RealEnv())
+    # when
+    with pytest.raises(GitZenError) as error:
+        git.git_dir(git_env)
+    # then
+    assert error.value.exit_code == 128
+    # and the failure isn't cached
+    with pytest.raises(GitZenError):
+        git.git_dir(git_env)
+    assert mock_subproc_run.call_count == 2
+
+
+@mock.patch("subprocess.run")
+def test_ref_tips_are_listed_again_once_refs_move(mock_subproc_run) -> None:
+    # given
+    mock_subproc_run.return_value = CompletedProcess("", 0, stdout=b"")
+    git_env = git.RealEnv(logger.RealEnv())
+    # when
+    git.ref_tips(git_env, git.gitzen_ref_prefixes)
+    git.ref_tips(git_env, git.gitzen_ref_prefixes)
+    git.rev_parse(git_env, "HEAD")
+    git.ref_tips(git_env, git.gitzen_ref_prefixes)
+    git.fetch(git_env, om.gen_remote_name())
+    git.ref_tips(git_env, git.gitzen_ref_prefixes)
+    git.refs_changed(git_env)
+    git.ref_tips(git_env, git.gitzen_ref_prefixes)
+    # then
+    commands = [call.args[0][1] for call in mock_subproc_run.call_args_list]
+    assert commands == [
+        "for-each-ref",
+        "rev-parse",
+        "fetch",
+        "for-each-ref",
+        "for-each-ref",
+    ]
@@ -0,0 +1,78 @@
+from pathlib import PosixPath
+
+from gitzen import file, git, logger
+from gitzen.types import CommitHash, GitBranchName, TreeHash
+
+from .fakes.repo_files import given_repo
+
+
+def test_read_commit(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    head = CommitHash(git.rev_parse(git_env, "HEAD")[0])
+    parent = CommitHash(git.rev_parse(git_env, "HEAD~1")[0])
+    tree = TreeHash(git.rev_parse(git_env, "HEAD^{tree}")[0])
+    # when
+    result = git.read_commit(git_env, GitBranchName("master"))
+    # then
+    assert result is not None
+    assert result.hash == head
+    assert result.tree == tree
+    assert result.parents == [parent]
+    assert result.author.startswith("Your Name <you@example.com>")
+    assert result.headline == "Add BETA.md"
+    git.close(git_env)
+
+
+def test_ref_hash_and_tree_hash(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    head = CommitHash(git.rev_parse(git_env, "HEAD")[0])
+    tree = TreeHash(git.rev_parse(git_env, "HEAD^{tree}")[0])
+    # when
+    result_hash = git.ref_hash(git_env, GitBranchName("HEAD"))
+    result_tree = git.tree_hash(git_env, GitBranchName("HEAD"))
+    result_type = git.object_type(git_env, GitBranchName(tree.value))
+    # then
+    assert result_hash == head
+    assert result_tree == tree
+    assert result_type == "tree"
+    git.close(git_env)
+
+
+def test_missing_ref_is_none(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    missing = GitBranchName("no-such-branch")
+    # then
+    assert git.ref_hash(git_env, missing) is None
+    assert git.read_commit(git_env, missing) is None
+    # and the processes are still usable afterwards
+    assert git.ref_hash(git_env, GitBranchName("master")) is not None
+    git.close(git_env)
+
+
+def test_lookups_share_one_process(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    git.read_commit(git_env, GitBranchName("HEAD"))
+    process = git_env._cat_files["batch"]
+    # when
+    git.read_commit(git_env, GitBranchName("HEAD~1"))
+    git.read_commit(git_env, GitBranchName("HEAD~2"))
+    # then
+    assert git_env._cat_files["batch"] is process
+    git.close(git_env)
+    assert process.poll() is not None
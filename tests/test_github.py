@@ -4,7 +4,7 @@ from unittest import mock
 
 from faker import Faker
 
-from gitzen import console, git, github, logger
+from gitzen import console, file, git, github, logger
 from gitzen.models.github_commit import GithubCommit
 from gitzen.models.github_info import GithubInfo
 from gitzen.models.github_pull_request import PullRequest
@@ -29,7 +29,7 @@ from . import object_mother as om
 
 
 @mock.patch("subprocess.run")
-def test_fetch_info_invokes_command(mock_subproc_run) -> None:
+def test_full_sync_invokes_command(mock_subproc_run) -> None:
     """
     Test that the correct command is invoked
     """
@@ -37,7 +37,8 @@ def test_fetch_info_invokes_command(mock_subproc_run) -> None:
     repo_id = Faker().word()
     expected = (
         '{"data":{'
-        '"viewer":{"login":"","repository":{"pullRequests":{"nodes":[]}}},'
+        '"viewer":{"login":""},'
+        '"search":{"nodes":[]},'
         '"repository":{'
         f'"id":"{repo_id}"'
         "}"
@@ -45,14 +46,17 @@ def test_fetch_info_invokes_command(mock_subproc_run) -> None:
     ).encode()
     mock_subproc_run.side_effect = [
         CompletedProcess("", 0, stdout=expected),
+        CompletedProcess("", 0, stdout="/repo/.git".encode()),
         CompletedProcess("", 0, stdout="* branch-name".encode()),
     ]
     logger_env = logger.RealEnv()
     # when
-    github.fetch_info(
+    github.sync_info(
         console.RealEnv(),
+        file.DryRunEnv(file.Env()),
         git.RealEnv(logger_env),
         github.RealEnv(logger_env),
+        full=True,
     )
     # then
     query = github.query_status
@@ -65,11 +69,18 @@ def test_fetch_info_invokes_command(mock_subproc_run) -> None:
             "repo_owner={owner}",
             "-F",
             "repo_name={repo}",
+            "-F",
+            f"search_query={github.pr_search_query}",
             "-f",
             f"query={query}",
         ],
         stdout=PIPE,
     )
+    gitDir = mock.call(
+        ["git", "rev-parse", "--absolute-git-dir"],
+        stdout=PIPE,
+        stderr=STDOUT,
+    )
     gitBranch = mock.call(
         [
             "git",
@@ -82,6 +93,7 @@ def test_fetch_info_invokes_command(mock_subproc_run) -> None:
     mock_subproc_run.assert_has_calls(
         [
             ghApiQuery,
+            gitDir,
             gitBranch,
         ]
     )
@@ -93,9 +105,9 @@ def test_json_loads__escaped_newline() -> None:
 
 
 @mock.patch("subprocess.run")
-def test_fetch_info_returns_github_info(mock_subproc_run) -> None:
+def test_full_sync_returns_github_info(mock_subproc_run) -> None:
     """
-    Test that fetchStatus parses the gh query output
+    Test that sync_info parses the gh query output
     """
     # given
     mock_subproc_run.side_effect = [
@@ -109,153 +121,152 @@ def test_fetch_info_returns_github_info(mock_subproc_run) -> None:
       "id": "MDEwOlJlcG9zaXRvcnkyOTA1NzA4NzE="
     },
     "viewer": {
-      "login": "kemitix",
-      "repository": {
-        "pullRequests": {
-          "nodes": [
-            {
-              "id": "PR_kwDOEVHCd84vkAyI",
-              "number": 248,
-              "title": "build(deps): bump microprofile from 4.1 to 5.0 with zentoken",
-              "body": "zen-token:234ad5c1",
-              "baseRefName": "master",
-              "headRefName": "gitzen/pr/kemitix/234ad5c1",
-              "mergeable": "CONFLICTING",
-              "reviewDecision": null,
-              "repository": {
-                "id": "MDEwOlJlcG9zaXRvcnkyOTA1NzA4NzE="
-              },
-              "commits": {
-                "nodes": [
-                  {
-                    "commit": {
-                      "oid": "715fbc4220806fe283e39ee74c6fca3dac52c041",
-                      "messageHeadline": "build(deps): bump microprofile from 4.1 to 5.0",
-                      "messageBody": "Bumps [microprofile](https://github.com/eclipse/microprofile) from 4.1 to 5.0.\\n- [Release notes](https://github.com/eclipse/microprofile/releases)\\n- [Commits](https://github.com/eclipse/microprofile/compare/4.1...5.0)\\n\\n---\\nupdated-dependencies:\\n- dependency-name: org.eclipse.microprofile:microprofile\\n  dependency-type: direct:production\\n  update-type: version-update:semver-major\\n...\\n\\nSigned-off-by: dependabot[bot] <support@github.com>\\n\\nzen-token:234ad5c1",
-                      "statusCheckRollup": {
-                        "state": "FAILURE"
-                      }
-                    }
+      "login": "kemitix"
+    },
+    "search": {
+      "nodes": [
+        {
+          "id": "PR_kwDOEVHCd84vkAyI",
+          "number": 248,
+          "title": "build(deps): bump microprofile from 4.1 to 5.0 with zentoken",
+          "body": "zen-token:234ad5c1",
+          "baseRefName": "master",
+          "headRefName": "gitzen/pr/kemitix/234ad5c1",
+          "mergeable": "CONFLICTING",
+          "reviewDecision": null,
+          "repository": {
+            "id": "MDEwOlJlcG9zaXRvcnkyOTA1NzA4NzE="
+          },
+          "commits": {
+            "nodes": [
+              {
+                "commit": {
+                  "oid": "715fbc4220806fe283e39ee74c6fca3dac52c041",
+                  "messageHeadline": "build(deps): bump microprofile from 4.1 to 5.0",
+                  "messageBody": "Bumps [microprofile](https://github.com/eclipse/microprofile) from 4.1 to 5.0.\\n- [Release notes](https://github.com/eclipse/microprofile/releases)\\n- [Commits](https://github.com/eclipse/microprofile/compare/4.1...5.0)\\n\\n---\\nupdated-dependencies:\\n- dependency-name: org.eclipse.microprofile:microprofile\\n  dependency-type: direct:production\\n  update-type: version-update:semver-major\\n...\\n\\nSigned-off-by: dependabot[bot] <support@github.com>\\n\\nzen-token:234ad5c1",
+                  "statusCheckRollup": {
+                    "state": "FAILURE"
                   }
-                ]
+                }
               }
-            },
-            {
-              "id": "PR_other",
-              "number": 348,
-              "title": "build(deps): bump microprofile from 4.1 to 5.0 no zentoken",
-              "body": "",
-              "baseRefName": "master",
-              "headRefName": "gitzen/pr/master",
-              "mergeable": "CONFLICTING",
-              "reviewDecision": null,
-              "repository": {
-                "id": "MDEwOlJlcG9zaXRvcnkyOTA1NzA4NzE="
-              },
-              "commits": {
-                "nodes": [
-                  {
-                    "commit": {
-                      "oid": "715fbc4220806fe283e39ee74c6fca3dac52c041",
-                      "messageHeadline": "WIP build(deps): bump microprofile from 4.1 to 5.0",
-                      "messageBody": "Bumps [microprofile](https://github.com/eclipse/microprofile) from 4.1 to 5.0.\\n- [Release notes](https://github.com/eclipse/microprofile/releases)\\n- [Commits](https://github.com/eclipse/microprofile/compare/4.1...5.0)\\n\\n---\\nupdated-dependencies:\\n- dependency-name: org.eclipse.microprofile:microprofile\\n  dependency-type: direct:production\\n  update-type: version-update:semver-major\\n...\\n\\nSigned-off-by: dependabot[bot] <support@github.com>",
-                      "statusCheckRollup": {
-                        "state": "FAILURE"
-                      }
-                    }
+            ]
+          }
+        },
+        {
+          "id": "PR_other",
+          "number": 348,
+          "title": "build(deps): bump microprofile from 4.1 to 5.0 no zentoken",
+          "body": "",
+          "baseRefName": "master",
+          "headRefName": "gitzen/pr/master",
+          "mergeable": "CONFLICTING",
+          "reviewDecision": null,
+          "repository": {
+            "id": "MDEwOlJlcG9zaXRvcnkyOTA1NzA4NzE="
+          },
+          "commits": {
+            "nodes": [
+              {
+                "commit": {
+                  "oid": "715fbc4220806fe283e39ee74c6fca3dac52c041",
+                  "messageHeadline": "WIP build(deps): bump microprofile from 4.1 to 5.0",
+                  "messageBody": "Bumps [microprofile](https://github.com/eclipse/microprofile) from 4.1 to 5.0.\\n- [Release notes](https://github.com/eclipse/microprofile/releases)\\n- [Commits](https://github.com/eclipse/microprofile/compare/4.1...5.0)\\n\\n---\\nupdated-dependencies:\\n- dependency-name: org.eclipse.microprofile:microprofile\\n  dependency-type: direct:production\\n  update-type: version-update:semver-major\\n...\\n\\nSigned-off-by: dependabot[bot] <support@github.com>",
+                  "statusCheckRollup": {
+                    "state": "FAILURE"
                   }
-                ]
+                }
               }
-            },
-            {
-              "id": "PR_kwDOEVHCd84vkAyI",
-              "number": 248,
-              "title": "build(deps): bump microprofile from 4.1 to 5.0",
-              "body": "",
-              "baseRefName": "master",
-              "headRefName": "gitzen/pr/other",
-              "mergeable": "CONFLICTING",
-              "reviewDecision": null,
-              "repository": {
-                "id": "MDEwOlJlcG9zaXRvcnkyOTA1NzA4NzE="
-              },
-              "commits": {
-                "nodes": [
-                  {
-                    "commit": {
-                      "oid": "715fbc4220806fe283e39ee74c6fca3dac52c041",
-                      "messageHeadline": "build(deps): bump microprofile from 4.1 to 5.0",
-                      "messageBody": "Bumps [microprofile](https://github.com/eclipse/microprofile) from 4.1 to 5.0.\\n- [Release notes](https://github.com/eclipse/microprofile/releases)\\n- [Commits](https://github.com/eclipse/microprofile/compare/4.1...5.0)\\n\\n---\\nupdated-dependencies:\\n- dependency-name: org.eclipse.microprofile:microprofile\\n  dependency-type: direct:production\\n  update-type: version-update:semver-major\\n...\\n\\nSigned-off-by: dependabot[bot] <support@github.com>",
-                      "statusCheckRollup": {
-                        "state": "FAILURE"
-                      }
-                    }
+            ]
+          }
+        },
+        {
+          "id": "PR_other_no_token",
+          "number": 248,
+          "title": "build(deps): bump microprofile from 4.1 to 5.0",
+          "body": "",
+          "baseRefName": "master",
+          "headRefName": "gitzen/pr/other",
+          "mergeable": "CONFLICTING",
+          "reviewDecision": null,
+          "repository": {
+            "id": "MDEwOlJlcG9zaXRvcnkyOTA1NzA4NzE="
+          },
+          "commits": {
+            "nodes": [
+              {
+                "commit": {
+                  "oid": "715fbc4220806fe283e39ee74c6fca3dac52c041",
+                  "messageHeadline": "build(deps): bump microprofile from 4.1 to 5.0",
+                  "messageBody": "Bumps [microprofile](https://github.com/eclipse/microprofile) from 4.1 to 5.0.\\n- [Release notes](https://github.com/eclipse/microprofile/releases)\\n- [Commits](https://github.com/eclipse/microprofile/compare/4.1...5.0)\\n\\n---\\nupdated-dependencies:\\n- dependency-name: org.eclipse.microprofile:microprofile\\n  dependency-type: direct:production\\n  update-type: version-update:semver-major\\n...\\n\\nSigned-off-by: dependabot[bot] <support@github.com>",
+                  "statusCheckRollup": {
+                    "state": "FAILURE"
                   }
-                ]
+                }
               }
-            },
-            {
-              "id": "PR_kwDOEVHCd84vkAyI",
-              "number": 248,
-              "title": "build(deps): bump microprofile from 4.1 to 5.0",
-              "body": "",
-              "baseRefName": "master",
-              "headRefName": "gitzen/pr/other",
-              "mergeable": "CONFLICTING",
-              "reviewDecision": null,
-              "repository": {
-                "id": "invalid-repo"
-              },
-              "commits": {
-                "nodes": [
-                  {
-                    "commit": {
-                      "oid": "715fbc4220806fe283e39ee74c6fca3dac52c041",
-                      "messageHeadline": "build(deps): bump microprofile from 4.1 to 5.0",
-                      "messageBody": "Bumps [microprofile](https://github.com/eclipse/microprofile) from 4.1 to 5.0.\\n- [Release notes](https://github.com/eclipse/microprofile/releases)\\n- [Commits](https://github.com/eclipse/microprofile/compare/4.1...5.0)\\n\\n---\\nupdated-dependencies:\\n- dependency-name: org.eclipse.microprofile:microprofile\\n  dependency-type: direct:production\\n  update-type: version-update:semver-major\\n...\\n\\nSigned-off-by: dependabot[bot] <support@github.com>",
-                      "statusCheckRollup": {
-                        "state": "FAILURE"
-                      }
-                    }
+            ]
+          }
+        },
+        {
+          "id": "PR_other_no_token_2",
+          "number": 248,
+          "title": "build(deps): bump microprofile from 4.1 to 5.0",
+          "body": "",
+          "baseRefName": "master",
+          "headRefName": "gitzen/pr/other",
+          "mergeable": "CONFLICTING",
+          "reviewDecision": null,
+          "repository": {
+            "id": "invalid-repo"
+          },
+          "commits": {
+            "nodes": [
+              {
+                "commit": {
+                  "oid": "715fbc4220806fe283e39ee74c6fca3dac52c041",
+                  "messageHeadline": "build(deps): bump microprofile from 4.1 to 5.0",
+                  "messageBody": "Bumps [microprofile](https://github.com/eclipse/microprofile) from 4.1 to 5.0.\\n- [Release notes](https://github.com/eclipse/microprofile/releases)\\n- [Commits](https://github.com/eclipse/microprofile/compare/4.1...5.0)\\n\\n---\\nupdated-dependencies:\\n- dependency-name: org.eclipse.microprofile:microprofile\\n  dependency-type: direct:production\\n  update-type: version-update:semver-major\\n...\\n\\nSigned-off-by: dependabot[bot] <support@github.com>",
+                  "statusCheckRollup": {
+                    "state": "FAILURE"
                   }
-                ]
+                }
               }
-            },
-            {
-              "id": "PR_kwDOEVHCd84vkAyI",
-              "number": 248,
-              "title": "build(deps): bump microprofile from 4.1 to 5.0",
-              "body": "",
-              "baseRefName": "master",
-              "headRefName": "dependabot/maven/org.eclipse.microprofile-5.0",
-              "mergeable": "CONFLICTING",
-              "reviewDecision": null,
-              "repository": {
-                "id": "MDEwOlJlcG9zaXRvcnkyOTA1NzA4NzE="
-              },
-              "commits": {
-                "nodes": [
-                  {
-                    "commit": {
-                      "oid": "715fbc4220806fe283e39ee74c6fca3dac52c041",
-                      "messageHeadline": "build(deps): bump microprofile from 4.1 to 5.0",
-                      "messageBody": "Bumps [microprofile](https://github.com/eclipse/microprofile) from 4.1 to 5.0.\\n- [Release notes](https://github.com/eclipse/microprofile/releases)\\n- [Commits](https://github.com/eclipse/microprofile/compare/4.1...5.0)\\n\\n---\\nupdated-dependencies:\\n- dependency-name: org.eclipse.microprofile:microprofile\\n  dependency-type: direct:production\\n  update-type: version-update:semver-major\\n...\\n\\nSigned-off-by: dependabot[bot] <support@github.com>",
-                      "statusCheckRollup": {
-                        "state": "FAILURE"
-                      }
-                    }
+            ]
+          }
+        },
+        {
+          "id": "PR_dependabot",
+          "number": 248,
+          "title": "build(deps): bump microprofile from 4.1 to 5.0",
+          "body": "",
+          "baseRefName": "master",
+          "headRefName": "dependabot/maven/org.eclipse.microprofile-5.0",
+          "mergeable": "CONFLICTING",
+          "reviewDecision": null,
+          "repository": {
+            "id": "MDEwOlJlcG9zaXRvcnkyOTA1NzA4NzE="
+          },
+          "commits": {
+            "nodes": [
+              {
+                "commit": {
+                  "oid": "715fbc4220806fe283e39ee74c6fca3dac52c041",
+                  "messageHeadline": "build(deps): bump microprofile from 4.1 to 5.0",
+                  "messageBody": "Bumps [microprofile](https://github.com/eclipse/microprofile) from 4.1 to 5.0.\\n- [Release notes](https://github.com/eclipse/microprofile/releases)\\n- [Commits](https://github.com/eclipse/microprofile/compare/4.1...5.0)\\n\\n---\\nupdated-dependencies:\\n- dependency-name: org.eclipse.microprofile:microprofile\\n  dependency-type: direct:production\\n  update-type: version-update:semver-major\\n...\\n\\nSigned-off-by: dependabot[bot] <support@github.com>",
+                  "statusCheckRollup": {
+                    "state": "FAILURE"
                   }
-                ]
+                }
               }
-            }
-          ]
+            ]
+          }
         }
-      }
+      ]
     }
   }
 }""".encode(),
             # trunk-ignore-end(flake8/E501)
         ),
+        CompletedProcess("", 0, stdout="/repo/.git".encode()),
         CompletedProcess("", 0, stdout="* baz".encode()),
     ]
     commit_body = CommitBody(
@@ -298,10 +309,12 @@ def test_fetch_info_returns_github_info(mock_subproc_run) -> None:
     )
     logger_env = logger.RealEnv()
     # when
-    result = github.fetch_info(
+    result = github.sync_info(
         console.RealEnv(),
+        file.DryRunEnv(file.Env()),
         git.RealEnv(logger_env),
         github.RealEnv(logger_env),
+        full=True,
     )
     # then
     assert len(result.pull_requests) == 1
@@ -0,0 +1,283 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import PosixPath
+from typing import Any, Dict, Iterator, List, Tuple
+
+import pytest
+
+from gitzen import exit_code, file, git, github, logger
+from gitzen.models.gitzen_error import GitZenError
+
+from . import object_mother as om
+from .fakes.git_env import FakeGitEnv
+from .fakes.repo_files import given_repo
+
+
+class StandInGithub(ThreadingHTTPServer):
+    """
+    A local stand-in for the Github API, that replies to each request
+    with the canned response for its method and path.
+    """
+
+    responses: Dict[str, Tuple[int, Any]]
+    etags: Dict[str, str]
+    requests: List[Dict[str, Any]]
+    connections: int
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.responses = {}
+        self.etags = {}
+        self.requests = []
+        self.connections = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandInGithub
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def reply(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        request = f"{self.command} {self.path}"
+        self.server.requests.append(
+            {
+                "request": request,
+                "authorization": self.headers["Authorization"],
+                "body": json.loads(body) if body else None,
+            }
+        )
+        status, response = self.server.responses.get(request, (404, {}))
+        etag = self.server.etags.get(request)
+        if etag is not None and self.headers["If-None-Match"] == etag:
+            status, response = 304, None
+        data = b"" if response is None else json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", f"{len(data)}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = reply
+    do_POST = reply
+    do_PATCH = reply
+    do_PUT = reply
+    do_DELETE = reply
+
+
+@pytest.fixture
+def stand_in() -> Iterator[StandInGithub]:
+    server = StandInGithub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def given_http_env(stand_in: StandInGithub) -> github.HttpEnv:
+    logger_env = logger.RealEnv()
+    return github.HttpEnv(
+        logger_env,
+        FakeGitEnv(logger_env, {}),
+        api_url=stand_in.url,
+        token="the-token",
+        repo_owner="owner",
+        repo_name="repo",
+    )
+
+
+def test_graphql_fills_placeholders_and_reuses_connection(
+    stand_in: StandInGithub,
+) -> None:
+    # given
+    stand_in.responses["POST /graphql"] = (200, {"data": {"ok": True}})
+    github_env = given_http_env(stand_in)
+    # when
+    first = github_env._graphql(github.status_params(), "query")
+    second = github_env._graphql(github.status_params(), "query")
+    github_env.close()
+    # then
+    assert first == second == {"data": {"ok": True}}
+    assert stand_in.connections == 1
+    assert stand_in.requests[0]["authorization"] == "bearer the-token"
+    assert stand_in.requests[0]["body"] == {
+        "query": "query",
+        "variables": {
+            "repo_owner": "owner",
+            "repo_name": "repo",
+            "search_query": (
+                "repo:owner/repo is:pr is:open author:@me head:gitzen/pr/"
+                " sort:created-asc"
+            ),
+        },
+    }
+
+
+def test_create_pull_request_posts_to_pulls(
+    stand_in: StandInGithub,
+) -> None:
+    # given
+    head = om.gen_git_branch_name()
+    base = om.gen_git_branch_name()
+    commit = om.gen_commit(token=None)
+    stand_in.responses["POST /repos/owner/repo/pulls"] = (
+        201,
+        {"html_url": "pr-url"},
+    )
+    github_env = given_http_env(stand_in)
+    # when
+    github.create_pull_request(github_env, head, base, commit)
+    # then
+    assert stand_in.requests == [
+        {
+            "request": "POST /repos/owner/repo/pulls",
+            "authorization": "bearer the-token",
+            "body": {
+                "head": head.value,
+                "base": base.value,
+                "title": commit.messageHeadline.value,
+                "body": commit.messageBody.value,
+            },
+        }
+    ]
+
+
+def test_update_pull_request_finds_pr_by_branch(
+    stand_in: StandInGithub,
+) -> None:
+    # given
+    pr_branch = om.gen_git_branch_name()
+    base = om.gen_git_branch_name()
+    commit = om.gen_commit(token=None)
+    stand_in.responses[
+        f"GET /repos/owner/repo/pulls?head=owner%3A{pr_branch.value}"
+    ] = (200, [{"number": 12}])
+    stand_in.responses["PATCH /repos/owner/repo/pulls/12"] = (
+        200,
+        {"html_url": "pr-url"},
+    )
+    github_env = given_http_env(stand_in)
+    # when
+    github.update_pull_request(github_env, pr_branch, base, commit)
+    # then
+    requests = [request["request"] for request in stand_in.requests]
+    assert requests == [
+        f"GET /repos/owner/repo/pulls?head=owner%3A{pr_branch.value}",
+        "PATCH /repos/owner/repo/pulls/12",
+    ]
+    assert stand_in.requests[1]["body"]["base"] == base.value
+
+
+def test_close_with_comment_comments_then_closes(
+    stand_in: StandInGithub,
+) -> None:
+    # given
+    pull_request = om.gen_pr(token=None)
+    number = pull_request.number.value
+    stand_in.responses[f"POST /repos/owner/repo/issues/{number}/comments"] = (
+        201,
+        {"html_url": "comment-url"},
+    )
+    stand_in.responses[f"PATCH /repos/owner/repo/pulls/{number}"] = (
+        200,
+        {},
+    )
+    github_env = given_http_env(stand_in)
+    # when
+    github.close_pull_request_with_comment(github_env, pull_request, "gone")
+    # then
+    assert [request["body"] for request in stand_in.requests] == [
+        {"body": "gone"},
+        {"state": "closed"},
+    ]
+    assert stand_in.connections == 1
+
+
+def test_unchanged_response_is_taken_from_etag_cache(
+    stand_in: StandInGithub,
+    tmp_path: PosixPath,
+) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    request = "GET /repos/owner/repo/pulls/12"
+    stand_in.responses[request] = (200, {"number": 12})
+    stand_in.etags[request] = '"etag-12"'
+
+    def given_env() -> github.HttpEnv:
+        return github.HttpEnv(
+            logger_env,
+            git_env,
+            api_url=stand_in.url,
+            token="the-token",
+            repo_owner="owner",
+            repo_name="repo",
+            file_env=file_env,
+        )
+
+    url = f"{stand_in.url}/repos/owner/repo/pulls/12"
+    first_env = given_env()
+    first = first_env._request("GET", url)
+    first_env.close()
+    # only sent if the etag is not matched
+    stand_in.responses[request] = (200, {"number": 13})
+    # when
+    second_env = given_env()
+    second = second_env._request("GET", url)
+    second_env.close()
+    # then
+    assert first == second == {"number": 12}
+    assert len(stand_in.requests) == 2
+
+
+def test_error_response_raises_error(stand_in: StandInGithub) -> None:
+    # given
+    pull_request = om.gen_pr(token=None)
+    github_env = given_http_env(stand_in)
+    # then
+    with pytest.raises(GitZenError) as error:
+        # when
+        github.close_pull_request(github_env, pull_request)
+    assert error.value.exit_code == exit_code.GITHUB_ERROR
+
+
+def test_unsupported_command_raises_error(stand_in: StandInGithub) -> None:
+    # given
+    github_env = given_http_env(stand_in)
+    # then
+    with pytest.raises(GitZenError) as error:
+        # when
+        github_env._gh("repo view")
+    assert error.value.exit_code == exit_code.GITHUB_ERROR
+    assert stand_in.requests == []
+
+
+def test_parse_gh_args() -> None:
+    # when
+    result = github.parse_gh_args(
+        ["pr", "merge", "12", "--squash", "--match-head-commit", "abc"],
+    )
+    # then
+    assert result == (
+        "pr merge",
+        ["12"],
+        {"--squash": None, "--match-head-commit": "abc"},
+    )
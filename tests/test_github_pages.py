@@ -0,0 +1,170 @@
+from typing import Any, Dict, List
+
+from gitzen import file, github, logger
+from gitzen.types import GitBranchName
+
+from . import object_mother as om
+from .fakes.console_env import FakeConsoleEnv
+from .fakes.git_env import FakeGitEnv
+from .fakes.github_env import FakeGithubEnv
+
+
+def commit_node(hash: str, body: str) -> Dict[str, Any]:
+    return {
+        "commit": {
+            "oid": hash,
+            "messageHeadline": f"commit {hash}",
+            "messageBody": body,
+        }
+    }
+
+
+def pr_node(
+    id: str,
+    head_ref: str,
+    repo_id: str,
+    commits: List[Dict[str, Any]],
+    commits_cursor: str = "",
+) -> Dict[str, Any]:
+    return {
+        "id": id,
+        "number": id,
+        "title": f"pr {id}",
+        "repository": {"id": repo_id},
+        "baseRefName": "master",
+        "headRefName": head_ref,
+        "reviewDecision": None,
+        "body": "",
+        "mergeable": "MERGEABLE",
+        "commits": {
+            "pageInfo": {
+                "hasNextPage": commits_cursor != "",
+                "endCursor": commits_cursor,
+            },
+            "nodes": commits,
+        },
+    }
+
+
+def status_page(
+    login: str,
+    repo_id: str,
+    nodes: List[Dict[str, Any]],
+    cursor: str = "",
+) -> Dict[str, Any]:
+    return {
+        "data": {
+            "repository": {"id": repo_id},
+            "viewer": {"login": login},
+            "search": {
+                "pageInfo": {
+                    "hasNextPage": cursor != "",
+                    "endCursor": cursor,
+                },
+                "nodes": nodes,
+            },
+        }
+    }
+
+
+def test_full_sync_follows_pull_request_and_commit_pages() -> None:
+    # given
+    logger_env = logger.RealEnv()
+    git_env = FakeGitEnv(
+        logger_env,
+        {
+            "rev-parse --absolute-git-dir": [["/repo/.git"], ["/repo/.git"]],
+            "branch --no-color": [["* master"]],
+        },
+    )
+    login = om.gen_gh_username().value
+    repo_id = om.gen_gh_repo_id().value
+    token_1 = om.gen_zen_token()
+    token_2 = om.gen_zen_token()
+    head_1 = f"gitzen/pr/{login}/{token_1.value}"
+    head_2 = f"gitzen/pr/{login}/{token_2.value}"
+    first_page = status_page(
+        login,
+        repo_id,
+        [
+            pr_node(
+                "1",
+                head_1,
+                repo_id,
+                [commit_node("a1", f"zen-token:{token_1.value}")],
+                commits_cursor="commits-1",
+            ),
+        ],
+        cursor="prs-1",
+    )
+    second_page = status_page(
+        login,
+        repo_id,
+        [
+            pr_node(
+                "2",
+                head_2,
+                repo_id,
+                [commit_node("b1", f"zen-token:{token_2.value}")],
+            ),
+        ],
+    )
+    more_commits = {
+        "data": {
+            "node": {
+                "commits": {
+                    "pageInfo": {"hasNextPage": False, "endCursor": ""},
+                    "nodes": [commit_node("a2", "")],
+                },
+            },
+        },
+    }
+    github_env = FakeGithubEnv(
+        gh_responses={},
+        gql_responses={
+            repr(github.status_params()): [first_page],
+            repr({"pr_id": "1", "commit_cursor": "commits-1"}): [
+                more_commits,
+            ],
+            repr(github.status_params("prs-1")): [second_page],
+        },
+    )
+    # when
+    result = github.sync_info(
+        FakeConsoleEnv(),
+        file.DryRunEnv(file.Env()),
+        git_env,
+        github_env,
+        full=True,
+    )
+    # then
+    assert [pr.headRefName for pr in result.pull_requests] == [
+        GitBranchName(head_1),
+        GitBranchName(head_2),
+    ]
+    first_pr = result.pull_requests[0]
+    assert [commit.hash.value for commit in first_pr.commits] == ["a1", "a2"]
+    assert first_pr.headHash.value == "a2"
+    assert first_pr.zen_token == token_1
+
+
+def test_pull_request_pages_are_yielded_as_they_arrive() -> None:
+    # given
+    login = om.gen_gh_username().value
+    repo_id = om.gen_gh_repo_id().value
+    github_env = FakeGithubEnv(
+        gh_responses={},
+        gql_responses={
+            repr(github.status_params()): [
+                status_page(login, repo_id, [], cursor="prs-1"),
+            ],
+        },
+    )
+    # when
+    pages = github.pull_request_pages(github_env)
+    first = next(pages)
+    # then
+    assert first["viewer"]["login"] == login
+    # the second page is only requested when the generator is resumed
+    first_params = repr(github.status_params())
+    assert github_env.gql_request_counters[first_params] == 1
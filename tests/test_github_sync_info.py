@@ -0,0 +1,188 @@
+from pathlib import PosixPath
+from typing import Any, Dict, List, Tuple
+
+from gitzen import cache, file, git, github, logger
+from gitzen.models.github_pull_request import PullRequest
+from gitzen.models.pull_request_snapshot import PullRequestSnapshot
+from gitzen.types import GitBranchName, GithubRepoId, GithubUsername
+
+from . import object_mother as om
+from .fakes.console_env import FakeConsoleEnv
+from .fakes.github_env import FakeGithubEnv
+from .fakes.repo_files import given_repo
+
+
+def pr_node(
+    id: str,
+    login: str,
+    repo_id: str,
+    updated_at: str,
+    state: str = "OPEN",
+) -> Dict[str, Any]:
+    token = om.gen_zen_token().value
+    return {
+        "id": id,
+        "number": id,
+        "state": state,
+        "updatedAt": updated_at,
+        "title": f"pr {id}",
+        "repository": {"id": repo_id},
+        "baseRefName": "master",
+        "headRefName": f"gitzen/pr/{login}/{token}",
+        "reviewDecision": None,
+        "body": "",
+        "mergeable": "MERGEABLE",
+        "commits": {
+            "pageInfo": {"hasNextPage": False, "endCursor": ""},
+            "nodes": [
+                {
+                    "commit": {
+                        "oid": f"{id}a",
+                        "messageHeadline": f"pr {id}",
+                        "messageBody": f"zen-token:{token}",
+                    }
+                }
+            ],
+        },
+    }
+
+
+def status_page(
+    login: str,
+    repo_id: str,
+    nodes: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    return {
+        "data": {
+            "repository": {"id": repo_id},
+            "viewer": {"login": login},
+            "search": {
+                "pageInfo": {"hasNextPage": False, "endCursor": ""},
+                "nodes": nodes,
+            },
+        }
+    }
+
+
+def given_envs(tmp_path: PosixPath) -> Tuple[file.Env, git.Env]:
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    return file_env, git_env
+
+
+def parsed(node: Dict[str, Any], login: str, repo_id: str) -> PullRequest:
+    pr = github.pull_request_from_node(
+        FakeConsoleEnv(),
+        FakeGithubEnv(gh_responses={}, gql_responses={}),
+        node,
+        GithubRepoId(repo_id),
+        GithubUsername(login),
+    )
+    assert pr is not None
+    return pr
+
+
+def test_first_sync_searches_open_pull_requests(tmp_path: PosixPath) -> None:
+    # given
+    file_env, git_env = given_envs(tmp_path)
+    login = om.gen_gh_username().value
+    repo_id = om.gen_gh_repo_id().value
+    node = pr_node("1", login, repo_id, "2022-09-01T10:00:00Z")
+    github_env = FakeGithubEnv(
+        gh_responses={},
+        gql_responses={
+            repr(github.status_params()): [
+                status_page(login, repo_id, [node]),
+            ],
+        },
+    )
+    # when
+    result = github.sync_info(FakeConsoleEnv(), file_env, git_env, github_env)
+    # then
+    assert result.local_branch == GitBranchName("master")
+    assert result.pull_requests == [parsed(node, login, repo_id)]
+    snapshot = cache.load_pull_requests(file_env, git_env)
+    assert snapshot is not None
+    assert snapshot.entries == [
+        ("2022-09-01T10:00:00Z", parsed(node, login, repo_id)),
+    ]
+
+
+def test_sync_merges_updated_pull_requests(tmp_path: PosixPath) -> None:
+    # given
+    file_env, git_env = given_envs(tmp_path)
+    login = om.gen_gh_username().value
+    repo_id = om.gen_gh_repo_id().value
+    unchanged = pr_node("1", login, repo_id, "2022-09-01T10:00:00Z")
+    closed = pr_node("2", login, repo_id, "2022-09-01T10:00:00Z")
+    untouched = pr_node("3", login, repo_id, "2022-09-01T10:00:00Z")
+    synced_at = github.sync_time()
+    cache.save_pull_requests(
+        file_env,
+        git_env,
+        PullRequestSnapshot(
+            synced_at,
+            GithubUsername(login),
+            GithubRepoId(repo_id),
+            [
+                (node["updatedAt"], parsed(node, login, repo_id))
+                for node in [unchanged, closed, untouched]
+            ],
+        ),
+    )
+    added = pr_node("4", login, repo_id, "2022-09-02T10:00:00Z")
+    # a changed title would be parsed, if the pr was not taken from the cache
+    unchanged_again = {**unchanged, "title": "not parsed"}
+    closed_now = {**closed, "state": "CLOSED"}
+    search_query = github.pr_updated_search_query(synced_at)
+    github_env = FakeGithubEnv(
+        gh_responses={},
+        gql_responses={
+            repr(github.status_params(search_query=search_query)): [
+                status_page(
+                    login,
+                    repo_id,
+                    [unchanged_again, closed_now, added],
+                ),
+            ],
+        },
+    )
+    # when
+    result = github.sync_info(FakeConsoleEnv(), file_env, git_env, github_env)
+    # then
+    assert result.pull_requests == [
+        parsed(unchanged, login, repo_id),
+        parsed(untouched, login, repo_id),
+        parsed(added, login, repo_id),
+    ]
+
+
+def test_expired_snapshot_is_synced_in_full(tmp_path: PosixPath) -> None:
+    # given
+    file_env, git_env = given_envs(tmp_path)
+    login = om.gen_gh_username().value
+    repo_id = om.gen_gh_repo_id().value
+    stale = pr_node("1", login, repo_id, "2022-09-01T10:00:00Z")
+    cache.save_pull_requests(
+        file_env,
+        git_env,
+        PullRequestSnapshot(
+            "2022-09-01T10:00:00Z",
+            GithubUsername(login),
+            GithubRepoId(repo_id),
+            [(stale["updatedAt"], parsed(stale, login, repo_id))],
+        ),
+    )
+    github_env = FakeGithubEnv(
+        gh_responses={},
+        gql_responses={
+            repr(github.status_params()): [status_page(login, repo_id, [])],
+        },
+    )
+    # when
+    result = github.sync_info(FakeConsoleEnv(), file_env, git_env, github_env)
+    # then
+    assert result.pull_requests == []
+    assert github_env.gql_request_counters[repr(github.status_params())] == 1
@@ -0,0 +1,126 @@
+from typing import Any, Dict
+
+import pytest
+
+from gitzen import github
+from gitzen.models.git_commit import GitCommit
+from gitzen.models.pull_request_update import PullRequestUpdate
+from gitzen.types import CommitTitle, CommitWipStatus, GitBranchName
+
+from . import object_mother as om
+from .fakes.github_env import FakeGithubEnv
+
+
+def gen_update() -> PullRequestUpdate:
+    token = om.gen_zen_token()
+    pr = om.gen_pr(token)
+    pr.headRefName = GitBranchName(
+        f"gitzen/pr/{pr.author.value}/{token.value}",
+    )
+    base = om.gen_git_branch_name()
+    return PullRequestUpdate(pr, base, om.gen_commit(token))
+
+
+def updated_node(update: PullRequestUpdate) -> Dict[str, Any]:
+    pr = update.pull_request
+    return {
+        "pullRequest": {
+            "id": pr.id.value,
+            "number": pr.number.value,
+            "headRefOid": update.commit.hash.value,
+        }
+    }
+
+
+def test_update_pull_requests_sends_one_request() -> None:
+    # given
+    update_1 = gen_update()
+    update_2 = gen_update()
+    github_env = FakeGithubEnv(
+        gh_responses={},
+        gql_responses={
+            repr({}): [
+                {
+                    "data": {
+                        "u1": updated_node(update_1),
+                        "u2": updated_node(update_2),
+                    }
+                }
+            ]
+        },
+    )
+    # when
+    result = github.update_pull_requests(github_env, [update_1, update_2])
+    # then
+    assert github_env.gql_request_counters[repr({})] == 1
+    assert [pr.id for pr in result] == [
+        update_1.pull_request.id,
+        update_2.pull_request.id,
+    ]
+    assert [pr.baseRefName for pr in result] == [update_1.base, update_2.base]
+    assert result[0].headHash == update_1.commit.hash
+    assert result[0].title.value == update_1.commit.messageHeadline.value
+
+
+def test_update_pull_requests_sends_a_request_per_chunk(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # given
+    monkeypatch.setattr(github, "update_chunk_size", 2)
+    updates = [gen_update() for _ in range(5)]
+    github_env = FakeGithubEnv(
+        gh_responses={},
+        gql_responses={
+            repr({}): [
+                {
+                    "data": {
+                        f"u{index + 1}": updated_node(update)
+                        for index, update in enumerate(chunk)
+                    }
+                }
+                for chunk in [updates[0:2], updates[2:4], updates[4:5]]
+            ]
+        },
+    )
+    # when
+    result = github.update_pull_requests(github_env, updates)
+    # then
+    assert github_env.gql_request_counters[repr({})] == 3
+    assert [pr.id for pr in result] == [
+        update.pull_request.id for update in updates
+    ]
+
+
+def test_update_pull_requests_does_nothing_when_no_updates() -> None:
+    # given
+    github_env = FakeGithubEnv(gh_responses={}, gql_responses={})
+    # when
+    result = github.update_pull_requests(github_env, [])
+    # then
+    assert result == []
+
+
+def test_mutation_aliases_each_update_and_escapes_values() -> None:
+    # given
+    update_1 = gen_update()
+    token = om.gen_zen_token()
+    commit = GitCommit(
+        token,
+        om.gen_commit_hash(),
+        CommitTitle('Quote "this"'),
+        om.gen_commit_body(token),
+        CommitWipStatus(False),
+    )
+    update_2 = PullRequestUpdate(
+        update_1.pull_request,
+        om.gen_git_branch_name(),
+        commit,
+    )
+    # when
+    mutation = github.update_pull_requests_mutation([update_1, update_2])
+    # then
+    assert mutation.startswith("mutation {\n    u1: updatePullRequest(")
+    assert "\n    u2: updatePullRequest(" in mutation
+    assert 'title: "Quote \\"this\\""' in mutation
+    assert "PullRequestFields" not in mutation
+    assert mutation.count("headRefOid") == 2
@@ -0,0 +1,57 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import PosixPath
+
+from gitzen import file, logger, patterns
+
+hook_script = os.path.realpath(f"{os.path.dirname(__file__)}/../git-zen-hook")
+# The only gitzen modules the hook may import
+hook_modules = [
+    "gitzen",
+    "gitzen.commands",
+    "gitzen.commands.hook",
+    "gitzen.file",
+    "gitzen.logger",
+    "gitzen.patterns",
+    "gitzen.trace",
+]
+
+
+def given_message(tmp_path: PosixPath) -> str:
+    filename = f"{tmp_path}/COMMIT_EDITMSG"
+    file.write(file.RealEnv(logger.Env()), filename, ["Initial commit"])
+    return filename
+
+
+def test_hook_adds_zen_token(tmp_path: PosixPath) -> None:
+    # given
+    filename = given_message(tmp_path)
+    # when
+    subprocess.run([sys.executable, hook_script, filename], check=True)
+    # then
+    contents = file.read(file.RealEnv(logger.Env()), filename)
+    assert contents[:2] == ["Initial commit", ""]
+    assert re.search(patterns.commit_body_zen_token, contents[2]) is not None
+
+
+def test_hook_imports_only_what_it_needs(tmp_path: PosixPath) -> None:
+    # given
+    filename = given_message(tmp_path)
+    # when
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", hook_script, filename],
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    # then
+    imported = [
+        line.split("|")[-1].strip()
+        for line in result.stderr.decode().splitlines()
+        if line.startswith("import time:")
+    ]
+    gitzen_modules = [name for name in imported if name.startswith("gitzen")]
+    assert sorted(gitzen_modules) == hook_modules
+    assert "subprocess" not in imported
+    assert "json" not in imported
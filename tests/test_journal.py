@@ -0,0 +1,56 @@
+from pathlib import PosixPath
+
+from gitzen import file, git, journal, logger
+from gitzen.models.push_journal import PushJournal
+
+from . import object_mother as om
+from .fakes.repo_files import given_repo
+
+
+def test_load_returns_recorded_steps(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    commits = [om.gen_commit_hash(), om.gen_commit_hash()]
+    steps = ["update-refs", "push", "create-pr a", "create-pr b"]
+    journal.start(file_env, git_env, PushJournal(commits, steps, []))
+    # when
+    journal.record(file_env, git_env, "update-refs")
+    journal.record(file_env, git_env, "push")
+    # then
+    result = journal.load(file_env, git_env)
+    assert result == PushJournal(commits, steps, ["update-refs", "push"])
+    assert result is not None
+    assert result.pending == ["create-pr a", "create-pr b"]
+
+
+def test_load_ignores_partly_written_step(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    steps = ["update-refs", "push"]
+    journal.start(file_env, git_env, PushJournal([], steps, ["update-refs"]))
+    with file.io_append(file_env, journal.journal_file(git_env)) as f:
+        f.write('{"done": "pu')
+    # when
+    result = journal.load(file_env, git_env)
+    # then
+    assert result is not None
+    assert result.pending == ["push"]
+
+
+def test_finish_removes_journal(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    journal.start(file_env, git_env, PushJournal([], ["push"], []))
+    # when
+    journal.finish(file_env, git_env)
+    # then
+    assert journal.load(file_env, git_env) is None
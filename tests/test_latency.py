@@ -0,0 +1,82 @@
+import threading
+from pathlib import PosixPath
+from typing import List
+
+import pytest
+
+from benchmarks.latency import LatencyGitEnv, LatencyModel
+from gitzen import file, git, logger
+from gitzen.commands import push
+from gitzen.types import GitBranchName, GitRemoteName
+
+from .fakes.github_env import FakeGithubEnv
+from .fakes.repo_files import given_remote, given_repo
+
+
+def test_charge_is_round_trips_and_transfer() -> None:
+    # given
+    slept: List[float] = []
+    latency = LatencyModel(rtt=0.1, bandwidth=1000, sleep=slept.append)
+    # when
+    latency.charge(round_trips=2, bytes=500)
+    # then
+    assert slept == [pytest.approx(0.7)]
+    assert latency.charged == pytest.approx(0.7)
+    assert latency.calls == 1
+
+
+def test_fake_github_charges_each_request() -> None:
+    # given
+    slept: List[float] = []
+    latency = LatencyModel(rtt=0.1, bandwidth=1000, sleep=slept.append)
+    github_env = FakeGithubEnv(
+        gh_responses={"pr close 1": [["closed"]]},
+        gql_responses={},
+        latency=latency,
+    )
+    # when
+    github_env._gh("pr close 1")
+    # then
+    assert slept == [pytest.approx(0.1 + len("pr close 1closed") / 1000)]
+
+
+def test_git_charges_only_commands_that_reach_the_remote(
+    tmp_path: PosixPath,
+) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    given_repo(file.RealEnv(logger_env), git.RealEnv(logger_env), tmp_path)
+    slept: List[float] = []
+    git_env = LatencyGitEnv(
+        logger_env,
+        LatencyModel(rtt=0.05, sleep=slept.append),
+    )
+    mirror = GitRemoteName("mirror")
+    given_remote(git_env, f"{tmp_path}/mirror", mirror)
+    # when
+    git.status(git_env)
+    git.push(git_env, mirror, GitBranchName("master"))
+    git.fetch(git_env, mirror)
+    # then
+    assert slept == [pytest.approx(0.1), pytest.approx(0.1)]
+
+
+def test_concurrent_requests_overlap_their_latency() -> None:
+    # given each sleep waits until all four requests are sleeping at once,
+    # which they only are when they overlap
+    overlapping = threading.Barrier(4)
+
+    def sleep(seconds: float) -> None:
+        overlapping.wait(timeout=10)
+
+    latency = LatencyModel(rtt=0.2, sleep=sleep)
+    tasks = {
+        GitBranchName(f"branch-{index}"): (None, latency.charge)
+        for index in range(4)
+    }
+    # when
+    push.run_in_dependency_order(tasks, 4)
+    # then
+    assert latency.charged == pytest.approx(0.8)
+    assert latency.calls == 4
+    assert overlapping.broken is False
@@ -0,0 +1,59 @@
+import pstats
+import re
+import time
+from pathlib import PosixPath
+
+from gitzen import cli, file, logger, profile, trace
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_time_blocked_in_a_call_is_told_apart_from_python() -> None:
+    # given
+    profiler = profile.start()
+    # when
+    busy(0.1)
+    with trace.span("git fetch", "git"):
+        time.sleep(0.1)
+    profiler.stop()
+    # then
+    assert 0.05 < profiler.times["python"] < 0.2
+    assert 0.05 < profiler.times["git"] < 0.2
+    blocked = [stack for stack in profiler.stacks if "[git fetch]" in stack]
+    assert len(blocked) > 0
+    assert all(stack.startswith("MainThread;") for stack in blocked)
+    assert all(stack.endswith(";[git fetch]") for stack in blocked)
+    assert "test_time_blocked" in blocked[0]
+    assert trace.tracing() is False
+
+
+def test_summary_reports_python_and_blocked_time() -> None:
+    # given
+    profiler = profile.Profiler()
+    profiler.times = {"python": 0.5, "github": 1.25, "git": 2}
+    # when
+    summary = profile.summary(profiler)
+    # then
+    assert summary == (
+        "0.50s in Python, 2.00s blocked on git, 1.25s blocked on github"
+    )
+
+
+def test_cli_writes_pstats_and_collapsed_stacks(tmp_path: PosixPath) -> None:
+    # given
+    message = f"{tmp_path}/COMMIT_EDITMSG"
+    out = f"{tmp_path}/hook"
+    file.write(file.RealEnv(logger.RealEnv()), message, ["Initial commit"])
+    # when
+    cli.main(["git-zen", "--profile", out, "hook", message])
+    # then
+    functions = [name for _, _, name in pstats.Stats(f"{out}.pstats").stats]
+    assert "main" in functions
+    with open(f"{out}.collapsed") as f:
+        lines = f.read().splitlines()
+    assert all(re.fullmatch(r"\S+(;.+)? \d+", line) for line in lines)
+    assert trace.tracing() is False
@@ -1,9 +1,10 @@
 import subprocess
+from pathlib import PosixPath
 from subprocess import CompletedProcess
 from typing import List
 from unittest import mock
 
-from gitzen import console, git, logger, repo
+from gitzen import console, file, git, logger, repo, repo_commit_stack
 from gitzen.models.git_commit import GitCommit
 from gitzen.types import (
     CommitBody,
@@ -16,6 +17,7 @@ from gitzen.types import (
 )
 
 from .fakes.git_env import FakeGitEnv
+from .fakes.repo_files import given_repo
 
 
 @mock.patch("subprocess.run")
@@ -197,66 +199,63 @@ def test_getRepoDetailsFromRemoteV() -> None:
         ), f"match match failed for {testCase.remote}, got '{match}'"
 
 
+def log_record(hash: str, subject: str, body: str, trailers: str) -> str:
+    return "\0".join([hash, subject, body, trailers]) + "\0"
+
+
 def test_git_commit_stack() -> None:
     # given
     logger_env = logger.RealEnv()
+    log_format = "%x00".join(repo_commit_stack.commit_fields)
+    log_output = "".join(
+        [
+            log_record(
+                "d9c3765ee8c6a1dee34d623b78c50a38bc57201c",
+                "models.Commit: rename field oid as hash_id",
+                (
+                    "oid is used by Github.\n\n"
+                    "zen-token:97123f3a\n\n"
+                    "mystery box text\n"
+                ),
+                "",
+            ),
+            log_record(
+                "b7bcf5ebdb8b277e267e47ee87fb568e53a8df06",
+                "gitzen.branches: whitespace cleanup",
+                "zen-token:db8b277e\n",
+                "db8b277e\n",
+            ),
+            log_record(
+                "55b1cc72019cad0d9c392eef10b817d86378ea61",
+                "Add git.log()",
+                "zen-token:d0d9c392\n",
+                "d0d9c392\n",
+            ),
+            log_record(
+                "6a42e3c56e657e0b93f99e570fbab10ec35a81f8",
+                "WIP Create stub repo.get_local_commit_stack()",
+                "zen-token:e0b93f99\n",
+                "e0b93f99\n",
+            ),
+            log_record(
+                "47d8ed21feb4164499828a920e8d8df280392a51",
+                "Extract barnches.get_required_remote_branch()",
+                "zen-token:d21feb41\n",
+                "d21feb41\n",
+            ),
+            log_record(
+                "1f293d6cdc6ed3b1100aa21c9528e4fc5c608fa9",
+                "Rename as branches.validate_not_remote_pr()",
+                "zen-token:d6cdc6ed\n",
+                "d6cdc6ed\n",
+            ),
+        ]
+    )
     git_env = FakeGitEnv(
         logger_env,
         responses={
-            "log --no-color origin/remote-branch..HEAD": [
-                """
-commit d9c3765ee8c6a1dee34d623b78c50a38bc57201c (HEAD -> master)
-Author: Paul Campbell <pcampbell@kemitix.net>
-Date:   Sat Sep 3 19:12:34 2022 +0100
-
-    models.Commit: rename field oid as hash_id
-
-    oid is used by Github.
-
-    zen-token:97123f3a
-
-    mystery box text
-
-commit b7bcf5ebdb8b277e267e47ee87fb568e53a8df06
-Author: Paul Campbell <pcampbell@kemitix.net>
-Date:   Sat Sep 3 19:10:18 2022 +0100
-
-    gitzen.branches: whitespace cleanup
-
-    zen-token:db8b277e
-
-commit 55b1cc72019cad0d9c392eef10b817d86378ea61
-Author: Paul Campbell <pcampbell@kemitix.net>
-Date:   Sat Sep 3 19:07:26 2022 +0100
-
-    Add git.log()
-
-    zen-token:d0d9c392
-
-commit 6a42e3c56e657e0b93f99e570fbab10ec35a81f8
-Author: Paul Campbell <pcampbell@kemitix.net>
-Date:   Sat Sep 3 15:27:40 2022 +0100
-
-    WIP Create stub repo.get_local_commit_stack()
-
-    zen-token:e0b93f99
-
-commit 47d8ed21feb4164499828a920e8d8df280392a51
-Author: Paul Campbell <pcampbell@kemitix.net>
-Date:   Sat Sep 3 15:22:11 2022 +0100
-
-    Extract barnches.get_required_remote_branch()
-
-    zen-token:d21feb41
-
-commit 1f293d6cdc6ed3b1100aa21c9528e4fc5c608fa9
-Author: Paul Campbell <pcampbell@kemitix.net>
-Date:   Sat Sep 3 15:11:46 2022 +0100
-
-    Rename as branches.validate_not_remote_pr()
-
-    zen-token:d6cdc6ed
-""".splitlines()
+            f"log -z --format={log_format} origin/remote-branch..HEAD": [
+                log_output.splitlines()
             ]
         },
     )
@@ -322,3 +321,28 @@ Date:   Sat Sep 3 15:11:46 2022 +0100
             wip=CommitWipStatus(False),
         ),
     ]
+
+
+def test_git_commit_stack_from_repo(tmp_path: PosixPath) -> None:
+    # given
+    logger_env = logger.RealEnv()
+    file_env = file.RealEnv(logger_env)
+    git_env = git.RealEnv(logger_env)
+    given_repo(file_env, git_env, tmp_path)
+    console_env = console.RealEnv()
+    # when
+    result = repo.get_commit_stack(
+        console_env,
+        git_env,
+        GitRemoteName("origin"),
+        GitBranchName("master"),
+    )
+    # then
+    assert [commit.messageHeadline for commit in result] == [
+        CommitTitle("Add ALPHA.md"),
+        CommitTitle("Add BETA.md"),
+    ]
+    for commit in result:
+        assert commit.messageBody == CommitBody(
+            f"zen-token:{commit.zen_token.value}"
+        )
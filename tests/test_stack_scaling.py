@@ -0,0 +1,135 @@
+import math
+from pathlib import PosixPath
+from typing import Any, Callable, Dict, List, Tuple
+
+import pytest
+
+from benchmarks import stack
+from benchmarks.github_env import SyntheticGithubEnv
+from gitzen import config, console, file, git, github, logger, trace
+from gitzen.commands import push
+from gitzen.commands.push import rethread_stack
+from gitzen.models.commit_pr import CommitPr
+from gitzen.repo_commit_stack import parse_log_records
+from gitzen.types import GitBranchName, GitRootDir
+
+from . import object_mother as om
+from .fakes.call_budget import git_calls, github_calls
+from .fakes.console_env import FakeConsoleEnv
+
+
+def calls_within(
+    name: str,
+    events: List[Dict[str, Any]],
+) -> Tuple[int, int]:
+    """
+    Returns the git processes started and the Github calls made while the
+    traced function ran, on any thread.
+    """
+    [span] = [event for event in events if event["name"] == name]
+    within = [
+        event
+        for event in events
+        if span["ts"] <= event["ts"] <= span["ts"] + span["dur"]
+    ]
+    return len(git_calls(within)), len(github_calls(within))
+
+
+def push_calls(
+    size: int,
+    dir: str,
+    monkeypatch: pytest.MonkeyPatch,
+    given: Callable[[SyntheticGithubEnv], None],
+) -> Dict[str, Tuple[int, int]]:
+    """
+    Pushes a synthetic stack of the size, returning the calls made by
+    each per-branch step of the push.
+    """
+    synthetic = stack.generate(size, dir)
+    monkeypatch.chdir(synthetic.repo_dir)
+    github_env = SyntheticGithubEnv(synthetic)
+    given(github_env)
+    logger_env = logger.Env()
+    git_env = git.RealEnv(logger_env)
+    trace.start()
+    try:
+        with pytest.raises(SystemExit):
+            push.push(
+                console.Env(),
+                file.RealEnv(logger_env),
+                git_env,
+                github_env,
+                config.default_config(GitRootDir(synthetic.repo_dir)),
+            )
+        events = trace.chrome_trace()["traceEvents"]
+    finally:
+        trace.stop()
+        git.close(git_env)
+    return {
+        name: calls_within(name, events)
+        for name in ["publish_pr_branches", "regenerate_prs"]
+    }
+
+
+def stale_heads(github_env: SyntheticGithubEnv) -> None:
+    for pr in github_env.pull_requests.values():
+        pr["headRefOid"] = "0" * 40
+
+
+def no_pull_requests(github_env: SyntheticGithubEnv) -> None:
+    github_env.pull_requests = {}
+
+
+def test_parse_log_handles_ten_thousand_commits() -> None:
+    # when
+    result = parse_log_records(FakeConsoleEnv(), stack.log_records(10_000))
+    # then
+    assert len(result) == 10_000
+    assert result[0].zen_token.value == f"{9_999:08x}"
+    assert result[-1].zen_token.value == f"{0:08x}"
+
+
+def test_rethread_stack_handles_ten_thousand_commits() -> None:
+    # given
+    stack = [CommitPr(om.gen_commit(token=None), None)] * 10_000
+    author = om.gen_gh_username()
+    # when
+    result = rethread_stack(author, stack, GitBranchName("master"))
+    # then
+    assert len(result) == 10_000
+    assert result[-1].base == result[-2].head
+
+
+@pytest.mark.parametrize("size", [10, 100])
+def test_updating_every_pr_takes_a_push_and_a_request_per_chunk(
+    size: int,
+    tmp_path: PosixPath,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # when
+    calls = push_calls(size, f"{tmp_path}/stack", monkeypatch, stale_heads)
+    # then
+    assert calls == {
+        "publish_pr_branches": (1, 0),
+        "regenerate_prs": (0, math.ceil(size / github.update_chunk_size)),
+    }
+
+
+@pytest.mark.parametrize("size", [10, 100])
+def test_creating_every_pr_takes_a_push_and_a_request_per_pr(
+    size: int,
+    tmp_path: PosixPath,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # when
+    calls = push_calls(
+        size,
+        f"{tmp_path}/stack",
+        monkeypatch,
+        no_pull_requests,
+    )
+    # then
+    assert calls == {
+        "publish_pr_branches": (1, 0),
+        "regenerate_prs": (0, size),
+    }
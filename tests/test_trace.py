@@ -0,0 +1,91 @@
+import json
+from pathlib import PosixPath
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from gitzen import cli, file, git, logger, trace
+
+
+@pytest.fixture
+def tracing() -> Iterator[None]:
+    trace.start()
+    yield
+    trace.stop()
+
+
+def events() -> List[Dict[str, Any]]:
+    return trace.chrome_trace()["traceEvents"]
+
+
+def test_spans_are_not_recorded_unless_tracing() -> None:
+    # when
+    with trace.span("untraced"):
+        pass
+    # then
+    assert events() == []
+
+
+def test_nested_spans_are_recorded_within_their_parent(tracing: None) -> None:
+    # when
+    with trace.span("outer"):
+        with trace.span("inner", "git", args="status") as inner:
+            inner.set("exit_code", 0)
+    # then
+    inner_event, outer_event = events()
+    assert inner_event["name"] == "inner"
+    assert inner_event["cat"] == "git"
+    assert inner_event["ph"] == "X"
+    assert inner_event["args"] == {"args": "status", "exit_code": 0}
+    assert outer_event["name"] == "outer"
+    assert outer_event["ts"] <= inner_event["ts"]
+    assert (
+        inner_event["ts"] + inner_event["dur"]
+        <= outer_event["ts"] + outer_event["dur"]
+    )
+    assert inner_event["tid"] == outer_event["tid"]
+
+
+def test_traced_names_span_after_function(tracing: None) -> None:
+    # given
+    @trace.traced
+    def publish(value: int) -> int:
+        return value + 1
+
+    # when
+    result = publish(1)
+    # then
+    assert result == 2
+    assert [event["name"] for event in events()] == ["publish"]
+
+
+def test_git_call_records_exit_code_and_bytes(tracing: None) -> None:
+    # given
+    git_env = git.RealEnv(logger.RealEnv())
+    # when
+    _, lines = git_env._git("--version")
+    # then
+    [event] = events()
+    assert event["name"] == "git --version"
+    assert event["args"] == {
+        "args": "--version",
+        "exit_code": 0,
+        "bytes_out": len("\n".join(lines)) + 1,
+    }
+
+
+def test_cli_writes_chrome_trace(tmp_path: PosixPath) -> None:
+    # given
+    message = f"{tmp_path}/COMMIT_EDITMSG"
+    trace_file = f"{tmp_path}/trace.json"
+    file.write(file.RealEnv(logger.RealEnv()), message, ["Initial commit"])
+    # when
+    cli.main(["git-zen", "--trace", trace_file, "hook", message])
+    # then
+    with open(trace_file) as f:
+        written = json.load(f)["traceEvents"]
+    names = [event["name"] for event in written]
+    assert names[-1] == "hook"
+    assert "read" in names
+    assert "write" in names
+    assert trace.tracing() is False